@@ -1,11 +1,9 @@
 # app.py
 
-from flask import Flask, render_template, request, Response, send_file, json, jsonify, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, send_file, json, jsonify, flash, redirect, url_for, stream_with_context
 from flask_login import LoginManager, current_user, login_user, logout_user, login_required
 import os
 from dotenv import load_dotenv
-import functools
-import torch
 import re
 from dateutil.parser import isoparse
 import sys
@@ -13,7 +11,6 @@ import time
 from datetime import datetime
 import io
 import uuid
-import whisper
 import google.generativeai as genai
 import logging
 from logging.handlers import RotatingFileHandler
@@ -27,7 +24,7 @@ from celery.result import AsyncResult
 
 # 서비스 및 설정 파일 임포트
 from services.youtube_extractor import YouTubeDataExtractor, clean_transcript, resource_path
-from services import ai_service, calculator, content_analyzer, tts_service
+from services import ai_service, calculator, content_analyzer, tts_service, whisper_models, youtube_quota, llm_cache, token_budget, stream_bus
 import config
 
 # models.py와 forms.py에서 필요한 것들을 가져옵니다.
@@ -79,12 +76,6 @@ def create_app():
     def load_user(user_id):
         return db.session.get(User, int(user_id))
 
-    @functools.lru_cache(maxsize=1)
-    def get_whisper_model():
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        model = whisper.load_model("medium", device=device)
-        return model
-
     def parse_ai_topic_response(text_response):
         structured_ideas = []
         category_blocks = text_response.strip().split('###')
@@ -401,6 +392,62 @@ def create_app():
         task_type = request.args.get('task_type', 'celery') 
         return render_template('loading.html', task_id=task_id, is_restored=False, result_view=result_view, task_type=task_type)
 
+    # 작업 완료 시 이동할 수 있는 결과 페이지 (loading_page로 넘기는 result_view 값들)
+    stream_result_views = {
+        'analysis_result', 'v12_result_page', 'v13_result_page',
+        'channel_analysis_result', 'compare_results', 'planned_script_result',
+    }
+
+    def relay_task_events(job_id, result_view):
+        """
+        Celery 작업이 Redis로 보낸 이벤트(status, delta, metadata 등)를 Server-Sent Events로 전달합니다.
+        새 이벤트가 없을 때마다 작업 상태를 확인해, 끝났으면 {'type': 'done', 'url': 결과 페이지} 또는 {'type': 'error'}를 보내고 연결을 닫습니다.
+        """
+        # 스트림을 연 뒤에 url_for가 실패하지 않도록, 알려진 결과 페이지인지 응답을 시작하기 전에 확인합니다.
+        if result_view not in stream_result_views:
+            return jsonify({'error': f"'{result_view}'는 지원하지 않는 결과 페이지입니다."}), 400
+
+        def generate():
+            started_at = time.time()
+            for event in stream_bus.iter_events(job_id):
+                if event is None:
+                    task = AsyncResult(job_id, app=celery_app)
+                    if task.state == 'SUCCESS':
+                        event = {'type': 'done'}
+                    elif task.state == 'FAILURE':
+                        event = {'type': 'error', 'message': str(task.info)}
+                    elif time.time() - started_at > config.STREAM_MAX_SECONDS:
+                        event = {'type': 'error', 'message': '작업 진행 상황 수신 시간이 초과되었습니다. 페이지를 새로고침해주세요.'}
+                    else:
+                        yield ": keep-alive\n\n"
+                        continue
+                if event['type'] == 'done':
+                    event['url'] = url_for(result_view, task_id=job_id)
+                elif event['type'] == 'channel_card':
+                    # 채널 비교 결과는 결과 페이지와 같은 항목의 카드 HTML로 만들어 보냅니다.
+                    event['html'] = render_template('compare_channel_card.html', channel=event.pop('data'), index=event['index'])
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event['type'] in ('done', 'error'):
+                    break
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/task_stream/<task_id>')
+    @login_required
+    def task_stream(task_id):
+        return relay_task_events(task_id, request.args.get('result_view', 'analysis_result'))
+
+    @app.route('/analyze_channel_stream/<job_id>')
+    @login_required
+    def analyze_channel_stream(job_id):
+        return relay_task_events(job_id, 'channel_analysis_result')
+
+    @app.route('/extract_stream/<job_id>')
+    @login_required
+    def extract_stream(job_id):
+        return relay_task_events(job_id, 'analysis_result')
+
     @app.route('/task_status/<task_id>')
     @login_required
     def task_status(task_id):
@@ -408,6 +455,12 @@ def create_app():
         response_data = {'state': task.state}
         if task.state == 'PROGRESS':
             response_data['status'] = task.info.get('status', '진행 중...')
+            if 'partial_results' in task.info:
+                # 스트림을 쓸 수 없을 때도 완료된 채널을 같은 비교 카드로 보여주도록 렌더링한 HTML을 함께 보냅니다.
+                response_data['partial_cards'] = [
+                    {'index': i, 'html': render_template('compare_channel_card.html', channel=channel, index=i)}
+                    for i, channel in enumerate(task.info['partial_results']) if channel is not None
+                ]
         elif task.state == 'SUCCESS':
             result_view = request.args.get('result_view', 'analysis_result') 
             response_data['result_url'] = url_for(result_view, task_id=task.id)
@@ -427,6 +480,7 @@ def create_app():
                         elif 'analyze_text_task' in task_name: credit_cost = 2
                         elif 'analyze_channel_task' in task_name: credit_cost = 10
                         elif 'generate_planned_script_task' in task_name: credit_cost = 2
+                        elif 'compare_channels_task' in task_name: credit_cost = task_result.get('kwargs', {}).get('channel_count', 0)  # 채널당 1크레딧
 
                         if credit_cost > 0:
                             if user.credits >= credit_cost:
@@ -683,7 +737,8 @@ def create_app():
             flash("채널 URL을 입력해주세요.", "danger")
             return redirect(url_for('single_channel_analysis'))
         
-        task = celery_app.send_task('celery_worker.analyze_channel_task', args=[channel_url], kwargs={'user_id': current_user.id})
+        deep_history = request.form.get('deep_history') == 'on'
+        task = celery_app.send_task('celery_worker.analyze_channel_task', args=[channel_url], kwargs={'user_id': current_user.id, 'deep_history': deep_history})
         return redirect(url_for('loading_page', task_id=task.id, result_view='channel_analysis_result'))
 
     @app.route('/channel_analysis_result/<task_id>')
@@ -715,7 +770,8 @@ def create_app():
             revenue_info=revenue_info,
             report_html=report_html,
             content_strategy_analysis=content_info,
-            popular_videos=channel_info.get('popular_videos', [])
+            popular_videos=channel_info.get('popular_videos', []),
+            history_stats=channel_info.get('history_stats')
         )
     
     @app.route('/analyze_single_video', methods=['POST'])
@@ -747,7 +803,7 @@ def create_app():
             competitor_video_id, 
             my_channel_title, 
             my_channel_description, 
-            whisper_model_loader=get_whisper_model
+            whisper_model_loader=whisper_models.get_whisper_model
         )
         
         if result.get('error'):
@@ -777,30 +833,23 @@ def create_app():
                 message = f"채널 비교 분석에는 채널당 1크레딧, 총 {credit_cost} 크레딧이 필요합니다. (현재 보유 크레딧: {current_user.credits})"
                 return redirect(url_for('error_page', message=message))
 
-        results = []
-        extractor = YouTubeDataExtractor(whisper_model_loader=get_whisper_model)
-        
-        for url in all_urls:
-            channel_info = extractor.extract_channel_info(url)
-            if 'error' in channel_info:
-                results.append({'error': channel_info['error'], 'channel_title': url})
-                continue
+        # 채널 수만큼 오래 걸리는 작업이므로 웹 요청 안에서 처리하지 않고 백그라운드 작업으로 넘깁니다.
+        task = celery_app.send_task('celery_worker.compare_channels_task', args=[all_urls], kwargs={'user_id': current_user.id})
+        return redirect(url_for('loading_page', task_id=task.id, result_view='compare_results'))
 
-            revenue_info = calculator.estimate_monthly_revenue(channel_info)
-            content_info = content_analyzer.analyze_content_strategy(channel_info.get('videos_data', []))
-            
-            channel_id = extractor._get_channel_id(url)
-            popular_videos = extractor.get_popular_videos(channel_id, max_results=1) if channel_id else []
-            
-            combined_result = {**channel_info, 'revenue_info': revenue_info, **content_info, 'top_video': popular_videos[0] if popular_videos else None}
-            results.append(combined_result)
-        
-        if not current_user.is_admin:
-            user = db.session.get(User, current_user.id)
-            user.credits -= credit_cost
-            db.session.commit()
-            flash(f"채널 비교 분석이 완료되었습니다. {credit_cost} 크레딧이 차감되었습니다.", "info")
+    @app.route('/compare_results/<task_id>')
+    @login_required
+    def compare_results(task_id):
+        task = AsyncResult(task_id, app=celery_app)
+        if task.state == 'FAILURE':
+            error_info = str(task.info)
+            app.logger.error(f"Compare Channels Task {task_id} failed: {error_info}")
+            return redirect(url_for('error_page', message=f"채널 비교 분석 중 오류가 발생했습니다: {error_info}"))
+
+        if task.state != 'SUCCESS':
+            return redirect(url_for('loading_page', task_id=task.id, result_view='compare_results'))
 
+        results = task.result.get('result', [])
         return render_template('compare_results.html', results=results)
 
     @app.route('/admin')
@@ -831,6 +880,27 @@ def create_app():
         
         return render_template('admin_dashboard.html', stats=stats, users=users)
 
+    @app.route('/admin/youtube_quota')
+    @login_required
+    def admin_youtube_quota():
+        if not current_user.is_admin:
+            return jsonify({'error': '권한 없음'}), 403
+        return jsonify(youtube_quota.get_quota_report())
+
+    @app.route('/admin/llm_cache')
+    @login_required
+    def admin_llm_cache():
+        if not current_user.is_admin:
+            return jsonify({'error': '권한 없음'}), 403
+        return jsonify(llm_cache.get_cache_report())
+
+    @app.route('/admin/llm_usage')
+    @login_required
+    def admin_llm_usage():
+        if not current_user.is_admin:
+            return jsonify({'error': '권한 없음'}), 403
+        return jsonify(token_budget.get_usage_report(request.args.get('date')))
+
     @app.route('/admin/user/<int:user_id>/update_credits', methods=['POST'])
     @login_required
     def update_credits(user_id):
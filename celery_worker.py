@@ -5,11 +5,9 @@ import os
 import re 
 import logging
 from logging.handlers import RotatingFileHandler
-import functools
-import torch
-import whisper 
 import traceback
 from celery.exceptions import Ignore
+from celery.signals import worker_init, worker_process_init
 
 # 현재 파일의 디렉토리를 sys.path에 추가하여 모듈을 찾을 수 있도록 함
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -38,6 +36,43 @@ celery_app.conf.update(
     enable_utc = True,
 )
 
+import config
+if config.TREND_POOL_BEAT:
+    # 그날의 첫 사용자가 트렌드 주제 생성을 기다리지 않도록 자정 직후 주제 풀을 미리 만들어 둡니다.
+    from celery.schedules import crontab
+    celery_app.conf.beat_schedule = {
+        'refresh-trend-pool': {
+            'task': 'celery_worker.refresh_trend_pool_task',
+            'schedule': crontab(hour=0, minute=5),
+        },
+    }
+
+
+@worker_process_init.connect
+def preload_worker_models(**kwargs):
+    # 워커 프로세스마다 한 번만 실행됩니다. 작업마다 Whisper 모델을 다시 로딩하지 않도록 미리 올려둡니다.
+    import config
+    if config.WHISPER_PRELOAD:
+        from services import whisper_models
+        profile = config.TRANSCRIPTION_PROFILES.get(config.DEFAULT_TRANSCRIPTION_PROFILE, {})
+        whisper_models.preload_whisper_model(profile.get('model'), quantize=profile.get('quantize', False))
+    if config.YT_DLP_PRELOAD:
+        # 추출기 로딩과 쿠키 파일 읽기를 작업마다 반복하지 않도록 YoutubeDL 인스턴스도 미리 만들어 둡니다.
+        from services import ydl_pool
+        ydl_pool.warm()
+
+
+@worker_init.connect
+def preload_transcription_pool(sender=None, **kwargs):
+    # prefork가 아닌 풀(--pool=threads/solo)로 실행하면 작업이 워커 본 프로세스에서 실행되므로,
+    # 여기서 병렬 Whisper 변환 풀을 미리 띄워 첫 작업이 작업자 프로세스 생성과 모델 로딩을 기다리지 않게 합니다.
+    import config
+    pool_name = str(getattr(sender, 'pool_cls', '')).lower()
+    if not config.WHISPER_PRELOAD or 'prefork' in pool_name or 'processes' in pool_name:
+        return
+    from services import transcription
+    transcription.warm_process_pool()
+
 
 def parse_benchmark_report(report_text):
     data = {"strategy": "분석 실패", "formula": "분석 실패", "action_items": "분석 실패"}
@@ -82,9 +117,23 @@ def setup_task_logger(logger_name, log_file_name):
 def add(x, y):
     return x + y
 
+@celery_app.task
+def whisper_model_report_task():
+    from services import whisper_models
+    return whisper_models.get_model_report()
+
+@celery_app.task
+def refresh_trend_pool_task():
+    from services import ai_service
+    result = ai_service.build_trend_pool()
+    if isinstance(result, str):
+        print(f"[ERROR] 트렌드 주제 풀 생성 실패: {result}")
+        return {'error': result}
+    return {'topic_count': len(result)}
+
 @celery_app.task(bind=True)
 def rewrite_script_task(self, original_script, category, title, original_task_id=None, user_id=None):
-    from services import ai_service
+    from services import ai_service, stream_bus
     from prompt_templates import REWRITE_PROMPTS 
 
     task_logger = setup_task_logger(f'rewrite_script_task_{self.request.id}', 'rewrite_errors.log')
@@ -98,7 +147,9 @@ def rewrite_script_task(self, original_script, category, title, original_task_id
 
     try:
         self.update_state(state='PROGRESS', meta={'status': 'AI가 각색을 시작했습니다...'})
-        rewritten_script = ai_service.rewrite_script_v12(original_script, category)
+        stream_bus.publish(self.request.id, 'status', message='AI가 각색을 시작했습니다...')
+        # 각색 결과는 생성되는 대로 브라우저에 전달됩니다. (SSE)
+        rewritten_script = ai_service.rewrite_script_v12(original_script, category, stream=stream_bus.TokenStream(self.request.id, 'rewrite'))
         
         result_data = {
             'final_script': rewritten_script,
@@ -113,15 +164,16 @@ def rewrite_script_task(self, original_script, category, title, original_task_id
 
 @celery_app.task(bind=True)
 def rewrite_script_v13_task(self, original_script, category, title, original_task_id=None, user_id=None):
-    from services import ai_service
+    from services import ai_service, stream_bus
     
     task_logger = setup_task_logger(f'rewrite_script_v13_task_{self.request.id}', 'rewrite_v13_errors.log')
     task_logger.info(f"V13 안전 각색 작업 시작. 카테고리: '{category}'")
 
     try:
         self.update_state(state='PROGRESS', meta={'status': 'AI가 원본을 교정하고 있습니다... (1/2)'})
+        stream_bus.publish(self.request.id, 'status', message='AI가 원본을 교정하고 있습니다... (1/2)')
         
-        v13_result = ai_service.rewrite_script_v13_safe(original_script, category)
+        v13_result = ai_service.rewrite_script_v13_safe(original_script, category, stream=stream_bus.TokenStream(self.request.id, 'rewrite'))
         
         if v13_result.get("error"):
             raise Exception(v13_result["error"])
@@ -144,18 +196,21 @@ def rewrite_script_v13_task(self, original_script, category, title, original_tas
 
 @celery_app.task(bind=True)
 def analyze_text_task(self, script_content, filename, user_id=None):
-    from services import ai_service
+    from services import ai_service, stream_bus
     task_logger = setup_task_logger(f'analyze_text_task_{self.request.id}', 'analysis_errors.log')
     try:
         def update_progress(message, step, total_steps):
             meta = {'status': message, 'current': step, 'total': total_steps}
             self.update_state(state='PROGRESS', meta=meta)
+            stream_bus.publish(self.request.id, 'status', message=message)
 
         update_progress('AI가 대본의 오타를 교정하고 있습니다...', 1, 3)
-        corrected_script = ai_service.correct_transcript(script_content)
+        corrected_script = ai_service.correct_transcript(script_content, stream=stream_bus.TokenStream(self.request.id, 'correction'))
+        stream_bus.publish(self.request.id, 'correction', data={'text': corrected_script})
         
         update_progress('AI가 대본의 인기 요인을 분석하고 있습니다...', 2, 3)
-        analysis_summary = ai_service.analyze_transcript(corrected_script)
+        analysis_summary = ai_service.analyze_transcript(corrected_script, stream=stream_bus.TokenStream(self.request.id, 'analysis'))
+        stream_bus.publish(self.request.id, 'analysis', data={'summary': analysis_summary})
         
         video_info = {
             'video_id': f'user_upload_{self.request.id}',
@@ -186,40 +241,44 @@ def analyze_text_task(self, script_content, filename, user_id=None):
 @celery_app.task(bind=True)
 def extract_and_analyze_task(self, youtube_link, user_id=None):
     from services.youtube_extractor import YouTubeDataExtractor
-    from services import ai_service
+    from services import ai_service, whisper_models, stream_bus
     task_logger = setup_task_logger(f'extract_and_analyze_task_{self.request.id}', 'extraction_errors.log')
     try:
         def update_progress(message, step, total_steps):
             meta = {'status': message, 'current': step, 'total': total_steps}
             self.update_state(state='PROGRESS', meta=meta)
-
-        @functools.lru_cache(maxsize=1)
-        def get_whisper_model_in_worker():
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            model = whisper.load_model("medium", device=device)
-            return model
+            stream_bus.publish(self.request.id, 'status', message=message)
 
         update_progress('영상 정보 및 자막 추출 중...', 1, 5)
-        extractor = YouTubeDataExtractor(whisper_model_loader=get_whisper_model_in_worker)
+        extractor = YouTubeDataExtractor(whisper_model_loader=whisper_models.get_whisper_model, quota_context={'task': self.request.id, 'user': user_id})
         video_info, transcript_text = extractor.extract_video_info_and_transcript(youtube_link)
         
         if transcript_text.startswith("⚠️"):
             raise Exception(transcript_text)
+        stream_bus.publish(self.request.id, 'metadata', data={'title': video_info.get('title'), 'video_id': video_info.get('video_id')})
+        stream_bus.publish(self.request.id, 'transcript', data={'text': transcript_text})
 
         update_progress('AI가 대본의 오타를 교정하고 있습니다...', 2, 5)
-        corrected_script = ai_service.correct_transcript(transcript_text)
+        corrected_script = ai_service.correct_transcript(transcript_text, stream=stream_bus.TokenStream(self.request.id, 'correction'))
+        stream_bus.publish(self.request.id, 'correction', data={'text': corrected_script})
         
         update_progress('AI가 영상의 인기 요인을 분석하고 있습니다...', 3, 5)
-        analysis_summary = ai_service.analyze_transcript(corrected_script)
+        analysis_summary = ai_service.analyze_transcript(corrected_script, stream=stream_bus.TokenStream(self.request.id, 'analysis'))
+        stream_bus.publish(self.request.id, 'analysis', data={'summary': analysis_summary})
         
         update_progress('영상에 대한 시청자 반응(베스트 댓글)을 수집합니다...', 4, 5)
-        top_comments = []
+        top_comments, comment_keywords = [], []
         video_id = video_info.get('video_id')
         if video_id and not video_id.startswith('user_upload_'):
-            top_comments = YouTubeDataExtractor().get_top_comments(video_id)
+            comment_analysis = extractor.analyze_comments(video_id, with_keywords=config.COMMENT_KEYWORDS_ENABLED)
+            if 'error' in comment_analysis:
+                top_comments = [{'error': comment_analysis['error']}]
+            else:
+                top_comments = comment_analysis['top_comments']
+                comment_keywords = comment_analysis.get('top_keywords', [])
 
         update_progress('분석 완료! 결과를 정리하고 있습니다.', 5, 5)
-        final_result = {**video_info, 'original_script': corrected_script, 'analysis_summary': analysis_summary, 'top_comments': top_comments}
+        final_result = {**video_info, 'original_script': corrected_script, 'analysis_summary': analysis_summary, 'top_comments': top_comments, 'comment_keywords': comment_keywords}
         
         return {'status': 'SUCCESS', 'result': final_result, 'name': self.name, 'kwargs': {'user_id': user_id}}
     except Exception as e:
@@ -232,9 +291,10 @@ def extract_and_analyze_task(self, youtube_link, user_id=None):
         raise Exception(f"유튜브 영상 분석 작업 실패: {type(e).__name__}: {e}\n\n--- TRACEBACK ---\n{tb_str}")
 
 @celery_app.task(bind=True)
-def analyze_channel_task(self, channel_url, user_id=None):
+def analyze_channel_task(self, channel_url, user_id=None, deep_history=False):
     from services.youtube_extractor import YouTubeDataExtractor
-    from services import calculator, content_analyzer, ai_service
+    from services import calculator, content_analyzer, ai_service, whisper_models, stream_bus
+    import config
     
     task_logger = setup_task_logger(f'channel_analysis_{self.request.id}', 'channel_analysis.log')
     task_logger.info(f"--- [TASK START] 채널 분석 시작 (AI 리포트 포함): {channel_url} ---")
@@ -242,21 +302,29 @@ def analyze_channel_task(self, channel_url, user_id=None):
     def update_progress(message):
         meta = {'status': message}
         self.update_state(state='PROGRESS', meta=meta)
+        stream_bus.publish(self.request.id, 'status', message=message)
         task_logger.info(message)
 
     try:
-        @functools.lru_cache(maxsize=1)
-        def get_whisper_model_in_worker():
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            model = whisper.load_model("medium", device=device)
-            return model
-
         update_progress('채널 기본 데이터 추출 중... (1/5)')
-        extractor = YouTubeDataExtractor(whisper_model_loader=get_whisper_model_in_worker)
-        channel_info = extractor.extract_channel_info(channel_url)
+        extractor = YouTubeDataExtractor(whisper_model_loader=whisper_models.get_whisper_model, quota_context={'task': self.request.id, 'user': user_id})
+        # 채널/업로드 목록/영상 통계를 한 번만 받아 아래 모든 분석이 같은 스냅샷을 읽도록 합니다.
+        snapshot = extractor.fetch_channel_snapshot(channel_url)
+        if isinstance(snapshot, dict):
+            raise Exception(f"채널 정보 추출 실패: {snapshot['error']}")
+        channel_info = extractor.extract_channel_info(snapshot)
         if 'error' in channel_info:
             raise Exception(f"채널 정보 추출 실패: {channel_info['error']}")
 
+        if deep_history:
+            # 최근 90일이 아닌 채널 전체 업로드 이력을 열 단위 표로 모아 벡터 연산으로 집계합니다.
+            update_progress('채널 전체 업로드 이력 수집 중... (1/5)')
+            history = extractor.fetch_channel_history(snapshot)
+            if isinstance(history, dict):
+                task_logger.warning(f"채널 전체 이력 수집 실패: {history['error']}")
+            else:
+                channel_info['history_stats'] = history.summary()
+
         update_progress('예상 수익 계산 중... (2/5)')
         revenue_info = calculator.estimate_monthly_revenue(channel_info)
 
@@ -264,14 +332,8 @@ def analyze_channel_task(self, channel_url, user_id=None):
         content_info = content_analyzer.analyze_content_strategy(channel_info.get('videos_data', []))
         
         task_logger.info("인기 동영상 정보 추가 시작...")
-        channel_id = extractor._get_channel_id(channel_url)
-        if channel_id:
-            popular_videos = extractor.get_popular_videos(channel_id, max_results=5)
-            channel_info['popular_videos'] = popular_videos
-        else:
-            task_logger.warning("채널 ID를 찾을 수 없어 인기 동영상 정보를 추가하지 못했습니다.")
-            popular_videos = []
-            channel_info['popular_videos'] = []
+        popular_videos = extractor.get_popular_videos(snapshot, max_results=5)
+        channel_info['popular_videos'] = popular_videos
         
         update_progress('AI 벤치마킹 리포트 생성 중... (4/5)')
         report_html = {}
@@ -282,9 +344,11 @@ def analyze_channel_task(self, channel_url, user_id=None):
             task_logger.info("리포트 생성을 위해 인기 영상 대본 추출 시작...")
             top_video_summaries = []
             for video in popular_videos[:5]: 
-                video_url = f"https://www.youtube.com/watch?v=N7OEaDJQG3c6"
+                video_url = f"https://www.youtube.com/watch?v={video['id']}"
                 
-                _, transcript = extractor.extract_video_info_and_transcript(video_url)
+                # 요약에만 쓰이므로 가장 빠른 'draft' 프로필로 변환합니다. 자막이 있으면 전체 대본을 요약하고,
+                # 자막이 없어 Whisper로 변환할 때만 앞부분 SUMMARY_WHISPER_MAX_SECONDS초까지만 내려받아 변환합니다.
+                _, transcript = extractor.extract_video_info_and_transcript(video_url, profile='draft', max_seconds=config.SUMMARY_WHISPER_MAX_SECONDS)
                 
                 if transcript.startswith("⚠️"):
                     summary = video['title'] 
@@ -348,4 +412,67 @@ def generate_planned_script_task(self, options, user_id=None):
         
     except Exception as e:
         task_logger.error(f"--- [TASK FAILURE] 상세 기획 대본 생성 중 오류 발생: {e} ---", exc_info=True)
-        raise Exception(f"상세 기획 대본 생성 실패: {type(e).__name__}")
\ No newline at end of file
+        raise Exception(f"상세 기획 대본 생성 실패: {type(e).__name__}")
+
+
+@celery_app.task(bind=True)
+def compare_channels_task(self, channel_urls, user_id=None):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    import config
+    from services.youtube_extractor import YouTubeDataExtractor
+    from services import calculator, content_analyzer, stream_bus
+
+    task_logger = setup_task_logger(f'compare_channels_{self.request.id}', 'channel_analysis.log')
+    task_logger.info(f"--- [TASK START] 채널 비교 분석 시작: {channel_urls} ---")
+
+    # googleapiclient 서비스 객체는 스레드 간에 공유할 수 없으므로 스레드마다 추출기를 하나씩 만듭니다.
+    local = threading.local()
+
+    def analyze_one(url):
+        if not hasattr(local, 'extractor'):
+            local.extractor = YouTubeDataExtractor(quota_context={'task': self.request.id, 'user': user_id})
+        extractor = local.extractor
+        snapshot = extractor.fetch_channel_snapshot(url)
+        if isinstance(snapshot, dict):
+            return {'error': snapshot['error'], 'channel_title': url}
+        channel_info = extractor.extract_channel_info(snapshot)
+        if 'error' in channel_info:
+            return {'error': channel_info['error'], 'channel_title': url}
+
+        revenue_info = calculator.estimate_monthly_revenue(channel_info)
+        content_info = content_analyzer.analyze_content_strategy(channel_info.get('videos_data', []))
+        popular_videos = extractor.get_popular_videos(snapshot, max_results=1)
+        # 비교 화면에서 쓰지 않는 영상 원본 목록은 작업 결과 크기를 줄이기 위해 빼둡니다.
+        channel_info.pop('videos_data', None)
+        return {**channel_info, 'revenue_info': revenue_info, **content_info, 'top_video': popular_videos[0] if popular_videos else None}
+
+    try:
+        results = [None] * len(channel_urls)
+        completed = 0
+        self.update_state(state='PROGRESS', meta={'status': f'채널 {len(channel_urls)}개 비교 분석 중... (0/{len(channel_urls)})', 'partial_results': results})
+
+        workers = max(1, min(config.COMPARE_CHANNELS_MAX_WORKERS, len(channel_urls)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(analyze_one, url): i for i, url in enumerate(channel_urls)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    task_logger.error(f"채널 비교 중 오류 발생 ({channel_urls[i]}): {e}", exc_info=True)
+                    results[i] = {'error': f"채널 분석 중 오류 발생: {e}", 'channel_title': channel_urls[i]}
+                completed += 1
+                # 완료된 채널부터 로딩 화면에 비교 카드로 보여줍니다. 스트림에는 해당 채널만 보내고,
+                # 폴링용 진행 상태에는 입력 순서를 유지하도록 아직 끝나지 않은 채널을 None으로 둔 전체 목록을 싣습니다.
+                status = f"{results[i].get('channel_title', channel_urls[i])} 분석 완료 ({completed}/{len(channel_urls)})"
+                self.update_state(state='PROGRESS', meta={'status': status, 'partial_results': results})
+                stream_bus.publish(self.request.id, 'status', message=status)
+                stream_bus.publish(self.request.id, 'channel_card', index=i, data=results[i])
+
+        task_logger.info(f"--- [TASK SUCCESS] 채널 비교 분석 완료: {len(channel_urls)}개 채널 ---")
+        return {'status': 'SUCCESS', 'result': results, 'name': self.name, 'kwargs': {'user_id': user_id, 'channel_count': len(channel_urls)}}
+
+    except Exception as e:
+        task_logger.error(f"--- [TASK FAILURE] 채널 비교 분석 중 오류 발생: {e} ---", exc_info=True)
+        raise Exception(f"채널 비교 분석 작업 실패: {type(e).__name__}")
@@ -1,5 +1,7 @@
 # config.py
 
+import os
+
 # =================================================================
 # ▼▼▼▼▼ V12.10 최종 엔진: 안정성 강화 ▼▼▼▼▼
 # =================================================================
@@ -19,4 +21,129 @@ TEMPERATURE_CONFIG = {
 }
 
 # Gemini 모델 설정 (안정적인 모델명으로 변경)
-GEMINI_MODEL_NAME = 'gemini-1.0-pro'
\ No newline at end of file
+GEMINI_MODEL_NAME = 'gemini-1.0-pro'
+
+# Whisper 모델 설정 (워커별로 환경 변수로 덮어쓸 수 있음)
+WHISPER_MODEL_NAME = os.getenv('WHISPER_MODEL', 'medium')
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE')  # None이면 GPU 사용 가능 여부로 자동 결정
+WHISPER_PRELOAD = os.getenv('WHISPER_PRELOAD', '0') == '1'  # '1'이면 워커 프로세스 시작 시 미리 로딩
+
+# 대본 캐시 설정 (video_id + 추출 방식별로 재사용)
+TRANSCRIPT_CACHE_PATH = os.getenv('TRANSCRIPT_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'transcript_cache.db'))
+TRANSCRIPT_CACHE_TTL_SECONDS = int(os.getenv('TRANSCRIPT_CACHE_TTL_SECONDS', 60 * 60 * 24 * 30))  # 30일
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPT_CACHE_MAX_BYTES', 512 * 1024 * 1024))  # 512MB
+
+# 긴 오디오 병렬 변환 설정
+TRANSCRIBE_CHUNK_SECONDS = int(os.getenv('TRANSCRIBE_CHUNK_SECONDS', 300))  # 구간 목표 길이(초), 실제 경계는 근처 무음 지점
+TRANSCRIBE_OVERLAP_SECONDS = float(os.getenv('TRANSCRIBE_OVERLAP_SECONDS', 2))  # 구간 사이 겹침(초)
+TRANSCRIBE_MAX_WORKERS = int(os.getenv('TRANSCRIBE_MAX_WORKERS', 0))  # 0이면 CPU 코어 수로 자동 결정
+
+# 대본 변환 속도 프로필 (용도별로 선택)
+# - draft: 요약 등 대략적인 내용만 필요할 때. 작은 모델 + 그리디 디코딩 + 이전 문맥 조건 없음
+# - standard: 일반 분석용
+# - accurate: 원문 대본을 그대로 보여주는 분석용 (기존 동작과 동일)
+WHISPER_QUANTIZE_INT8 = os.getenv('WHISPER_QUANTIZE_INT8', '0') == '1'  # CPU에서 int8 동적 양자화 모델 사용
+TRANSCRIPTION_PROFILES = {
+    'draft': {
+        'model': 'base',
+        'quantize': WHISPER_QUANTIZE_INT8,
+        'options': {'temperature': 0.0, 'beam_size': None, 'best_of': None, 'condition_on_previous_text': False},
+    },
+    'standard': {
+        'model': 'small',
+        'quantize': WHISPER_QUANTIZE_INT8,
+        'options': {'temperature': 0.0, 'condition_on_previous_text': False},
+    },
+    'accurate': {
+        'model': WHISPER_MODEL_NAME,
+        'quantize': False,
+        'options': {},
+    },
+}
+TRANSCRIPTION_PROFILE_ORDER = ['draft', 'standard', 'accurate']  # 뒤로 갈수록 정확도가 높음
+DEFAULT_TRANSCRIPTION_PROFILE = os.getenv('TRANSCRIPTION_PROFILE', 'accurate')
+
+# 자막 트랙 선택 설정
+SUBTITLE_LANGUAGE_PREFERENCE = ['ko', 'ko-KR', 'ko-orig']  # 앞에 있을수록 우선
+SUBTITLE_FORMAT_PREFERENCE = ['json3', 'srv3', 'vtt']  # 구조화된 형식을 우선 사용
+SUBTITLE_ALLOW_OTHER_LANGUAGES = True  # 한국어 트랙이 없으면 다른 언어 원본 트랙이라도 사용 (Whisper보다 훨씬 빠름)
+
+# 외부 HTTP 호출 공통 설정 (services/http_client.py)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 10))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv('HTTP_PER_HOST_CONCURRENCY', 4))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+OPENAI_REQUEST_TIMEOUT = float(os.getenv('OPENAI_REQUEST_TIMEOUT', 120))  # LLM 응답은 오래 걸리므로 별도 설정
+
+# YouTube Data API 일일 할당량 관리 (태평양 시간 자정에 초기화)
+YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', 10000))
+YOUTUBE_EXPENSIVE_CALL_FLOOR = int(os.getenv('YOUTUBE_EXPENSIVE_CALL_FLOOR', 1000))  # 남은 할당량이 이보다 적으면 100단위 호출(search)은 거절
+
+# 채널 핸들/사용자명 → 채널 ID 변환 결과 캐시 유지 기간
+CHANNEL_ID_CACHE_TTL_SECONDS = int(os.getenv('CHANNEL_ID_CACHE_TTL_SECONDS', 60 * 60 * 24 * 90))
+
+# 채널 증분 동기화 저장소 (Flask 앱과 같은 DB를 Celery 워커에서도 직접 사용)
+CHANNEL_STORE_DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'youtube_app.db'))
+CHANNEL_STATS_TTL_SECONDS = int(os.getenv('CHANNEL_STATS_TTL_SECONDS', 60 * 60))            # 구독자 수 등 채널 통계 재사용 기간
+CHANNEL_VIDEO_STATS_TTL_SECONDS = int(os.getenv('CHANNEL_VIDEO_STATS_TTL_SECONDS', 60 * 60 * 6))  # 영상 조회수 등 통계 재사용 기간
+
+# 채널 비교 분석 시 동시에 처리할 채널 수
+COMPARE_CHANNELS_MAX_WORKERS = int(os.getenv('COMPARE_CHANNELS_MAX_WORKERS', 4))
+
+# 채널 전체 이력 분석(deep history) 시 수집할 최대 영상 수 (영상 50개당 할당량 약 2단위)
+CHANNEL_HISTORY_MAX_VIDEOS = int(os.getenv('CHANNEL_HISTORY_MAX_VIDEOS', 5000))
+
+# 댓글 수집 한도 (페이지당 최대 100개, 페이지당 할당량 1단위)
+COMMENT_MAX_PAGES = int(os.getenv('COMMENT_MAX_PAGES', 5))
+COMMENT_MAX_TOTAL = int(os.getenv('COMMENT_MAX_TOTAL', 500))
+# 댓글 키워드(명사 빈도) 분석은 형태소 분석기(JVM)를 사용해 느리므로 켤 때만 실행하고, 분석할 댓글 수도 제한합니다.
+COMMENT_KEYWORDS_ENABLED = os.getenv('COMMENT_KEYWORDS_ENABLED', '0') == '1'
+COMMENT_KEYWORD_MAX_COMMENTS = int(os.getenv('COMMENT_KEYWORD_MAX_COMMENTS', 200))
+
+# 벤치마킹 리포트용 인기 영상 요약에서 자막이 없어 Whisper로 변환할 때 내려받아 변환할 오디오 길이(초) 상한 (자막 대본은 자르지 않음)
+SUMMARY_WHISPER_MAX_SECONDS = int(os.getenv('SUMMARY_WHISPER_MAX_SECONDS', 1800))
+
+# yt-dlp 인스턴스 풀 설정 (워커 프로세스마다 미리 만들어 재사용)
+YT_DLP_POOL_SIZE = int(os.getenv('YT_DLP_POOL_SIZE', 2))              # 프로세스당 보관할 유휴 인스턴스 수
+YT_DLP_POOL_MAX_USES = int(os.getenv('YT_DLP_POOL_MAX_USES', 200))    # 이 횟수만큼 사용한 인스턴스는 새로 만듭니다
+YT_DLP_CACHE_DIR = os.getenv('YT_DLP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'yt_dlp_cache'))  # 플레이어 JS/서명 캐시 (워커 간 공유)
+YT_DLP_COOKIE_FILE = os.getenv('YT_DLP_COOKIE_FILE', 'cookies.txt')
+YT_DLP_PRELOAD = os.getenv('YT_DLP_PRELOAD', '1') == '1'  # '1'이면 워커 프로세스 시작 시 풀을 미리 채움
+
+# 긴 대본 요약(map-reduce) 설정
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', 4000))           # 구간당 최대 토큰 수 (문장 경계에서 자름)
+SUMMARY_MAX_CONCURRENCY = int(os.getenv('SUMMARY_MAX_CONCURRENCY', 4))        # 동시에 보내는 구간 요약 요청 수
+SUMMARY_REDUCE = os.getenv('SUMMARY_REDUCE', '1') == '1'                      # '1'이면 구간 요약들을 하나의 요약본으로 통합
+
+# 트렌드 주제 풀 설정 (날짜별로 미리 만들어 두고 요청마다 일부를 뽑아 보여줌)
+TREND_POOL_TTL_SECONDS = int(os.getenv('TREND_POOL_TTL_SECONDS', 60 * 60 * 36))
+TREND_POOL_BEAT = os.getenv('TREND_POOL_BEAT', '0') == '1'  # '1'이면 Celery beat이 매일 자정 직후 풀을 미리 생성
+TREND_POOL_LOCK_SECONDS = int(os.getenv('TREND_POOL_LOCK_SECONDS', 180))        # 풀 생성 잠금 만료 시간이자 다른 요청이 기다리는 최대 시간(초)
+TREND_TOPIC_MAX_CONCURRENCY = int(os.getenv('TREND_TOPIC_MAX_CONCURRENCY', 4))  # 카테고리별 주제 생성 요청을 동시에 보내는 수
+
+# LLM 응답 캐시 설정 (cache=True로 지정한 교정·분석 호출의 응답을 Redis에 저장해 같은 입력에 재사용)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') == '1'
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', 60 * 60 * 24 * 7))    # 7일
+LLM_CACHE_MAX_ENTRY_BYTES = int(os.getenv('LLM_CACHE_MAX_ENTRY_BYTES', 256 * 1024))  # 이보다 큰 응답은 저장하지 않음
+
+# LLM 토큰 한도 설정 (요청 전에 tiktoken으로 프롬프트 토큰 수를 확인)
+LLM_CONTEXT_WINDOWS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4': 8192,
+}
+LLM_DEFAULT_CONTEXT_WINDOW = int(os.getenv('LLM_DEFAULT_CONTEXT_WINDOW', 8192))
+LLM_LONG_CONTEXT_MODEL = os.getenv('LLM_LONG_CONTEXT_MODEL', PREMIUM_MODEL)              # 컨텍스트 한도를 넘는 요청을 보낼 모델
+LLM_COMPLETION_RESERVE_TOKENS = int(os.getenv('LLM_COMPLETION_RESERVE_TOKENS', 1024))   # 응답을 위해 남겨둘 최소 토큰 수
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv('LLM_MAX_OUTPUT_TOKENS', 4096))                   # 모델이 한 번에 생성할 수 있는 최대 토큰 수
+REWRITE_CONTEXT_TAIL_TOKENS = int(os.getenv('REWRITE_CONTEXT_TAIL_TOKENS', 300))      # 나눠서 각색할 때 다음 구간에 넘기는 앞 구간 각색 결과 끝부분
+
+# 작업 진행 상황/LLM 부분 출력 실시간 전달(SSE) 설정
+STREAM_FLUSH_CHARS = int(os.getenv('STREAM_FLUSH_CHARS', 40))              # 이만큼 모이면 부분 출력을 보냄
+STREAM_FLUSH_SECONDS = float(os.getenv('STREAM_FLUSH_SECONDS', 0.3))       # 또는 이 시간이 지나면 보냄
+STREAM_LOG_MAX_EVENTS = int(os.getenv('STREAM_LOG_MAX_EVENTS', 2000))      # 늦게 연결한 브라우저를 위해 작업별로 보관할 이벤트 수
+STREAM_LOG_TTL_SECONDS = int(os.getenv('STREAM_LOG_TTL_SECONDS', 60 * 60))
+STREAM_MAX_SECONDS = int(os.getenv('STREAM_MAX_SECONDS', 60 * 30))         # SSE 연결 최대 유지 시간
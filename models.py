@@ -50,4 +50,29 @@ class User(db.Model, UserMixin):
     feedbacks = db.relationship('Feedback', backref='author', lazy=True)
 
     def __repr__(self):
-        return f"User('{self.username}', '{self.email}', '{self.plan}', credits={self.credits})"
\ No newline at end of file
+        return f"User('{self.username}', '{self.email}', '{self.plan}', credits={self.credits})"
+
+# ▼▼▼ 채널 증분 동기화용 저장소 (services/channel_store.py에서 SQLAlchemy Core로 읽고 씁니다) ▼▼▼
+class ChannelRecord(db.Model):
+    channel_id = db.Column(db.String(64), primary_key=True)
+    title = db.Column(db.String(200))
+    subscriber_count = db.Column(db.Integer, nullable=False, default=0)
+    uploads_playlist_id = db.Column(db.String(64), nullable=False)
+    channel_refreshed_at = db.Column(db.DateTime)   # 채널 통계(구독자 수)를 마지막으로 받아온 시각
+    playlist_synced_at = db.Column(db.DateTime)     # 업로드 목록을 마지막으로 동기화한 시각
+
+    def __repr__(self):
+        return f"ChannelRecord('{self.channel_id}', '{self.title}')"
+
+
+class ChannelVideo(db.Model):
+    video_id = db.Column(db.String(32), primary_key=True)
+    channel_id = db.Column(db.String(64), db.ForeignKey('channel_record.channel_id'), nullable=False, index=True)
+    published_at = db.Column(db.DateTime, nullable=False, index=True)
+    duration = db.Column(db.String(32))
+    # videos().list 응답 항목(snippet, statistics, contentDetails) 원본 JSON입니다.
+    item_json = db.Column(db.Text, nullable=False)
+    stats_refreshed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"ChannelVideo('{self.video_id}', '{self.channel_id}')"
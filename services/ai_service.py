@@ -4,17 +4,26 @@ import openai
 import os
 import config
 import prompt_templates as pt
+from services import http_client, redis_store, llm_cache, token_budget
 import sys
 from datetime import datetime
 import re
 import json
 import time
+import uuid
+import threading
+from contextlib import contextmanager
 
-_openai_api_initialized = False
+_openai_api_pid = None  # OpenAI 설정을 마친 프로세스 (fork된 자식 프로세스에서는 다시 설정합니다)
+# Redis에 연결할 수 없을 때 사용하는 프로세스 내부 트렌드 주제 풀 (당일 것만 보관)
+_local_trend_pool = {}
+_local_trend_pool_lock = threading.Lock()
+# 잠금을 건 요청만 지우도록, 잠금 값이 자신의 토큰과 같을 때만 삭제합니다.
+_RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
 
 def _setup_openai_api():
-    global _openai_api_initialized
-    if _openai_api_initialized:
+    global _openai_api_pid
+    if _openai_api_pid == os.getpid():
         return True
     
     try:
@@ -23,16 +32,68 @@ def _setup_openai_api():
             print("[ERROR] OpenAI API 키를 찾을 수 없습니다. .env 파일을 확인해주세요.")
             return False
         openai.api_key = api_key
-        _openai_api_initialized = True
+        # 이 프로세스의 API용 커넥션 풀을 사용하고, 멈춘 요청이 무한정 대기하지 않도록 타임아웃을 명시합니다.
+        # fork 전에 만들어진 모듈 클라이언트는 부모 프로세스의 커넥션 풀을 들고 있으므로 버리고 다시 만들게 합니다.
+        openai.http_client = http_client.get_api_client()
+        openai.timeout = http_client.default_timeout(read=config.OPENAI_REQUEST_TIMEOUT)
+        if hasattr(openai, '_reset_client'):
+            openai._reset_client()
+        _openai_api_pid = os.getpid()
         return True
     except Exception as e:
         print(f"[ERROR] OpenAI API 설정 중 오류 발생: {e}")
         return False
 
-def _safe_generate_openai(user_prompt, system_prompt=None, model_name="gpt-3.5-turbo", temperature=0.7):
+def _create_streaming(model_name, messages, temperature, stream):
+    """stream=True로 응답을 받으면서 조각마다 stream.write()로 전달하고, (전체 응답, 토큰 사용량)을 반환합니다."""
+    parts, usage = [], None
+    response = openai.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    for chunk in response:
+        if getattr(chunk, 'usage', None):
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            stream.write(chunk.choices[0].delta.content)
+    stream.flush()
+    return "".join(parts), usage
+
+def _safe_generate_openai(user_prompt, system_prompt=None, model_name="gpt-3.5-turbo", temperature=0.7, cache=False, stream=None, caller=None):
+    """
+    caller: 토큰 사용량을 호출한 기능별로 집계할 때 쓰는 이름입니다. 각 공개 함수가 자신의 이름을 넘깁니다.
+    cache: True이면 같은 입력의 응답을 Redis에 저장해 재사용합니다. 교정·분석처럼 결정적인 결과가 필요한 호출에서만 지정합니다.
+    stream: stream_bus.TokenStream처럼 write()/flush()/reset()을 가진 객체를 주면 응답을 생성되는 대로 전달합니다.
+    반환값은 stream 사용 여부와 관계없이 전체 응답 문자열입니다.
+    """
     if not _setup_openai_api():
         return "⚠️ OpenAI API 키가 설정되지 않았습니다."
 
+    # 보내기 전에 토큰 수를 세어 컨텍스트 한도를 넘으면 더 긴 컨텍스트 모델로 바꾸거나 바로 오류를 반환합니다.
+    prompt_tokens = token_budget.count_prompt_tokens(user_prompt, system_prompt, model_name)
+    routed_model = token_budget.route_model(model_name, prompt_tokens)
+    if routed_model is None:
+        print(f"[ERROR] 프롬프트 토큰 수 초과: {prompt_tokens}토큰 (model={model_name}, caller={caller})", file=sys.stderr)
+        return "⚠️ 입력된 대본의 양이 너무 많아 AI가 처리할 수 없습니다. 내용을 조금 줄여서 다시 시도해주세요."
+    if routed_model != model_name:
+        print(f"[DEBUG] 프롬프트 {prompt_tokens}토큰이 {model_name}의 컨텍스트 한도를 넘어 {routed_model}로 요청합니다.")
+        model_name = routed_model
+
+    cache_key = None
+    if llm_cache.should_cache(cache):
+        cache_key = llm_cache.make_key(model_name, temperature, system_prompt, user_prompt)
+        cached = llm_cache.get(cache_key)
+        if cached:
+            print(f"[DEBUG] LLM 응답 캐시 사용 (model={model_name}, temperature={temperature})")
+            if stream is not None:
+                stream.write(cached)
+                stream.flush()
+            return cached
+
     max_retries = 3
     retry_delay = 2
 
@@ -43,13 +104,31 @@ def _safe_generate_openai(user_prompt, system_prompt=None, model_name="gpt-3.5-t
                 messages.append({"role": "system", "content": system_prompt})
             messages.append({"role": "user", "content": user_prompt})
             
-            response = openai.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=temperature
-            )
-            if response and response.choices and len(response.choices) > 0 and response.choices[0].message and response.choices[0].message.content:
-                return response.choices[0].message.content.strip()
+            if stream is not None:
+                if attempt > 0:
+                    stream.reset()  # 재시도하면 응답을 처음부터 다시 받습니다.
+                content, usage = _create_streaming(model_name, messages, temperature, stream)
+                response = None
+            else:
+                response = openai.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=temperature
+                )
+                has_content = response and response.choices and len(response.choices) > 0 and response.choices[0].message and response.choices[0].message.content
+                content = response.choices[0].message.content if has_content else None
+                usage = getattr(response, 'usage', None)
+            if content and content.strip():
+                content = content.strip()
+                token_budget.record_usage(
+                    model_name,
+                    getattr(usage, 'prompt_tokens', None) or prompt_tokens,
+                    getattr(usage, 'completion_tokens', None) or token_budget.count_tokens(content, model_name),
+                    caller,
+                )
+                if cache_key:
+                    llm_cache.put(cache_key, content)
+                return content
             else:
                 print(f"[ERROR] OpenAI API가 비어있거나 예상치 못한 형태의 응답을 반환했습니다: {response}", file=sys.stderr)
                 return "⚠️ AI가 응답을 생성했지만, 내용이 비어있습니다. 다시 시도해주세요."
@@ -66,14 +145,14 @@ def _safe_generate_openai(user_prompt, system_prompt=None, model_name="gpt-3.5-t
             error_message = "OpenAI API 키가 유효하지 않습니다. 관리자에게 문의하여 확인해주세요."
             print(f"[ERROR] AuthenticationError: {e}", file=sys.stderr)
             return f"⚠️ {error_message}"
-        except openai.InvalidRequestError as e:
+        except openai.BadRequestError as e:
             if "context_length_exceeded" in str(e):
                 error_message = "입력된 대본의 양이 너무 많아 AI가 처리할 수 없습니다. 내용을 조금 줄여서 다시 시도해주세요."
-                print(f"[ERROR] InvalidRequestError (Context Length): {e}", file=sys.stderr)
+                print(f"[ERROR] BadRequestError (Context Length): {e}", file=sys.stderr)
                 return f"⚠️ {error_message}"
             else:
                 error_message = f"AI에 대한 요청이 잘못되었습니다: {e}"
-                print(f"[ERROR] InvalidRequestError: {e}", file=sys.stderr)
+                print(f"[ERROR] BadRequestError: {e}", file=sys.stderr)
                 return f"⚠️ {error_message}"
         except Exception as e:
             error_message = f"GPT API를 호출하는 중 예측하지 못한 오류가 발생했습니다: {type(e).__name__}"
@@ -83,6 +162,80 @@ def _safe_generate_openai(user_prompt, system_prompt=None, model_name="gpt-3.5-t
     return "⚠️ 알 수 없는 오류로 AI 응답 생성에 최종 실패했습니다."
 
 
+def _map_concurrently(func, items, max_workers=None, thread_name_prefix='llm'):
+    """func를 items에 동시에 적용하고 결과를 입력 순서대로 반환합니다. 동시 요청 수는 max_workers로 제한됩니다."""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    from concurrent.futures import ThreadPoolExecutor
+    max_workers = max(1, min(len(items), max_workers or config.SUMMARY_MAX_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as executor:
+        return list(executor.map(func, items))
+
+def _generate_chunked(template, field, text, model_name, temperature, output_ratio=1.0, cache=False, stream=None, caller=None):
+    """
+    template.format(**{field: text}) 프롬프트가 모델의 토큰 한도를 넘으면 text를 문장 경계에서 나눠 구간별로 동시에 호출합니다.
+    교정/각색처럼 응답 길이가 입력에 비례하는 작업용이며, [(구간 원문, 응답)] 목록을 원래 순서대로 반환합니다.
+    stream을 주면 구간별 부분 출력은 구간 번호(part)를 붙여 전달됩니다.
+    """
+    budget = token_budget.input_budget(model_name, template.format(**{field: ""}), output_ratio)
+    if token_budget.count_tokens(text, model_name) <= budget:
+        chunks = [text]
+    else:
+        chunks = token_budget.split_text(text, budget, model_name)
+        print(f"[DEBUG] 입력이 토큰 한도({budget})를 넘어 {len(chunks)}개 구간으로 나눠 요청합니다. (model={model_name})")
+
+    def generate(indexed_chunk):
+        part, chunk = indexed_chunk
+        return _safe_generate_openai(
+            user_prompt=template.format(**{field: chunk}), model_name=model_name, temperature=temperature, cache=cache,
+            stream=stream.for_part(part) if stream is not None else None, caller=caller
+        )
+
+    return list(zip(chunks, _map_concurrently(generate, list(enumerate(chunks)))))
+
+_REWRITE_CONTEXT_NOTE = (
+    "아래는 같은 원본의 앞부분을 이미 각색한 결과의 마지막 부분입니다. "
+    "이 흐름과 문체, 등장인물 설정을 그대로 이어서 이번에 받은 원본 부분만 각색하세요. 아래 내용을 다시 쓰지는 마세요.\n\n"
+    "[앞부분 각색 결과]\n{tail}"
+)
+
+def _rewrite_in_order(template, field, text, model_name, temperature, stream=None, caller=None):
+    """
+    각색용 호출입니다. 원본이 model_name의 토큰 한도를 넘으면 먼저 config.LLM_LONG_CONTEXT_MODEL로 한 번에 각색하고,
+    그 모델로도 한 번에 처리할 수 없을 때만 문장 경계에서 나눠 앞에서부터 순서대로 각색합니다.
+    나눠서 각색할 때는 앞 구간 각색 결과의 끝부분을 다음 구간의 시스템 프롬프트로 넘겨 흐름과 설정이 이어지게 합니다.
+    이어 붙인 각색 결과를 반환하며, 실패한 구간이 있으면 그 오류 문자열을 반환합니다.
+    """
+    empty_prompt = template.format(**{field: ""})
+    for candidate in dict.fromkeys(filter(None, (model_name, config.LLM_LONG_CONTEXT_MODEL))):
+        if token_budget.count_tokens(text, candidate) <= token_budget.input_budget(candidate, empty_prompt, output_ratio=1.0):
+            if candidate != model_name:
+                print(f"[DEBUG] 각색할 원본이 {model_name}의 토큰 한도를 넘어 {candidate}로 한 번에 각색합니다.")
+            return _safe_generate_openai(
+                user_prompt=template.format(**{field: text}), model_name=candidate, temperature=temperature,
+                stream=stream, caller=caller
+            )
+
+    long_model = config.LLM_LONG_CONTEXT_MODEL or model_name
+    tail_tokens = config.REWRITE_CONTEXT_TAIL_TOKENS
+    budget = max(256, token_budget.input_budget(long_model, empty_prompt + _REWRITE_CONTEXT_NOTE, output_ratio=1.0) - tail_tokens)
+    chunks = token_budget.split_text(text, budget, long_model)
+    print(f"[DEBUG] 각색할 원본이 {long_model}의 토큰 한도({budget})도 넘어 {len(chunks)}개 구간으로 나눠 순서대로 각색합니다.")
+
+    results, tail = [], ""
+    for part, chunk in enumerate(chunks):
+        result = _safe_generate_openai(
+            user_prompt=template.format(**{field: chunk}),
+            system_prompt=_REWRITE_CONTEXT_NOTE.format(tail=tail) if tail else None,
+            model_name=model_name, temperature=temperature,
+            stream=stream.for_part(part) if stream is not None else None, caller=caller
+        )
+        if result.startswith("⚠️"):
+            return result
+        results.append(result)
+        tail = token_budget.split_text(result, tail_tokens, long_model)[-1]
+    return "\n\n".join(results)
+
 def postprocess_script(text):
     processed_text = re.sub(r'(\n\s*){2,}', '\n\n', text).strip()
     lines = processed_text.split('\n')
@@ -159,7 +312,8 @@ def generate_planned_script(options):
         user_prompt=user_prompt,
         system_prompt=final_system_prompt,
         model_name=config.PREMIUM_MODEL, 
-        temperature=0.8
+        temperature=0.8,
+        caller='generate_planned_script'
     )
     
     if raw_response.startswith("⚠️"):
@@ -174,10 +328,73 @@ def generate_planned_script(options):
     return parsed_results
 
 
-def generate_trend_ideas():
-    current_date_str = datetime.now().strftime("%Y년 %m월 %d일")
+def _trend_pool_key(date_key):
+    return f"trend_pool:{date_key}"
+
+def get_trend_pool(date_key=None):
+    """미리 만들어 둔 날짜별 트렌드 주제 목록을 반환합니다. 없으면 None입니다."""
+    date_key = date_key or datetime.now().strftime("%Y-%m-%d")
+    client = redis_store.get_redis()
+    if client is not None:
+        try:
+            cached = client.get(_trend_pool_key(date_key))
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            print(f"[WARN] 트렌드 주제 풀 조회 실패: {e}")
+    return _local_trend_pool.get(date_key)
+
+def _save_trend_pool(date_key, topics):
+    client = redis_store.get_redis()
+    if client is not None:
+        try:
+            client.set(_trend_pool_key(date_key), json.dumps(topics, ensure_ascii=False), ex=config.TREND_POOL_TTL_SECONDS)
+            return
+        except Exception as e:
+            print(f"[WARN] 트렌드 주제 풀 저장 실패: {e}")
+    _local_trend_pool.clear()
+    _local_trend_pool[date_key] = topics
+
+@contextmanager
+def _trend_pool_build_lock(date_key):
+    """
+    날짜별 주제 풀을 한 곳에서만 만들도록 잠급니다. 잠금을 얻었으면 True, 다른 요청/작업이 만드는 중이면 False를 넘깁니다.
+    Redis에서는 SET NX 잠금(만료 TREND_POOL_LOCK_SECONDS초)을, Redis가 없으면 프로세스 내부 잠금을 사용합니다.
+    """
+    client = redis_store.get_redis()
+    if client is None:
+        with _local_trend_pool_lock:
+            yield True
+        return
+
+    lock_key, token = f"trend_pool_lock:{date_key}", uuid.uuid4().hex
+    try:
+        acquired = bool(client.set(lock_key, token, nx=True, ex=config.TREND_POOL_LOCK_SECONDS))
+    except Exception as e:
+        print(f"[WARN] 트렌드 주제 풀 잠금 실패, 잠금 없이 생성합니다: {e}")
+        yield True
+        return
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                print(f"[WARN] 트렌드 주제 풀 잠금 해제 실패 (만료 시 자동 해제): {e}")
+
+def _wait_for_trend_pool(date_key):
+    """다른 곳에서 만드는 중인 주제 풀이 저장될 때까지 기다립니다."""
+    deadline = time.time() + config.TREND_POOL_LOCK_SECONDS
+    while time.time() < deadline:
+        time.sleep(1)
+        topics = get_trend_pool(date_key)
+        if topics:
+            return topics
+    return "⚠️ 오늘의 트렌드 주제를 준비하고 있습니다. 잠시 후 다시 시도해주세요."
+
+def _generate_trend_categories(current_date_str):
     category_prompt = pt.TREND_CATEGORY_PROMPT.format(current_date=current_date_str)
-    raw_categories = _safe_generate_openai(user_prompt=category_prompt, model_name=config.STANDARD_MODEL, temperature=0.9)
+    raw_categories = _safe_generate_openai(user_prompt=category_prompt, model_name=config.STANDARD_MODEL, temperature=0.9, caller='build_trend_pool')
     
     if raw_categories.startswith("⚠️"):
         return raw_categories 
@@ -194,29 +411,66 @@ def generate_trend_ideas():
 
     if not categories:
         return "⚠️ AI가 트렌드 카테고리를 생성하는 데 실패했습니다."
+    return categories
 
-    all_topics = []
-    import random
-    selected_categories = random.sample(categories, min(len(categories), 3))
-
-    for category in selected_categories:
+def _generate_topics(categories):
+    """카테고리별 주제 생성 요청을 동시에 보내고, 카테고리 순서대로 주제를 모읍니다."""
+    def topics_for(category):
         topic_prompt = pt.TOPIC_WITHIN_CATEGORY_PROMPT.format(category=category)
-        raw_topics = _safe_generate_openai(user_prompt=topic_prompt, model_name=config.STANDARD_MODEL, temperature=0.8)
-        
+        return _safe_generate_openai(user_prompt=topic_prompt, model_name=config.STANDARD_MODEL, temperature=0.8, caller='build_trend_pool')
+
+    results = _map_concurrently(topics_for, categories, config.TREND_TOPIC_MAX_CONCURRENCY, 'trend_topics')
+
+    all_topics = []
+    for category, raw_topics in zip(categories, results):
         if raw_topics.startswith("⚠️"):
             print(f"[WARN] 카테고리 '{category}'의 주제 생성 실패: {raw_topics}")
             continue
         
         topics = [line.replace('-', '').strip() for line in raw_topics.strip().split('\n') if line.strip()]
         all_topics.extend(topics)
+    return all_topics
 
+def build_trend_pool(date=None):
+    """
+    해당 날짜의 트렌드 카테고리 전체에 대한 주제를 만들어 공유 저장소에 넣어둡니다.
+    하루 한 번(Celery beat 또는 그날의 첫 요청) 만들어 두면 이후 요청은 LLM 호출 없이 이 목록에서 뽑습니다.
+    여러 요청이 동시에 풀이 없는 것을 보더라도 한 곳만 만들고, 나머지는 만들어진 풀을 기다려 사용합니다.
+    반환값: 주제 목록 또는 "⚠️..." 오류 문자열
+    """
+    date = date or datetime.now()
+    date_key = date.strftime("%Y-%m-%d")
+    with _trend_pool_build_lock(date_key) as acquired:
+        if not acquired:
+            print(f"[DEBUG] 트렌드 주제 풀을 다른 곳에서 생성 중이므로 완료를 기다립니다: {date_key}")
+            return _wait_for_trend_pool(date_key)
+        # 잠금을 기다리는 사이 다른 곳에서 이미 만들었다면 그대로 사용합니다.
+        existing = get_trend_pool(date_key)
+        if existing:
+            return existing
+
+        categories = _generate_trend_categories(date.strftime("%Y년 %m월 %d일"))
+        if isinstance(categories, str):
+            return categories
+        all_topics = _generate_topics(categories)
+        if not all_topics:
+            return "⚠️ AI가 최종 주제를 생성하는 데 실패했습니다."
+        _save_trend_pool(date_key, all_topics)
+    print(f"[DEBUG] 트렌드 주제 풀 생성 완료: {date_key}, 카테고리 {len(categories)}개, 주제 {len(all_topics)}개")
+    return all_topics
+
+def generate_trend_ideas():
+    import random
+    all_topics = get_trend_pool()
     if not all_topics:
-        return "⚠️ AI가 최종 주제를 생성하는 데 실패했습니다."
+        all_topics = build_trend_pool()
+        if isinstance(all_topics, str):
+            return all_topics
 
     final_selection = random.sample(all_topics, min(len(all_topics), 5))
     return "\n".join(final_selection)
 
-def rewrite_script_v12(original_script, category='ssultoon'):
+def rewrite_script_v12(original_script, category='ssultoon', stream=None):
     if not original_script or not original_script.strip():
         return "⚠️ 각색할 원본 대본이 없습니다."
     
@@ -224,12 +478,13 @@ def rewrite_script_v12(original_script, category='ssultoon'):
     if not prompt_config:
         raise ValueError(f"'{category}'는 유효하지 않은 V12 각색 카테고리입니다.")
 
-    final_prompt = prompt_config['prompt'].format(script=original_script)
-
-    rewritten_script = _safe_generate_openai(
-        user_prompt=final_prompt, 
-        model_name=prompt_config['model'], 
-        temperature=prompt_config['temperature']
+    # 긴 원본은 긴 컨텍스트 모델로 한 번에 각색하고, 그래도 넘치면 나눠서 앞 구간의 흐름을 이어가며 순서대로 각색합니다.
+    rewritten_script = _rewrite_in_order(
+        prompt_config['prompt'], 'script', original_script,
+        model_name=prompt_config['model'],
+        temperature=prompt_config['temperature'],
+        stream=stream,
+        caller='rewrite_script_v12'
     )
     if rewritten_script.startswith("⚠️"):
         return f"V12 엔진 각색 실패: {rewritten_script}"
@@ -238,32 +493,33 @@ def rewrite_script_v12(original_script, category='ssultoon'):
     
     return final_script
 
-def rewrite_script_v13_safe(original_script, category='ssultoon'):
+def rewrite_script_v13_safe(original_script, category='ssultoon', stream=None):
     if not original_script or not original_script.strip():
         return {"error": "각색할 원본 대본이 없습니다."}
 
-    correction_user_prompt = pt.V13_CORRECTION_PROMPT.format(script=original_script)
-    
-    corrected_script = _safe_generate_openai(
-        user_prompt=correction_user_prompt,
+    # 교정에 실패한 구간은 원문 그대로 사용합니다.
+    correction_results = _generate_chunked(
+        pt.V13_CORRECTION_PROMPT, 'script', original_script,
         model_name=config.STANDARD_MODEL,
-        temperature=0.1
+        temperature=0.1,
+        cache=True,
+        stream=stream.for_stage('correction') if stream is not None else None,
+        caller='rewrite_script_v13_safe'
     )
-    
-    if corrected_script.startswith("⚠️"):
-        print(f"[WARN] V13 각색 1단계(교정) 실패: {corrected_script}. 원본 스크립트로 각색을 계속합니다.")
-        corrected_script = original_script
+    if any(result.startswith("⚠️") for _, result in correction_results):
+        print(f"[WARN] V13 각색 1단계(교정) 일부 구간 실패. 해당 구간은 원본 스크립트로 각색을 계속합니다.")
+    corrected_script = "\n".join(chunk if result.startswith("⚠️") else result for chunk, result in correction_results)
 
     prompt_config = pt.REWRITE_V13_SAFE_PROMPTS.get(category)
     if not prompt_config:
         return {"error": f"'{category}'는 지원하지 않는 V13 각색 카테고리입니다."}
 
-    final_user_prompt = prompt_config['prompt'].format(corrected_script=corrected_script)
-    
-    rewritten_script = _safe_generate_openai(
-        user_prompt=final_user_prompt, 
-        model_name=prompt_config['model'], 
-        temperature=prompt_config['temperature']
+    rewritten_script = _rewrite_in_order(
+        prompt_config['prompt'], 'corrected_script', corrected_script,
+        model_name=prompt_config['model'],
+        temperature=prompt_config['temperature'],
+        stream=stream.for_stage('rewrite') if stream is not None else None,
+        caller='rewrite_script_v13_safe'
     )
     
     if rewritten_script.startswith("⚠️"):
@@ -278,7 +534,7 @@ def rewrite_script_v13_safe(original_script, category='ssultoon'):
     }
 
 # ▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼ [핵심 수정 부분] ▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼▼
-def analyze_transcript(transcript_text):
+def analyze_transcript(transcript_text, stream=None):
     """
     영상 대본의 인기 요인을 분석하고 개선점을 제안합니다.
     AI가 항상 예측 가능한 구분 기호 '|||'를 포함한 답변을 생성하도록 수정합니다.
@@ -302,47 +558,82 @@ def analyze_transcript(transcript_text):
 {transcript_text}
 ---
 """
-    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.5)
+    # 더 긴 컨텍스트 모델로도 들어가지 않는 대본은 구간별 요약으로 줄여서 분석합니다.
+    prompt_tokens = token_budget.count_prompt_tokens(prompt, None, config.PREMIUM_MODEL)
+    if token_budget.route_model(config.PREMIUM_MODEL, prompt_tokens) is None:
+        print(f"[DEBUG] 분석할 대본이 너무 길어({prompt_tokens}토큰) 구간별 요약으로 줄여서 분석합니다.")
+        return analyze_transcript(summarize_script(transcript_text, reduce=False), stream=stream)
+    # 같은 대본으로 분석을 다시 실행하면 이전 결과를 그대로 사용합니다.
+    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.5, cache=True, stream=stream, caller='analyze_transcript')
 # ▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲
 
-def correct_transcript(transcript_text):
-    prompt = pt.CORRECTION_PROMPT.format(transcript_text=transcript_text)
-    result = _safe_generate_openai(user_prompt=prompt, model_name=config.STANDARD_MODEL, temperature=0.2)
-    if result.startswith("⚠️"):
-        return transcript_text
-    return result
+def correct_transcript(transcript_text, stream=None):
+    # 긴 대본은 토큰 한도에 맞춰 나눠 교정하며, 교정에 실패한 구간은 원문을 그대로 둡니다.
+    chunk_results = _generate_chunked(
+        pt.CORRECTION_PROMPT, 'transcript_text', transcript_text,
+        model_name=config.STANDARD_MODEL, temperature=0.2, cache=True, stream=stream,
+        caller='correct_transcript'
+    )
+    return "\n".join(chunk if result.startswith("⚠️") else result for chunk, result in chunk_results)
+
+def _summarize_chunks(chunks):
+    """부분 원본들을 동시에 요약합니다. 결과는 원래 순서를 유지하며, 실패한 구간은 제외됩니다."""
+    def summarize_chunk(chunk):
+        prompt = f"당신은 긴 글의 일부를 읽고 핵심만 요약하는 AI입니다. 다음 [부분 원본]을 2~3문장으로 요약해주세요.\n\n[부분 원본]\n{chunk}\n\n[부분 요약본]"
+        return _safe_generate_openai(user_prompt=prompt, model_name=config.FAST_MODEL, temperature=0.3, caller='summarize_script')
+
+    results = _map_concurrently(summarize_chunk, chunks, config.SUMMARY_MAX_CONCURRENCY, 'summarize')
 
-def summarize_script(script_text):
+    chunk_summaries = []
+    for i, chunk_summary in enumerate(results):
+        if chunk_summary.startswith("⚠️"):
+            print(f"[WARN] 요약 {i + 1}/{len(chunks)}번째 구간 실패: {chunk_summary}")
+            continue
+        chunk_summaries.append(chunk_summary)
+    return chunk_summaries
+
+def summarize_script(script_text, reduce=None):
+    """
+    긴 대본은 구간별로 나눠 동시에 요약(map)한 뒤, reduce=True이면 구간 요약들을 하나의 요약본으로 다시 합칩니다(reduce).
+    구간 수에는 제한이 없으며, 동시에 보내는 요청 수는 config.SUMMARY_MAX_CONCURRENCY로 제한됩니다.
+    """
     if not script_text or not script_text.strip():
         return ""
-    if len(script_text) <= 6000:
+    reduce = config.SUMMARY_REDUCE if reduce is None else reduce
+    chunk_tokens = config.SUMMARY_CHUNK_TOKENS
+    if token_budget.count_tokens(script_text, config.FAST_MODEL) <= chunk_tokens:
         prompt = f"주어진 [원본]의 핵심 내용을 유지하면서, 3~4 문장의 간결한 요약본으로 만들어주세요.\n\n[원본]\n{script_text}\n\n[요약본]"
-        summary = _safe_generate_openai(user_prompt=prompt, model_name=config.FAST_MODEL, temperature=0.3)
+        summary = _safe_generate_openai(user_prompt=prompt, model_name=config.FAST_MODEL, temperature=0.3, caller='summarize_script')
         return summary if not summary.startswith("⚠️") else script_text[:500]
-    chunk_size = 6000
-    chunks = [script_text[i:i+chunk_size] for i in range(0, len(script_text), chunk_size)][:5]
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        prompt = f"당신은 긴 글의 일부를 읽고 핵심만 요약하는 AI입니다. 다음 [부분 원본]을 2~3문장으로 요약해주세요.\n\n[부분 원본]\n{chunk}\n\n[부분 요약본]"
-        chunk_summary = _safe_generate_openai(user_prompt=prompt, model_name=config.FAST_MODEL, temperature=0.3)
-        if not chunk_summary.startswith("⚠️"):
-            chunk_summaries.append(chunk_summary)
+    chunks = token_budget.split_text(script_text, chunk_tokens, config.FAST_MODEL)
+    print(f"[DEBUG] 긴 대본 요약: {len(script_text)}자를 {len(chunks)}개 구간(구간당 최대 {chunk_tokens}토큰)으로 나눠 동시에 요약합니다.")
+    chunk_summaries = _summarize_chunks(chunks)
     if not chunk_summaries:
         return script_text[:500]
-    final_combined_summary = "\n".join(chunk_summaries)
-    return final_combined_summary
+    combined_summary = "\n".join(chunk_summaries)
+    if not reduce or len(chunk_summaries) == 1:
+        return combined_summary
+    if token_budget.count_tokens(combined_summary, config.FAST_MODEL) > chunk_tokens:
+        # 구간 요약을 합친 글도 너무 길면 같은 방식으로 한 번 더 줄입니다.
+        return summarize_script(combined_summary, reduce=True)
+    prompt = f"다음은 한 영상 대본을 앞에서부터 순서대로 나눠 요약한 [구간 요약]입니다. 흐름이 자연스럽게 이어지도록 전체 내용을 4~6 문장의 하나의 요약본으로 정리해주세요.\n\n[구간 요약]\n{combined_summary}\n\n[최종 요약본]"
+    final_summary = _safe_generate_openai(user_prompt=prompt, model_name=config.FAST_MODEL, temperature=0.3, caller='summarize_script')
+    if final_summary.startswith("⚠️"):
+        print(f"[WARN] 구간 요약 통합 실패, 구간 요약을 그대로 사용합니다: {final_summary}")
+        return combined_summary
+    return final_summary
 
 def create_content_pillars(main_topic):
     prompt = pt.CREATE_CONTENT_PILLARS_PROMPT.format(main_topic=main_topic)
-    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.8)
+    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.8, caller='create_content_pillars')
 
 def expand_pillar_topics(pillar_topic, existing_topics):
     prompt = pt.EXPAND_PILLAR_TOPICS_PROMPT.format(pillar_topic=pillar_topic, existing_topics=existing_topics)
-    return _safe_generate_openai(user_prompt=prompt, model_name=config.STANDARD_MODEL, temperature=0.9)
+    return _safe_generate_openai(user_prompt=prompt, model_name=config.STANDARD_MODEL, temperature=0.9, caller='expand_pillar_topics')
 
 def predict_script_performance(script):
     prompt = pt.PERFORMANCE_PREDICTION_PROMPT.format(script_text=script)
-    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.6)
+    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.6, caller='predict_script_performance')
 
 def generate_benchmark_report(channel_stats, top_video_titles, top_video_transcripts):
     prompt = pt.BENCHMARKING_REPORT_PROMPT.format(
@@ -350,7 +641,7 @@ def generate_benchmark_report(channel_stats, top_video_titles, top_video_transcr
         top_video_titles=top_video_titles,
         top_video_transcripts=top_video_transcripts
     )
-    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.5)
+    return _safe_generate_openai(user_prompt=prompt, model_name=config.PREMIUM_MODEL, temperature=0.5, caller='generate_benchmark_report')
 
 def analyze_single_video(video_id):
     from services.youtube_extractor import YouTubeDataExtractor
@@ -389,7 +680,7 @@ def get_absorption_strategy(competitor_video_id, my_channel_title, my_channel_de
             my_channel_description=my_channel_description
         )
         
-        strategy = _safe_generate_openai(prompt, model_name=config.PREMIUM_MODEL, temperature=0.6)
+        strategy = _safe_generate_openai(prompt, model_name=config.PREMIUM_MODEL, temperature=0.6, caller='get_absorption_strategy')
         
         if strategy.startswith("⚠️"):
             return {"error": strategy, "original_script": transcript_text}
@@ -402,22 +693,22 @@ def get_absorption_strategy(competitor_video_id, my_channel_title, my_channel_de
 def run_v4_engine(topic):
     try:
         analysis_prompt = pt.REWRITE_V4_STEP1_ANALYZE.format(original_script=topic)
-        analysis_report = _safe_generate_openai(user_prompt=analysis_prompt, model_name=config.PREMIUM_MODEL, temperature=0.3)
+        analysis_report = _safe_generate_openai(user_prompt=analysis_prompt, model_name=config.PREMIUM_MODEL, temperature=0.3, caller='run_v4_engine')
         if analysis_report.startswith("⚠️"):
             return {"error": f"1단계 주제 분석 실패: {analysis_report}"}
 
         draft_prompt = pt.REWRITE_V4_STEP2_DRAFT.format(analysis_report=analysis_report, original_script=topic)
-        draft_script = _safe_generate_openai(user_prompt=draft_prompt, model_name=config.PREMIUM_MODEL, temperature=0.7)
+        draft_script = _safe_generate_openai(user_prompt=draft_prompt, model_name=config.PREMIUM_MODEL, temperature=0.7, caller='run_v4_engine')
         if draft_script.startswith("⚠️"):
             return {"error": f"2단계 초안 작성 실패: {draft_script}"}
 
         revise_prompt = pt.REWRITE_V4_STEP3_REVISE.format(draft_script=draft_script, analysis_report=analysis_report)
-        final_script = _safe_generate_openai(user_prompt=revise_prompt, model_name=config.PREMIUM_MODEL, temperature=0.8)
+        final_script = _safe_generate_openai(user_prompt=revise_prompt, model_name=config.PREMIUM_MODEL, temperature=0.8, caller='run_v4_engine')
         if final_script.startswith("⚠️"):
             return {"error": f"3단계 대본 수정 실패: {final_script}"}
         
         guide_prompt = pt.REWRITE_V4_STEP4_GUIDE.format(final_script=final_script)
-        production_guide = _safe_generate_openai(user_prompt=guide_prompt, model_name=config.STANDARD_MODEL, temperature=0.5)
+        production_guide = _safe_generate_openai(user_prompt=guide_prompt, model_name=config.STANDARD_MODEL, temperature=0.5, caller='run_v4_engine')
         if production_guide.startswith("⚠️"):
             production_guide = "AI 제작 가이드를 생성하는 데 실패했습니다."
             
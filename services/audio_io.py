@@ -0,0 +1,56 @@
+# services/audio_io.py
+
+import os
+import subprocess
+import numpy as np
+
+# Whisper가 내부적으로 사용하는 입력 형식: 모노, 16kHz, float32
+SAMPLE_RATE = 16000
+
+# 이 길이(초)를 넘는 오디오는 메모리 대신 작업 임시 폴더의 스크래치 파일에 풀어서 memmap으로 읽습니다.
+MEMMAP_THRESHOLD_SECONDS = 20 * 60
+
+
+def _ffmpeg_decode_cmd(source_path, output, sample_rate, max_seconds=None):
+    limit = ['-t', str(max_seconds)] if max_seconds else []
+    return [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-threads', '0',
+        '-i', source_path,
+        *limit,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-acodec', 'pcm_f32le',
+        '-y', output,
+    ]
+
+
+def decode_audio(source_path, sample_rate=SAMPLE_RATE, scratch_dir=None, duration_hint=None, max_seconds=None):
+    """
+    내려받은 원본 오디오(m4a/webm 등)를 ffmpeg로 한 번만 디코딩해 Whisper용 float32 배열로 반환합니다.
+    mp3 재인코딩 과정 없이 model.transcribe()에 바로 넘길 수 있는 형태입니다.
+    긴 오디오이고 scratch_dir가 주어지면 스크래치 파일에 풀어 memmap으로 반환해 메모리 사용을 줄입니다.
+    max_seconds를 주면 앞부분 그 길이까지만 디코딩합니다.
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"디코딩할 오디오 파일이 없습니다: {source_path}")
+
+    if max_seconds and duration_hint:
+        duration_hint = min(duration_hint, max_seconds)
+    use_memmap = scratch_dir is not None and duration_hint is not None and duration_hint > MEMMAP_THRESHOLD_SECONDS
+
+    if use_memmap:
+        scratch_path = os.path.join(scratch_dir, 'audio_16k.f32')
+        result = subprocess.run(_ffmpeg_decode_cmd(source_path, scratch_path, sample_rate, max_seconds), capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg 오디오 디코딩 실패: {result.stderr.decode('utf-8', 'ignore').strip()}")
+        if os.path.getsize(scratch_path) == 0:
+            raise RuntimeError("ffmpeg 디코딩 결과가 비어 있습니다.")
+        # 'c'(copy-on-write) 모드: 디스크 파일은 건드리지 않으면서 torch가 요구하는 쓰기 가능한 배열로 취급됩니다.
+        return np.memmap(scratch_path, dtype=np.float32, mode='c')
+
+    result = subprocess.run(_ffmpeg_decode_cmd(source_path, 'pipe:1', sample_rate, max_seconds), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg 오디오 디코딩 실패: {result.stderr.decode('utf-8', 'ignore').strip()}")
+    if not result.stdout:
+        raise RuntimeError("ffmpeg 디코딩 결과가 비어 있습니다.")
+    return np.frombuffer(bytearray(result.stdout), dtype=np.float32)
@@ -0,0 +1,50 @@
+# services/channel_id_cache.py
+
+import threading
+import time
+import config
+from services import redis_store
+
+# 채널 식별자(@핸들, /c/ 맞춤 URL, /user/ 사용자명) → 채널 ID(UC...) 변환 결과 캐시입니다.
+# Redis에 저장해 웹 서버와 모든 Celery 워커가 공유하므로, 한 번 확인한 채널은 다시 API 할당량을 쓰지 않습니다.
+# (Redis에 연결할 수 없으면 프로세스 내부 딕셔너리로 대체됩니다.)
+
+_local_cache = {}
+_local_lock = threading.Lock()
+
+
+def _key(kind, value):
+    # 핸들과 사용자명은 대소문자를 구분하지 않습니다.
+    return f"yt_channel_id:{kind}:{value.lower()}"
+
+
+def get_channel_id(kind, value):
+    key = _key(kind, value)
+    client = redis_store.get_redis()
+    if client is not None:
+        try:
+            cached = client.get(key)
+            if cached:
+                return cached.decode() if isinstance(cached, bytes) else cached
+            return None
+        except Exception as e:
+            print(f"[WARN] 채널 ID 캐시 조회 실패: {e}")
+    with _local_lock:
+        entry = _local_cache.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+    return None
+
+
+def put_channel_id(kind, value, channel_id):
+    key = _key(kind, value)
+    ttl = config.CHANNEL_ID_CACHE_TTL_SECONDS
+    client = redis_store.get_redis()
+    if client is not None:
+        try:
+            client.set(key, channel_id, ex=ttl)
+            return
+        except Exception as e:
+            print(f"[WARN] 채널 ID 캐시 저장 실패: {e}")
+    with _local_lock:
+        _local_cache[key] = (channel_id, time.time() + ttl)
@@ -0,0 +1,108 @@
+# services/channel_snapshot.py
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from dateutil.parser import isoparse
+
+# 채널 분석 한 번에 필요한 YouTube 데이터(채널 통계, 업로드 목록, 영상별 통계/길이)를 한 번만 받아 담아두는 읽기 전용 객체입니다.
+# 수익 계산, 키워드 분석, 인기 영상, 채널 비교는 모두 같은 스냅샷을 읽으므로 같은 API 호출을 반복하지 않습니다.
+
+_DURATION_PATTERN = re.compile(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+
+
+def parse_duration_seconds(duration_str):
+    """ISO 8601 영상 길이(PT1H2M3S)를 초 단위로 변환합니다."""
+    match = _DURATION_PATTERN.match(duration_str or '')
+    if not match:
+        return 0
+    d, h, m, s = (int(g) if g else 0 for g in match.groups())
+    return d * 86400 + h * 3600 + m * 60 + s
+
+
+def is_short_video(video_item):
+    duration_str = (video_item.get('contentDetails') or {}).get('duration')
+    if duration_str and parse_duration_seconds(duration_str) <= 65:
+        return True
+    return '#shorts' in video_item.get('snippet', {}).get('title', '').lower()
+
+
+def compact_video_record(video_item):
+    """videos().list 응답 항목을 분석/화면에서 실제로 쓰는 값만 남긴 작은 딕셔너리로 바꿉니다."""
+    snippet = video_item.get('snippet', {})
+    statistics = video_item.get('statistics', {})
+    return {
+        'id': video_item['id'],
+        'title': snippet.get('title', ''),
+        'published_at': snippet.get('publishedAt'),
+        'duration_seconds': parse_duration_seconds((video_item.get('contentDetails') or {}).get('duration')),
+        'view_count': int(statistics.get('viewCount', 0)),
+        'like_count': int(statistics.get('likeCount', 0)),
+        'comment_count': int(statistics.get('commentCount', 0)),
+        'is_short': is_short_video(video_item),
+    }
+
+
+@dataclass(frozen=True)
+class ChannelSnapshot:
+    channel_id: str
+    channel_title: str
+    subscriber_count: int
+    uploads_playlist_id: str
+    # 'recent': 최근 90일 업로드 영상, 'popular': 최근 업로드가 없어 대신 가져온 역대 인기 영상
+    analysis_type: str
+    # videos().list 응답 항목(snippet, statistics, contentDetails) 목록입니다. 수정하지 말고 읽기만 합니다.
+    videos: tuple = ()
+    fetched_at: datetime = field(default_factory=datetime.now)
+
+    def view_count(self, video_item):
+        return int(video_item.get('statistics', {}).get('viewCount', 0))
+
+    def popular_videos(self, max_results=10):
+        """조회수 순 상위 영상 목록을 기존 get_popular_videos와 같은 형태({'id', 'title', 'view_count'})로 반환합니다."""
+        ranked = sorted(self.videos, key=self.view_count, reverse=True)
+        return [
+            {'id': v['id'], 'title': v.get('snippet', {}).get('title', ''), 'view_count': self.view_count(v)}
+            for v in ranked[:max_results]
+        ]
+
+    def to_channel_info(self):
+        """기존 extract_channel_info 결과와 같은 형태의 채널 요약 딕셔너리를 만듭니다."""
+        long_form_count, short_form_count, long_form_view_list, total_short_form_views, last_upload_date = 0, 0, [], 0, None
+        for video_item in self.videos:
+            published_at = isoparse(video_item['snippet']['publishedAt']).replace(tzinfo=None)
+            view_count = self.view_count(video_item)
+            if last_upload_date is None or published_at > last_upload_date: last_upload_date = published_at
+            if is_short_video(video_item):
+                short_form_count += 1
+                total_short_form_views += view_count
+            else:
+                long_form_count += 1
+                long_form_view_list.append(view_count)
+
+        if self.analysis_type == 'popular':
+            total_long_form_views_for_revenue = sum(long_form_view_list) * 10
+            total_short_form_views_for_revenue = total_short_form_views * 10
+            total_recent_views = sum(long_form_view_list) + total_short_form_views
+        else:
+            total_long_form_views_for_revenue = sum(long_form_view_list)
+            total_short_form_views_for_revenue = total_short_form_views
+            total_recent_views = total_long_form_views_for_revenue + total_short_form_views_for_revenue
+
+        avg_long_form_views = (sum(long_form_view_list) // long_form_count) if long_form_count > 0 else 0
+        avg_short_form_views = (total_short_form_views // short_form_count) if short_form_count > 0 else 0
+
+        return {
+            "channel_id": self.channel_id,
+            "channel_title": self.channel_title, "subscriber_count": f"{self.subscriber_count:,}",
+            "recent_3_month_views": f"{total_recent_views:,}",
+            "long_form_count": long_form_count, "short_form_count": short_form_count,
+            "last_upload_date": last_upload_date.strftime("%Y-%m-%d") if last_upload_date else '90일 내 활동 없음',
+            "avg_long_form_views": f"{avg_long_form_views:,}", "avg_short_form_views": f"{avg_short_form_views:,}",
+            "subscriber_count_raw": self.subscriber_count, "recent_3_month_views_raw": total_recent_views,
+            "avg_long_form_views_raw": avg_long_form_views, "avg_short_form_views_raw": avg_short_form_views,
+            "total_long_form_views_raw": total_long_form_views_for_revenue,
+            "total_short_form_views_raw": total_short_form_views_for_revenue,
+            "videos_data": [compact_video_record(v) for v in self.videos],
+            "analysis_type": self.analysis_type,
+        }
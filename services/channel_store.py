@@ -0,0 +1,124 @@
+# services/channel_store.py
+
+import os
+import json
+import threading
+from datetime import datetime
+from sqlalchemy import create_engine, select, delete, insert, update
+import config
+from models import ChannelRecord, ChannelVideo
+
+# 채널별 업로드 재생목록 ID, 이미 알고 있는 영상, 영상 통계와 마지막 갱신 시각을 보관하는 저장소입니다.
+# Celery 워커에는 Flask 앱 컨텍스트가 없으므로 models.py의 테이블 정의를 SQLAlchemy Core로 직접 사용합니다.
+# 재분석할 때는 새로 올라온 영상과 통계가 오래된 영상만 API로 다시 받아옵니다.
+
+_channels = ChannelRecord.__table__
+_videos = ChannelVideo.__table__
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def _get_engine():
+    global _engine, _engine_pid
+    pid = os.getpid()
+    if _engine is not None and _engine_pid == pid:
+        return _engine
+    with _engine_lock:
+        if _engine is None or _engine_pid != pid:
+            url = config.CHANNEL_STORE_DATABASE_URL
+            if url.startswith('sqlite:///'):
+                os.makedirs(os.path.dirname(os.path.abspath(url[len('sqlite:///'):])), exist_ok=True)
+            engine = create_engine(url, pool_pre_ping=True)
+            # 앱을 한 번도 실행하지 않은 환경에서도 동작하도록 두 테이블만 없으면 만듭니다.
+            ChannelRecord.metadata.create_all(engine, tables=[_channels, _videos], checkfirst=True)
+            _engine, _engine_pid = engine, pid
+    return _engine
+
+
+def get_channel(channel_id):
+    with _get_engine().connect() as conn:
+        row = conn.execute(select(_channels).where(_channels.c.channel_id == channel_id)).mappings().first()
+    return dict(row) if row else None
+
+
+def save_channel(channel_id, title, subscriber_count, uploads_playlist_id, channel_refreshed_at=None, playlist_synced_at=None):
+    values = {'title': title, 'subscriber_count': subscriber_count, 'uploads_playlist_id': uploads_playlist_id}
+    if channel_refreshed_at:
+        values['channel_refreshed_at'] = channel_refreshed_at
+    if playlist_synced_at:
+        values['playlist_synced_at'] = playlist_synced_at
+    with _get_engine().begin() as conn:
+        result = conn.execute(update(_channels).where(_channels.c.channel_id == channel_id).values(**values))
+        if result.rowcount == 0:
+            conn.execute(insert(_channels).values(channel_id=channel_id, **values))
+
+
+def known_video_ids(channel_id):
+    with _get_engine().connect() as conn:
+        return set(conn.execute(select(_videos.c.video_id).where(_videos.c.channel_id == channel_id)).scalars())
+
+
+def get_videos(channel_id, since=None):
+    """저장된 영상 목록을 [(video_item, stats_refreshed_at)] 형태로 최신 업로드 순으로 반환합니다."""
+    query = select(_videos.c.item_json, _videos.c.stats_refreshed_at).where(_videos.c.channel_id == channel_id)
+    if since is not None:
+        query = query.where(_videos.c.published_at >= since)
+    with _get_engine().connect() as conn:
+        rows = conn.execute(query.order_by(_videos.c.published_at.desc())).all()
+    return [(json.loads(item_json), refreshed_at) for item_json, refreshed_at in rows]
+
+
+def _dialect_insert(dialect_name):
+    """video_id 충돌 시 갱신하는 INSERT를 지원하는 방언이면 그 방언의 insert()를 반환합니다."""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def upsert_videos(channel_id, video_items, published_at_of, refreshed_at=None):
+    """videos().list 응답 항목들을 저장합니다. published_at_of는 항목에서 업로드 시각(datetime)을 구하는 함수입니다."""
+    if not video_items:
+        return
+    refreshed_at = refreshed_at or datetime.utcnow()
+    rows = [{
+        'video_id': item['id'],
+        'channel_id': channel_id,
+        'published_at': published_at_of(item),
+        'duration': (item.get('contentDetails') or {}).get('duration'),
+        'item_json': json.dumps(item, ensure_ascii=False),
+        'stats_refreshed_at': refreshed_at,
+    } for item in video_items]
+    engine = _get_engine()
+    dialect_insert = _dialect_insert(engine.dialect.name)
+    with engine.begin() as conn:
+        if dialect_insert is not None:
+            # 조회 후 INSERT/UPDATE를 나눠 보내지 않고, 한 문장으로 없으면 넣고 있으면 갱신합니다. (동시에 같은 영상을 저장해도 충돌하지 않습니다.)
+            stmt = dialect_insert(_videos)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['video_id'],
+                set_={name: stmt.excluded[name] for name in rows[0] if name != 'video_id'},
+            )
+            conn.execute(stmt, rows)
+            return
+        existing = set(conn.execute(
+            select(_videos.c.video_id).where(_videos.c.video_id.in_([row['video_id'] for row in rows]))
+        ).scalars())
+        for row in rows:
+            values = {k: v for k, v in row.items() if k != 'video_id'}
+            if row['video_id'] in existing:
+                conn.execute(update(_videos).where(_videos.c.video_id == row['video_id']).values(**values))
+            else:
+                conn.execute(insert(_videos).values(**row))
+
+
+def delete_videos(video_ids):
+    if not video_ids:
+        return
+    with _get_engine().begin() as conn:
+        conn.execute(delete(_videos).where(_videos.c.video_id.in_(list(video_ids))))
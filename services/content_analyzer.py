@@ -3,10 +3,41 @@
 from collections import Counter
 from konlpy.tag import Okt
 import re
+import threading
+
+_TITLE_CLEAN_PATTERN = re.compile('[^가-힣 ]')
+KOREAN_STOPWORDS = ['shorts', '유튜브', '영상', '이유', '방법', '사람', '공개', '추천', '리뷰', '구독', '좋아요', '알림', '설정', '뉴스']
+
+_okt_local = threading.local()
+
+def _get_okt():
+    # Okt 생성 비용이 커서 스레드마다 한 번만 만들어 재사용합니다. (채널 비교 작업은 여러 스레드에서 호출)
+    okt = getattr(_okt_local, 'okt', None)
+    if okt is None:
+        okt = _okt_local.okt = Okt()
+    return okt
+
+def extract_nouns(text, stopwords=KOREAN_STOPWORDS):
+    """한글만 남긴 텍스트에서 두 글자 이상, 불용어가 아닌 명사를 뽑습니다."""
+    cleaned = _TITLE_CLEAN_PATTERN.sub(' ', text or '')
+    return [noun for noun in _get_okt().nouns(cleaned) if len(noun) > 1 and noun.lower() not in stopwords]
+
+def count_keywords(texts, top_n=15, max_terms=5000, stopwords=KOREAN_STOPWORDS):
+    """
+    텍스트 iterable(제너레이터 가능)을 한 건씩 읽으며 명사 빈도를 셉니다.
+    서로 다른 명사가 max_terms개를 넘으면 빈도가 낮은 항목을 정리해 텍스트 양과 관계없이 메모리 사용량을 일정하게 유지합니다.
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(extract_nouns(text, stopwords))
+        if len(counts) > max_terms:
+            counts = Counter(dict(counts.most_common(max_terms // 2)))
+    return counts.most_common(top_n)
 
 def analyze_content_strategy(videos_data):
     """
     상세 비디오 목록을 받아 콘텐츠 전략을 분석합니다. (현재: 키워드 분석)
+    videos_data는 channel_snapshot.compact_video_record 형태({'id', 'title', 'view_count', ...})의 목록입니다.
     """
     if not videos_data:
         return {"error": "분석할 영상 데이터가 없습니다."}
@@ -17,7 +48,7 @@ def analyze_content_strategy(videos_data):
     try:
         sorted_videos = sorted(
             videos_data, 
-            key=lambda v: int(v.get('statistics', {}).get('viewCount', 0)), 
+            key=lambda v: int(v.get('view_count', 0)), 
             reverse=True
         )
 
@@ -29,24 +60,7 @@ def analyze_content_strategy(videos_data):
              analysis_result['top_keywords'] = {'error': '키워드를 분석할 영상이 부족합니다.'}
         else:
             print(f"[DEBUG] 콘텐츠 키워드 분석 시작. (대상 영상: {len(target_videos)}개)")
-            okt = Okt()
-            all_nouns = []
-            
-            title_clean_pattern = re.compile('[^가-힣 ]')
-            korean_stopwords = ['shorts', '유튜브', '영상', '이유', '방법', '사람', '공개', '추천', '리뷰', '구독', '좋아요', '알림', '설정', '뉴스']
-
-            for video in target_videos:
-                title = video.get('snippet', {}).get('title', '')
-                cleaned_title = title_clean_pattern.sub(' ', title)
-                nouns = okt.nouns(cleaned_title)
-                valuable_nouns = [noun for noun in nouns if len(noun) > 1 and noun.lower() not in korean_stopwords]
-                all_nouns.extend(valuable_nouns)
-            
-            if all_nouns:
-                keyword_counts = Counter(all_nouns)
-                analysis_result['top_keywords'] = keyword_counts.most_common(15)
-            else:
-                analysis_result['top_keywords'] = []
+            analysis_result['top_keywords'] = count_keywords(video.get('title', '') for video in target_videos)
             print(f"[DEBUG] 키워드 분석 완료. 상위 키워드: {analysis_result.get('top_keywords')}")
 
     except Exception as e:
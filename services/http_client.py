@@ -0,0 +1,176 @@
+# services/http_client.py
+
+import io
+import os
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import httpx
+import config
+
+# services/ 안의 모든 외부 HTTP 호출이 함께 쓰는 공용 클라이언트입니다.
+# - 프로세스마다 하나의 커넥션 풀(keep-alive)을 유지해 요청마다 TLS 핸드셰이크를 반복하지 않습니다.
+# - 연결/읽기 타임아웃을 명시해 멈춘 소켓 때문에 워커가 무한정 대기하지 않도록 합니다.
+# - 호스트별 동시 요청 수를 제한하고, 일시적 오류(429/5xx/연결 실패)는 지수 백오프로 재시도합니다.
+
+_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client = None
+_client_pid = None
+_api_client = None
+_api_client_pid = None
+_client_lock = threading.Lock()
+_host_semaphores = {}
+_host_lock = threading.Lock()
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+}
+
+
+def default_timeout(read=None):
+    read = config.HTTP_READ_TIMEOUT if read is None else read
+    return httpx.Timeout(connect=config.HTTP_CONNECT_TIMEOUT, read=read, write=read, pool=config.HTTP_CONNECT_TIMEOUT)
+
+
+def _build_client(headers):
+    # transport를 직접 넘기면 Client의 limits 인자는 무시되므로, 커넥션 풀 한도는 transport에 지정합니다.
+    return httpx.Client(
+        timeout=default_timeout(),
+        transport=httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+            retries=config.HTTP_MAX_RETRIES,  # 연결 단계 실패 재시도
+        ),
+        headers=headers,
+        follow_redirects=True,
+    )
+
+
+def get_client():
+    """현재 프로세스 전용 httpx.Client를 반환합니다. (Celery prefork로 fork된 뒤에는 새로 만듭니다.)"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = _build_client(DEFAULT_HEADERS)
+            _client_pid = pid
+    return _client
+
+
+def get_api_client():
+    """
+    OpenAI 등 API 호출용 httpx.Client입니다. 브라우저 User-Agent(DEFAULT_HEADERS)를 보내지 않도록 get_client()와 분리되어 있으며,
+    SDK가 자신의 헤더를 붙입니다. get_client()와 마찬가지로 프로세스마다 새로 만듭니다.
+    """
+    global _api_client, _api_client_pid
+    pid = os.getpid()
+    if _api_client is not None and _api_client_pid == pid:
+        return _api_client
+    with _client_lock:
+        if _api_client is None or _api_client_pid != pid:
+            _api_client = _build_client(None)
+            _api_client_pid = pid
+    return _api_client
+
+
+@contextmanager
+def host_slot(url):
+    """같은 호스트로 동시에 나가는 요청 수를 HTTP_PER_HOST_CONCURRENCY개로 제한합니다."""
+    host = urlsplit(url).netloc
+    with _host_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(config.HTTP_PER_HOST_CONCURRENCY)
+            _host_semaphores[host] = semaphore
+    with semaphore:
+        yield
+
+
+def _backoff(attempt):
+    return min(2 ** attempt, 10)
+
+
+class _ResponseStream(io.RawIOBase):
+    """httpx 스트리밍 응답을 파일 객체처럼 읽을 수 있게 감싸는 어댑터입니다. (read/readline/줄 단위 순회 지원)"""
+
+    def __init__(self, response):
+        self._chunks = response.iter_bytes()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+@contextmanager
+def stream(method, url, max_retries=None, **kwargs):
+    """
+    응답 본문을 스트리밍으로 읽는 요청입니다. 본문을 읽기 시작하기 전 단계의 일시적 오류만 재시도합니다.
+    with 블록 안에서 파일 객체(io.BufferedReader)를 돌려주므로 파서에 바로 넘길 수 있습니다.
+    """
+    max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    client = get_client()
+    yielded = False
+    with host_slot(url):
+        for attempt in range(max_retries + 1):
+            try:
+                with client.stream(method, url, **kwargs) as response:
+                    if response.status_code in _RETRY_STATUS_CODES and attempt < max_retries:
+                        print(f"[WARN] HTTP {response.status_code} 응답 ({url[:80]}...). {_backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+                    else:
+                        response.raise_for_status()
+                        yielded = True
+                        yield io.BufferedReader(_ResponseStream(response))
+                        return
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                # 본문을 읽던 도중의 오류는 이미 일부를 소비했으므로 재시도하지 않습니다.
+                if yielded or attempt >= max_retries:
+                    raise
+                print(f"[WARN] HTTP 스트리밍 요청 실패: {type(e).__name__}. {_backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+            time.sleep(_backoff(attempt))
+
+
+def build_google_http():
+    """
+    googleapiclient용 httplib2 객체입니다. 같은 객체를 재사용해 keep-alive 연결을 유지하고 타임아웃을 겁니다.
+    다른 외부 호출과 마찬가지로 호스트별 동시 요청 수를 제한하고, 일시적 오류(429/5xx/연결 실패)는 지수 백오프로 재시도합니다.
+    """
+    import httplib2
+
+    class _SharedPolicyHttp(httplib2.Http):
+        def request(self, uri, *args, **kwargs):
+            max_retries = config.HTTP_MAX_RETRIES
+            for attempt in range(max_retries + 1):
+                try:
+                    with host_slot(uri):
+                        response, content = super().request(uri, *args, **kwargs)
+                except (OSError, httplib2.HttpLib2Error) as e:
+                    if attempt >= max_retries:
+                        raise
+                    print(f"[WARN] Google API 요청 실패: {type(e).__name__}. {_backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+                    time.sleep(_backoff(attempt))
+                    continue
+                if response.status in _RETRY_STATUS_CODES and attempt < max_retries:
+                    print(f"[WARN] Google API {response.status} 응답. {_backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+                    time.sleep(_backoff(attempt))
+                    continue
+                return response, content
+
+    return _SharedPolicyHttp(timeout=config.HTTP_READ_TIMEOUT)
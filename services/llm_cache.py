@@ -0,0 +1,85 @@
+# services/llm_cache.py
+
+import hashlib
+import json
+import config
+from services import redis_store
+
+# 결정적인 결과가 필요한 LLM 호출(대본 교정·분석 등, 호출할 때 cache=True로 지정)의 응답 캐시입니다.
+# 같은 모델/temperature/프롬프트로 다시 호출하면(같은 대본의 교정·분석을 다시 실행하는 경우 등) API를 호출하지 않고 저장된 응답을 돌려줍니다.
+# 매번 다른 결과를 기대하는 생성 호출(아이디어, 각색 등)은 temperature가 낮더라도 캐시하지 않습니다.
+# Celery 브로커로 쓰는 Redis에 저장하며, Redis에 연결할 수 없으면 캐시 없이 동작합니다.
+# (응답이 클 수 있어 다른 캐시처럼 프로세스 내부 딕셔너리로 대체하지 않습니다.)
+
+_KEY_PREFIX = "llm_cache:"
+_STATS_KEY = "llm_cache_stats"
+
+
+def make_key(model_name, temperature, system_prompt, user_prompt):
+    payload = json.dumps([model_name, temperature, system_prompt or "", user_prompt], ensure_ascii=False)
+    return _KEY_PREFIX + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def should_cache(cache=False):
+    """캐시는 호출에서 cache=True로 지정한 경우에만 사용합니다."""
+    if not config.LLM_CACHE_ENABLED:
+        return False
+    return bool(cache)
+
+
+def _count(client, field):
+    try:
+        client.hincrby(_STATS_KEY, field, 1)
+    except Exception:
+        pass
+
+
+def get(key):
+    client = redis_store.get_redis()
+    if client is None:
+        return None
+    try:
+        cached = client.get(key)
+    except Exception as e:
+        print(f"[WARN] LLM 응답 캐시 조회 실패: {e}")
+        return None
+    _count(client, 'hits' if cached else 'misses')
+    if not cached:
+        return None
+    return cached.decode('utf-8') if isinstance(cached, bytes) else cached
+
+
+def put(key, response_text):
+    client = redis_store.get_redis()
+    if client is None:
+        return
+    data = response_text.encode('utf-8')
+    if len(data) > config.LLM_CACHE_MAX_ENTRY_BYTES:
+        _count(client, 'skipped_too_large')
+        return
+    try:
+        client.set(key, data, ex=config.LLM_CACHE_TTL_SECONDS)
+        _count(client, 'stores')
+    except Exception as e:
+        print(f"[WARN] LLM 응답 캐시 저장 실패: {e}")
+
+
+def get_cache_report():
+    """적중/미적중 횟수와 적중률을 반환합니다."""
+    client = redis_store.get_redis()
+    if client is None:
+        return {'available': False}
+    try:
+        raw = client.hgetall(_STATS_KEY)
+    except Exception as e:
+        return {'available': False, 'error': str(e)}
+    stats = {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+    hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+    return {
+        'available': True,
+        'hits': hits,
+        'misses': misses,
+        'stores': stats.get('stores', 0),
+        'skipped_too_large': stats.get('skipped_too_large', 0),
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
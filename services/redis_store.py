@@ -0,0 +1,39 @@
+# services/redis_store.py
+
+import os
+import time
+import redis
+
+# Celery 브로커로 이미 사용 중인 Redis를 서비스 계층의 공유 저장소로도 사용합니다.
+# Redis에 연결할 수 없으면 None을 반환하며, 호출하는 쪽은 프로세스 내부 저장소로 대체해야 합니다.
+
+_client = None
+_client_pid = None
+_unavailable_logged = False
+_retry_after = 0.0
+
+# 연결 실패 후 이 시간(초) 동안은 다시 연결을 시도하지 않습니다. (매 호출마다 타임아웃을 기다리지 않도록)
+_RETRY_INTERVAL_SECONDS = 30
+
+
+def get_redis():
+    global _client, _client_pid, _unavailable_logged, _retry_after
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+    if time.time() < _retry_after:
+        return None
+
+    url = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+    try:
+        client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=5, health_check_interval=30)
+        client.ping()
+    except Exception as e:
+        if not _unavailable_logged:
+            print(f"[WARN] Redis 연결 실패, 프로세스 내부 저장소로 대체합니다: {e}")
+            _unavailable_logged = True
+        _retry_after = time.time() + _RETRY_INTERVAL_SECONDS
+        return None
+
+    _client = client
+    _client_pid = os.getpid()
+    return _client
@@ -0,0 +1,119 @@
+# services/stream_bus.py
+
+import json
+import time
+import config
+from services import redis_store
+
+# Celery 작업의 진행 상황과 LLM 부분 출력을 브라우저로 실시간 전달하기 위한 Redis pub/sub 통로입니다.
+# 작업은 publish()로 이벤트를 보내고, 웹 서버의 SSE 라우트는 iter_events()로 받아 그대로 전달합니다.
+# 브라우저가 작업 시작 후에 연결해도 놓친 이벤트를 받을 수 있도록 이벤트는 작업별 목록에도 잠시 보관합니다.
+# (Redis에 연결할 수 없으면 이벤트는 버려지고, SSE 라우트는 Celery 작업 상태만으로 완료/실패를 알립니다.)
+
+
+def _channel(job_id):
+    return f"task_stream:{job_id}"
+
+
+def _log_key(job_id):
+    return f"task_stream_log:{job_id}"
+
+
+def _seq_key(job_id):
+    return f"task_stream_seq:{job_id}"
+
+
+def publish(job_id, event_type, **fields):
+    """{'type': event_type, 'seq': 순번, **fields} 이벤트를 보냅니다. 순번은 재전송된 이벤트를 걸러내는 데 사용됩니다."""
+    if not job_id:
+        return
+    client = redis_store.get_redis()
+    if client is None:
+        return
+    try:
+        seq = client.incr(_seq_key(job_id))
+        event = json.dumps({'type': event_type, 'seq': seq, **fields}, ensure_ascii=False)
+        pipe = client.pipeline()
+        pipe.rpush(_log_key(job_id), event)
+        pipe.ltrim(_log_key(job_id), -config.STREAM_LOG_MAX_EVENTS, -1)
+        pipe.expire(_log_key(job_id), config.STREAM_LOG_TTL_SECONDS)
+        pipe.expire(_seq_key(job_id), config.STREAM_LOG_TTL_SECONDS)
+        pipe.publish(_channel(job_id), event)
+        pipe.execute()
+    except Exception as e:
+        print(f"[WARN] 작업 스트림 이벤트 전송 실패: {e}")
+
+
+class TokenStream:
+    """
+    _safe_generate_openai(stream=...)에 넘기는 부분 출력 전달 객체입니다.
+    토큰마다 이벤트를 보내지 않고 config.STREAM_FLUSH_CHARS 글자 또는 config.STREAM_FLUSH_SECONDS초마다 모아서 'delta' 이벤트로 보냅니다.
+    stage는 어느 단계의 출력인지('correction', 'analysis', 'rewrite' 등), part는 긴 입력을 나눠 처리할 때의 구간 번호입니다.
+    """
+
+    def __init__(self, job_id, stage, part=0):
+        self.job_id = job_id
+        self.stage = stage
+        self.part = part
+        self._buffer = []
+        self._buffered_chars = 0
+        self._last_flush = time.monotonic()
+
+    def for_part(self, part):
+        return TokenStream(self.job_id, self.stage, part)
+
+    def for_stage(self, stage):
+        return TokenStream(self.job_id, stage)
+
+    def write(self, text):
+        if not text:
+            return
+        self._buffer.append(text)
+        self._buffered_chars += len(text)
+        if self._buffered_chars >= config.STREAM_FLUSH_CHARS or time.monotonic() - self._last_flush >= config.STREAM_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            publish(self.job_id, 'delta', stage=self.stage, part=self.part, text="".join(self._buffer))
+        self._buffer, self._buffered_chars = [], 0
+        self._last_flush = time.monotonic()
+
+    def reset(self):
+        """재시도로 응답을 처음부터 다시 받을 때, 이미 보낸 부분 출력을 지우도록 알립니다."""
+        self._buffer, self._buffered_chars = [], 0
+        publish(self.job_id, 'reset', stage=self.stage, part=self.part)
+
+
+def iter_events(job_id, poll_seconds=1.0):
+    """
+    작업의 이벤트를 딕셔너리로 차례대로 돌려주는 제너레이터입니다. 먼저 보관된 이벤트를 보내고, 이후 새 이벤트를 기다립니다.
+    poll_seconds 동안 새 이벤트가 없으면 None을 돌려주므로, 호출하는 쪽은 그때 작업 상태 확인이나 연결 유지 신호를 보내면 됩니다.
+    """
+    client = redis_store.get_redis()
+    if client is None:
+        while True:
+            time.sleep(poll_seconds)
+            yield None
+
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        # 구독을 먼저 시작한 뒤 보관된 이벤트를 읽어야 그 사이에 발행된 이벤트를 놓치지 않습니다. (중복은 순번으로 거릅니다.)
+        pubsub.subscribe(_channel(job_id))
+        last_seq = 0
+        for raw in client.lrange(_log_key(job_id), 0, -1):
+            event = json.loads(raw)
+            last_seq = max(last_seq, event.get('seq', 0))
+            yield event
+        while True:
+            message = pubsub.get_message(timeout=poll_seconds)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message['data'])
+            if event.get('seq', 0) <= last_seq:
+                continue
+            last_seq = event['seq']
+            yield event
+    finally:
+        pubsub.close()
@@ -0,0 +1,259 @@
+# services/subtitle_parser.py
+
+import io
+import re
+import html
+import json
+import xml.etree.ElementTree as ET
+from array import array
+import config
+
+# 자막 파일을 응답 스트림에서 한 줄씩 읽어 바로 처리하는 파서입니다.
+# 파싱 결과는 CueStore에 담기며, 문장 텍스트는 하나의 버퍼에, 시작/종료 시각은 array('d')에 저장됩니다.
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_TIMING_PATTERN = re.compile(r'((?:\d+:)?\d{1,2}:\d{2}[.,]\d{3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{3})')
+
+
+class CueStore:
+    """자막 구간(cue) 목록을 파이썬 객체 대신 배열 기반으로 가볍게 보관합니다."""
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self._offsets = array('L', [0])  # i번째 cue 텍스트 = buffer[_offsets[i]:_offsets[i + 1]]
+        self._buffer = io.StringIO()
+        self._text_cache = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start, end, text):
+        self.starts.append(start)
+        self.ends.append(end)
+        self._buffer.write(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._text_cache = None
+
+    def _value(self):
+        if self._text_cache is None:
+            self._text_cache = self._buffer.getvalue()
+        return self._text_cache
+
+    def cue(self, index):
+        value = self._value()
+        return self.starts[index], self.ends[index], value[self._offsets[index]:self._offsets[index + 1]].strip()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.cue(i)
+
+    def text(self, sep=" "):
+        value = self._value()
+        parts = (value[self._offsets[i]:self._offsets[i + 1]].strip() for i in range(len(self)))
+        return sep.join(p for p in parts if p)
+
+    def duration(self):
+        return self.ends[-1] if len(self) else 0.0
+
+
+def parse_timestamp(value):
+    parts = value.replace(',', '.').split(':')
+    seconds = float(parts[-1])
+    minutes = int(parts[-2]) if len(parts) >= 2 else 0
+    hours = int(parts[-3]) if len(parts) >= 3 else 0
+    return hours * 3600 + minutes * 60 + seconds
+
+
+class RollingCaptionDeduper:
+    """
+    유튜브 자동 자막은 직전 줄을 다음 cue에 다시 싣는 '롤링' 방식이라 같은 문장이 여러 번 반복됩니다.
+    새 줄의 앞부분이 이미 내보낸 텍스트의 끝부분과 겹치면 겹치지 않는 뒷부분만 남깁니다.
+    """
+
+    def __init__(self, window_words=60):
+        self.window_words = window_words
+        self._recent = []
+
+    def feed(self, line):
+        words = line.split()
+        if not words:
+            return ""
+        recent = self._recent
+        overlap = 0
+        for size in range(min(len(recent), len(words)), 0, -1):
+            if recent[-size:] == words[:size]:
+                overlap = size
+                break
+        # 한 단어만 우연히 겹치는 경우("네 네")는 실제 반복일 수 있으므로, 줄 전체가 같을 때만 버립니다.
+        if overlap == 1 and len(words) > 1:
+            overlap = 0
+        new_words = words[overlap:]
+        if not new_words:
+            return ""
+        recent.extend(new_words)
+        if len(recent) > self.window_words:
+            del recent[:-self.window_words]
+        return " ".join(new_words)
+
+
+def _iter_text_lines(stream, encoding='utf-8'):
+    for raw in stream:
+        if isinstance(raw, bytes):
+            raw = raw.decode(encoding, 'ignore')
+        yield raw.rstrip('\r\n').lstrip('\ufeff')
+
+
+def parse_vtt(stream, dedupe=True):
+    """
+    WebVTT 응답 스트림(바이트/문자열 줄 단위 iterable)을 읽어 CueStore로 변환합니다.
+    전체 본문을 메모리에 올리지 않고 cue 하나가 끝날 때마다 바로 처리합니다.
+    """
+    store = CueStore()
+    deduper = RollingCaptionDeduper() if dedupe else None
+    timing = None
+    text_lines = []
+    skipping_block = False
+
+    def flush():
+        if timing is None:
+            return
+        start, end = timing
+        pieces = []
+        for line in text_lines:
+            clean = html.unescape(_TAG_PATTERN.sub('', line)).strip()
+            if not clean:
+                continue
+            if deduper is not None:
+                clean = deduper.feed(clean)
+            if clean:
+                pieces.append(clean)
+        if pieces:
+            store.append(start, end, " ".join(pieces))
+
+    for line in _iter_text_lines(stream):
+        # cue는 완전히 빈 줄에서만 끝납니다. 공백만 있는 줄(유튜브 자동 자막의 ' ' 줄 등)은 cue 본문의 일부로 취급합니다.
+        if line == '':
+            flush()
+            timing, text_lines, skipping_block = None, [], False
+            continue
+        if skipping_block:
+            continue
+        stripped = line.strip()
+        if timing is None:
+            match = _TIMING_PATTERN.search(stripped)
+            if match:
+                timing = (parse_timestamp(match.group(1)), parse_timestamp(match.group(2)))
+            elif stripped.startswith(('NOTE', 'STYLE', 'REGION')):
+                skipping_block = True
+            # 헤더(WEBVTT, Kind:, Language:)와 cue 식별자 줄은 타이밍 줄이 나오기 전까지 무시합니다.
+            continue
+        text_lines.append(stripped)
+    flush()
+    return store
+
+
+def parse_json3(stream):
+    """
+    유튜브 json3 자막을 CueStore로 변환합니다.
+    json3는 단어 단위 세그먼트가 한 번씩만 들어 있어 VTT처럼 롤링 중복 제거를 할 필요가 없습니다.
+    """
+    if hasattr(stream, 'read'):
+        data = json.load(stream)
+    else:
+        data = json.loads(b"".join(stream) if not isinstance(stream, str) else stream)
+
+    store = CueStore()
+    for event in data.get('events', []):
+        segs = event.get('segs')
+        if not segs:
+            continue
+        text = " ".join("".join(seg.get('utf8', '') for seg in segs).split())
+        if not text:
+            continue
+        start = event.get('tStartMs', 0) / 1000.0
+        end = start + event.get('dDurationMs', 0) / 1000.0
+        store.append(start, end, text)
+    return store
+
+
+def parse_srv3(stream):
+    """유튜브 srv3(XML) 자막을 <p> 요소 단위로 스트리밍 파싱합니다."""
+    store = CueStore()
+    for _, elem in ET.iterparse(stream, events=('end',)):
+        if elem.tag != 'p':
+            continue
+        text = " ".join("".join(elem.itertext()).split())
+        if text:
+            start = int(elem.get('t', 0)) / 1000.0
+            end = start + int(elem.get('d', 0)) / 1000.0
+            store.append(start, end, text)
+        elem.clear()
+    return store
+
+
+_PARSERS = {
+    'json3': parse_json3,
+    'srv3': parse_srv3,
+    'vtt': parse_vtt,
+}
+
+
+def parse_subtitle(stream, ext):
+    parser = _PARSERS.get(ext)
+    if parser is None:
+        raise ValueError(f"지원하지 않는 자막 형식입니다: {ext}")
+    return parser(stream)
+
+
+def _match_language(tracks, languages):
+    for lang in languages:
+        if tracks.get(lang):
+            return lang
+    # ko-KR, ko-Hang 처럼 지역/문자 코드가 붙은 트랙도 같은 언어로 인정합니다.
+    base_languages = {lang.split('-')[0] for lang in languages}
+    for lang, formats in tracks.items():
+        if formats and lang.split('-')[0] in base_languages:
+            return lang
+    return None
+
+
+def _pick_format(formats, format_preference):
+    for ext in format_preference:
+        for fmt in formats:
+            if fmt.get('ext') == ext and fmt.get('url'):
+                return fmt
+    return None
+
+
+def resolve_subtitle_track(info_dict, languages=None, format_preference=None, allow_other_languages=None):
+    """
+    info_dict의 자막 목록에서 사용할 트랙 하나를 고릅니다.
+    우선순위: 수동 자막(선호 언어) → 자동 자막(선호 언어, 자동 번역 포함) → 다른 언어 수동 자막 → 다른 언어 자동 자막 원본
+    반환값: {'language', 'kind', 'ext', 'url'} 또는 None
+    """
+    languages = languages or config.SUBTITLE_LANGUAGE_PREFERENCE
+    format_preference = format_preference or config.SUBTITLE_FORMAT_PREFERENCE
+    if allow_other_languages is None:
+        allow_other_languages = config.SUBTITLE_ALLOW_OTHER_LANGUAGES
+
+    manual = info_dict.get('subtitles') or {}
+    automatic = info_dict.get('automatic_captions') or {}
+
+    candidates = [
+        ('manual', manual, _match_language(manual, languages)),
+        ('automatic', automatic, _match_language(automatic, languages)),
+    ]
+    if allow_other_languages:
+        other_manual = next((lang for lang, formats in manual.items() if formats and lang != 'live_chat'), None)
+        original_auto = next((lang for lang in automatic if lang.endswith('-orig')), None)
+        candidates.append(('manual', manual, other_manual))
+        candidates.append(('automatic', automatic, original_auto))
+
+    for kind, tracks, lang in candidates:
+        if not lang:
+            continue
+        fmt = _pick_format(tracks[lang], format_preference)
+        if fmt:
+            return {'language': lang, 'kind': kind, 'ext': fmt['ext'], 'url': fmt['url']}
+    return None
@@ -0,0 +1,179 @@
+# services/token_budget.py
+
+import re
+import threading
+from datetime import datetime
+import config
+from services import redis_store
+
+# LLM 프롬프트 토큰 수 계산과 분할 도구입니다.
+# 요청을 보내기 전에 tiktoken으로 토큰 수를 세어 모델의 컨텍스트 한도를 넘는지 확인하고,
+# 긴 입력은 문장 경계에서 토큰 한도 이내의 구간으로 나눕니다. (한국어는 글자 수와 토큰 수의 비율이 일정하지 않습니다.)
+# 호출별 입력/출력 토큰 수는 Redis에 날짜·모델별로 누적합니다.
+
+# 메시지마다 붙는 역할/구분 토큰 (OpenAI 문서 기준 근사값)
+_TOKENS_PER_MESSAGE = 4
+_TOKENS_PER_REPLY = 3
+_SENTENCE_PATTERN = re.compile(r'((?<=[.!?。])\s+|\n+)')
+
+_encodings = {}
+_encoding_lock = threading.Lock()
+_fallback_logged = False
+
+
+def _get_encoding(model_name):
+    global _fallback_logged
+    encoding = _encodings.get(model_name)
+    if encoding is not None:
+        return encoding
+    with _encoding_lock:
+        if model_name in _encodings:
+            return _encodings[model_name]
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # 인코딩 파일을 내려받을 수 없는 환경 등에서는 글자 종류별 추정치로 대체합니다.
+            if not _fallback_logged:
+                print(f"[WARN] tiktoken 인코딩을 불러오지 못해 추정치로 토큰 수를 계산합니다: {e}")
+                _fallback_logged = True
+            encoding = False
+        _encodings[model_name] = encoding
+    return encoding
+
+
+def count_tokens(text, model_name):
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding:
+        return len(encoding.encode(text))
+    # 영문/숫자는 약 4자당 1토큰, 한글 등 그 외 문자는 약 1자당 1토큰으로 넉넉하게 추정합니다.
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def count_prompt_tokens(user_prompt, system_prompt, model_name):
+    total = _TOKENS_PER_REPLY + _TOKENS_PER_MESSAGE + count_tokens(user_prompt, model_name)
+    if system_prompt:
+        total += _TOKENS_PER_MESSAGE + count_tokens(system_prompt, model_name)
+    return total
+
+
+def context_window(model_name):
+    for prefix, window in sorted(config.LLM_CONTEXT_WINDOWS.items(), key=lambda kv: -len(kv[0])):
+        if model_name.startswith(prefix):
+            return window
+    return config.LLM_DEFAULT_CONTEXT_WINDOW
+
+
+def route_model(model_name, prompt_tokens, completion_reserve=None):
+    """
+    프롬프트와 응답 여유분이 들어가는 모델 이름을 반환합니다.
+    원래 모델에 들어가지 않으면 config.LLM_LONG_CONTEXT_MODEL로 바꾸고, 그래도 넘치면 None을 반환합니다.
+    """
+    completion_reserve = config.LLM_COMPLETION_RESERVE_TOKENS if completion_reserve is None else completion_reserve
+    for candidate in (model_name, config.LLM_LONG_CONTEXT_MODEL):
+        if candidate and prompt_tokens + completion_reserve <= context_window(candidate):
+            return candidate
+    return None
+
+
+def input_budget(model_name, template_text="", output_ratio=0.0):
+    """
+    template_text(입력을 넣기 전 프롬프트)와 함께 보낼 수 있는 입력 토큰 수입니다.
+    교정/각색처럼 응답 길이가 입력에 비례하는 작업은 output_ratio(입력 대비 응답 토큰 비율)만큼 응답 자리를 남깁니다.
+    """
+    available = (
+        context_window(model_name)
+        - count_prompt_tokens(template_text, None, model_name)
+        - config.LLM_COMPLETION_RESERVE_TOKENS
+    )
+    budget = available / (1 + output_ratio)
+    if output_ratio:
+        # 응답 한 번에 만들 수 있는 토큰 수도 모델마다 제한되어 있습니다.
+        budget = min(budget, config.LLM_MAX_OUTPUT_TOKENS / output_ratio)
+    return max(int(budget), 256)
+
+
+def split_text(text, max_tokens, model_name):
+    """문장(또는 줄) 경계에서 max_tokens 이하의 구간들로 나눕니다. 한 문장이 한도를 넘으면 그 문장만 토큰 단위로 자릅니다."""
+    # split 결과는 [문장, 구분자, 문장, 구분자, ...] 순서이며, 구분자(줄바꿈 등)는 앞 문장에 붙여 원문 형태를 유지합니다.
+    parts = _SENTENCE_PATTERN.split(text)
+    sentences = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        chunk = "".join(current).strip()
+        if chunk:
+            chunks.append(chunk)
+
+    for sentence in sentences:
+        if not sentence.strip():
+            continue
+        sentence_tokens = count_tokens(sentence, model_name)
+        if sentence_tokens > max_tokens:
+            flush()
+            current, current_tokens = [], 0
+            chunks.extend(_split_long_sentence(sentence.strip(), max_tokens, model_name))
+            continue
+        if current_tokens + sentence_tokens > max_tokens:
+            flush()
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += sentence_tokens
+    flush()
+    return chunks
+
+
+def _split_long_sentence(sentence, max_tokens, model_name):
+    encoding = _get_encoding(model_name)
+    if encoding:
+        tokens = encoding.encode(sentence)
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+    return [sentence[i:i + max_tokens] for i in range(0, len(sentence), max_tokens)]
+
+
+def record_usage(model_name, prompt_tokens, completion_tokens, caller=None):
+    """호출 한 건의 입력/출력 토큰 수를 날짜·모델별(그리고 호출한 함수별)로 누적합니다."""
+    print(f"[DEBUG] LLM 토큰 사용량: model={model_name}, prompt={prompt_tokens}, completion={completion_tokens}, caller={caller}")
+    client = redis_store.get_redis()
+    if client is None:
+        return
+    key = f"llm_usage:{datetime.now().strftime('%Y-%m-%d')}"
+    try:
+        pipe = client.pipeline()
+        pipe.hincrby(key, f"{model_name}:calls", 1)
+        pipe.hincrby(key, f"{model_name}:prompt_tokens", prompt_tokens or 0)
+        pipe.hincrby(key, f"{model_name}:completion_tokens", completion_tokens or 0)
+        if caller:
+            pipe.hincrby(key, f"caller:{caller}:prompt_tokens", prompt_tokens or 0)
+            pipe.hincrby(key, f"caller:{caller}:completion_tokens", completion_tokens or 0)
+        pipe.expire(key, 60 * 60 * 24 * 35)
+        pipe.execute()
+    except Exception as e:
+        print(f"[WARN] LLM 토큰 사용량 기록 실패: {e}")
+
+
+def get_usage_report(date_key=None):
+    date_key = date_key or datetime.now().strftime('%Y-%m-%d')
+    client = redis_store.get_redis()
+    if client is None:
+        return {'date': date_key, 'available': False}
+    try:
+        raw = client.hgetall(f"llm_usage:{date_key}")
+    except Exception as e:
+        return {'date': date_key, 'available': False, 'error': str(e)}
+    models, callers = {}, {}
+    for field, value in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        if field.startswith('caller:'):
+            _, caller, metric = field.split(':', 2)
+            callers.setdefault(caller, {})[metric] = int(value)
+        else:
+            model_name, metric = field.rsplit(':', 1)
+            models.setdefault(model_name, {})[metric] = int(value)
+    return {'date': date_key, 'available': True, 'models': models, 'callers': callers}
@@ -0,0 +1,132 @@
+# services/transcript_cache.py
+
+import os
+import json
+import sqlite3
+import time
+import config
+
+# 영상 대본 영구 캐시입니다.
+# (video_id, source) 단위로 저장하며, source는 'subtitle' 또는 'whisper:<모델명>' 형태입니다.
+# 웹 서버와 모든 Celery 워커가 같은 SQLite 파일을 공유하므로 한 번 추출한 대본은 어디서든 재사용됩니다.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    transcript TEXT NOT NULL,
+    metadata TEXT,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, source)
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_last_accessed ON transcripts (last_accessed_at);
+"""
+
+_initialized_paths = set()
+
+
+def _connect():
+    path = config.TRANSCRIPT_CACHE_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if path not in _initialized_paths:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialized_paths.add(path)
+    return conn
+
+
+def get_transcript(video_id, sources=None, ttl_seconds=None):
+    """
+    캐시된 대본을 찾아 반환합니다. 없거나 만료되었으면 None을 반환합니다.
+    sources를 주면 해당 추출 방식의 대본만, 주어진 순서대로 우선 찾습니다.
+    """
+    if not video_id:
+        return None
+    ttl_seconds = config.TRANSCRIPT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    now = time.time()
+
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT source, transcript, metadata, created_at FROM transcripts WHERE video_id = ? AND created_at >= ? ORDER BY created_at DESC",
+                (video_id, now - ttl_seconds)
+            ).fetchall()
+            if sources:
+                rows = sorted((r for r in rows if r[0] in sources), key=lambda r: sources.index(r[0]))
+            if not rows:
+                return None
+
+            source, transcript, metadata, created_at = rows[0]
+            with conn:
+                conn.execute("UPDATE transcripts SET last_accessed_at = ? WHERE video_id = ? AND source = ?", (now, video_id, source))
+            return {
+                'video_id': video_id,
+                'source': source,
+                'transcript': transcript,
+                'metadata': json.loads(metadata) if metadata else {},
+                'created_at': created_at,
+            }
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARN] 대본 캐시 조회 실패 ({video_id}): {e}")
+        return None
+
+
+def put_transcript(video_id, source, transcript, metadata=None):
+    """대본을 저장하고, 전체 크기가 한도를 넘으면 가장 오래 사용되지 않은 항목부터 정리합니다."""
+    if not video_id or not transcript:
+        return
+    now = time.time()
+    metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
+    size_bytes = len(transcript.encode('utf-8')) + len(metadata_json.encode('utf-8'))
+
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts (video_id, source, transcript, metadata, size_bytes, created_at, last_accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (video_id, source, transcript, metadata_json, size_bytes, now, now)
+                )
+            _evict(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[WARN] 대본 캐시 저장 실패 ({video_id}): {e}")
+
+
+def _evict(conn):
+    with conn:
+        conn.execute("DELETE FROM transcripts WHERE created_at < ?", (time.time() - config.TRANSCRIPT_CACHE_TTL_SECONDS,))
+
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM transcripts").fetchone()[0]
+        if total_bytes <= config.TRANSCRIPT_CACHE_MAX_BYTES:
+            return
+
+        excess = total_bytes - config.TRANSCRIPT_CACHE_MAX_BYTES
+        victims = []
+        for video_id, source, size_bytes in conn.execute("SELECT video_id, source, size_bytes FROM transcripts ORDER BY last_accessed_at ASC"):
+            victims.append((video_id, source))
+            excess -= size_bytes
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM transcripts WHERE video_id = ? AND source = ?", victims)
+        print(f"[DEBUG] 대본 캐시 용량 초과로 {len(victims)}개 항목을 정리했습니다.")
+
+
+def get_cache_stats():
+    try:
+        conn = _connect()
+        try:
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM transcripts").fetchone()
+            by_source = dict(conn.execute("SELECT source, COUNT(*) FROM transcripts GROUP BY source").fetchall())
+        finally:
+            conn.close()
+        return {'entries': count, 'total_bytes': total_bytes, 'max_bytes': config.TRANSCRIPT_CACHE_MAX_BYTES, 'by_source': by_source}
+    except Exception as e:
+        return {'error': str(e)}
@@ -0,0 +1,261 @@
+# services/transcription.py
+
+import os
+import re
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import config
+from services import whisper_models
+from services.audio_io import SAMPLE_RATE
+
+# 긴 오디오를 무음 구간 기준으로 잘라 여러 프로세스에서 동시에 Whisper로 변환한 뒤,
+# 순서대로 이어 붙여 기존과 같은 하나의 transcript_text 문자열로 돌려주는 엔진입니다.
+# 변환용 프로세스 풀은 워커 프로세스마다 하나만 만들어 계속 재사용하며, 풀의 각 프로세스는 시작할 때 모델을 한 번만 로딩합니다.
+# 데몬 프로세스는 자식 프로세스를 만들 수 없으므로 병렬 변환은 Celery 워커를 prefork가 아닌 풀로 실행할 때만 동작합니다.
+#   예: celery -A celery_worker.celery_app worker --pool=threads --concurrency=2
+# prefork 워커(기본값)와 GPU에서는 구간을 나누지 않고 작업 프로세스 안에서 한 번의 호출로 전체 오디오를 변환합니다.
+
+_FRAME_SECONDS = 0.05
+
+
+def find_chunk_boundaries(audio, chunk_seconds, overlap_seconds, search_seconds=10.0, sample_rate=SAMPLE_RATE):
+    """
+    오디오를 chunk_seconds 안팎 길이의 구간으로 나눕니다.
+    각 경계는 목표 지점 앞뒤 search_seconds 범위에서 에너지가 가장 낮은(무음에 가까운) 지점으로 잡고,
+    인접 구간끼리 overlap_seconds 만큼 겹치도록 (start, end) 샘플 인덱스 목록을 반환합니다.
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    frame = int(_FRAME_SECONDS * sample_rate)
+    usable = (total // frame) * frame
+    # 프레임 단위 RMS 에너지를 한 번에 계산해 두고 경계 탐색에 재사용합니다.
+    energy = np.sqrt(np.mean(np.square(audio[:usable].reshape(-1, frame), dtype=np.float32), axis=1))
+
+    cuts = [0]
+    search = int(search_seconds * sample_rate)
+    while total - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        lo = max(cuts[-1] + chunk // 2, target - search) // frame
+        hi = min(target + search, usable) // frame
+        if hi > lo:
+            cut = int((lo + int(np.argmin(energy[lo:hi]))) * frame)
+        else:
+            cut = target
+        cuts.append(min(cut, total))
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * sample_rate)
+    return [(max(0, start - overlap), end) for start, end in zip(cuts[:-1], cuts[1:])]
+
+
+def _normalize_word(word):
+    return re.sub(r'[^\w]', '', word).lower()
+
+
+def stitch_texts(texts, max_overlap_words=30):
+    """
+    겹치게 잘린 구간들의 변환 결과를 순서대로 이어 붙입니다.
+    앞 구간의 끝부분과 뒷 구간의 시작 부분에서 같은 단어열이 반복되면 한 번만 남깁니다.
+    """
+    merged_words = []
+    for text in texts:
+        words = (text or '').split()
+        if not words:
+            continue
+        if merged_words:
+            tail = [_normalize_word(w) for w in merged_words[-max_overlap_words:]]
+            head = [_normalize_word(w) for w in words[:max_overlap_words]]
+            skip = 0
+            for size in range(min(len(tail), len(head)), 0, -1):
+                if tail[-size:] == head[:size]:
+                    skip = size
+                    break
+            words = words[skip:]
+        merged_words.extend(words)
+    return " ".join(merged_words)
+
+
+# --- 프로세스 풀 작업자 측 함수 ---
+# 각 작업자 프로세스는 초기화 시점에 모델을 한 번 로딩하고 이후 모든 구간에 재사용합니다.
+
+_worker_model_args = None
+
+
+def _init_worker(model_name, device, quantize, torch_threads):
+    global _worker_model_args
+    _worker_model_args = (model_name, device, quantize)
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    whisper_models.get_whisper_model(model_name, device, quantize)
+
+
+def _transcribe_chunk(index, audio_chunk, transcribe_options):
+    model = whisper_models.get_whisper_model(*_worker_model_args)
+    result = model.transcribe(audio_chunk, **transcribe_options)
+    return index, result.get("text", "").strip()
+
+
+def _ping():
+    return os.getpid()
+
+
+# --- 워커 프로세스별 변환 풀 ---
+
+_pool = None
+_pool_key = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_prefork_logged = False
+
+
+def can_use_process_pool():
+    # Celery prefork 워커처럼 데몬 프로세스 안에서는 자식 프로세스를 만들 수 없습니다.
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        import billiard
+        if billiard.current_process().daemon:
+            return False
+    except ImportError:
+        pass
+    return True
+
+
+def get_process_pool(model_name, device, quantize, workers):
+    """
+    이 프로세스의 변환 풀을 반환합니다. 같은 설정이면 이전에 만든 풀(모델이 이미 로딩된 작업자 프로세스)을 그대로 씁니다.
+    fork된 자식 프로세스에서는 부모의 풀을 쓰지 않고 새로 만듭니다.
+    """
+    global _pool, _pool_key, _pool_pid
+    key = (model_name, device, quantize, workers)
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid() and _pool_key == key:
+            return _pool
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        torch_threads = max(1, (os.cpu_count() or workers) // workers)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_name, device, quantize, torch_threads),
+        )
+        _pool_key, _pool_pid = key, os.getpid()
+        print(f"[DEBUG] Whisper 변환 풀 생성: 작업자 {workers}개 (작업자당 스레드 {torch_threads}), pid={_pool_pid}")
+        return _pool
+
+
+def _discard_process_pool(pool):
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_key = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_process_pool(profile=None):
+    """워커 시작 시 변환 풀의 작업자 프로세스를 모두 띄워 모델을 미리 로딩합니다. 병렬 변환을 쓸 수 없는 환경에서는 아무 일도 하지 않습니다."""
+    engine = TranscriptionEngine(profile)
+    if not engine.parallel_enabled():
+        return
+    try:
+        pool = get_process_pool(engine.model_name, engine.device, engine.quantize, engine.max_workers)
+        pids = {f.result() for f in [pool.submit(_ping) for _ in range(engine.max_workers)]}
+        print(f"[DEBUG] Whisper 변환 풀 준비 완료: 작업자 프로세스 {len(pids)}개")
+    except Exception as e:
+        print(f"[ERROR] Whisper 변환 풀 사전 준비 실패: {e}")
+
+
+def get_profile(profile=None):
+    profile = profile or config.DEFAULT_TRANSCRIPTION_PROFILE
+    if profile not in config.TRANSCRIPTION_PROFILES:
+        raise ValueError(f"'{profile}'는 지원하지 않는 변환 프로필입니다. 사용 가능한 프로필: {list(config.TRANSCRIPTION_PROFILES.keys())}")
+    return profile, config.TRANSCRIPTION_PROFILES[profile]
+
+
+def source_tag(model_name, quantize):
+    """대본 캐시에 기록되는 추출 방식 이름입니다. 예: 'whisper:medium', 'whisper:base:int8'"""
+    return f"whisper:{model_name}" + (":int8" if quantize else "")
+
+
+def acceptable_sources(profile=None):
+    """요청한 프로필과 같거나 더 정확한 방식으로 만든 대본만 재사용하도록 허용 목록을 만듭니다."""
+    profile, _ = get_profile(profile)
+    order = config.TRANSCRIPTION_PROFILE_ORDER
+    sources = ['subtitle']
+    for name in reversed(order[order.index(profile):]):
+        p = config.TRANSCRIPTION_PROFILES[name]
+        tag = source_tag(p['model'], p['quantize'])
+        if tag not in sources:
+            sources.append(tag)
+    return sources
+
+
+class TranscriptionEngine:
+    def __init__(self, profile=None, device=None, max_workers=None,
+                 chunk_seconds=None, overlap_seconds=None):
+        self.profile, profile_config = get_profile(profile)
+        self.model_name = profile_config['model']
+        self.device = device or whisper_models.resolve_device()
+        self.quantize = bool(profile_config.get('quantize')) and self.device == "cpu"
+        self.chunk_seconds = chunk_seconds or config.TRANSCRIBE_CHUNK_SECONDS
+        self.overlap_seconds = config.TRANSCRIBE_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+        self.max_workers = max_workers or config.TRANSCRIBE_MAX_WORKERS or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.transcribe_options = {'language': 'ko', **profile_config.get('options', {})}
+
+    @property
+    def source(self):
+        return source_tag(self.model_name, self.quantize)
+
+    def parallel_enabled(self):
+        return self.max_workers > 1 and self.device == "cpu" and can_use_process_pool()
+
+    def _transcribe_parallel(self, chunks, texts):
+        """변환 풀에서 구간들을 동시에 변환합니다. 풀이 깨지면 False를 반환하고, 호출한 쪽은 한 번의 호출로 다시 변환합니다."""
+        pool = get_process_pool(self.model_name, self.device, self.quantize, self.max_workers)
+        print(f"[DEBUG] 병렬 Whisper 변환 시작: {len(chunks)}개 구간, 작업자 {self.max_workers}개")
+        futures = [pool.submit(_transcribe_chunk, i, chunk, self.transcribe_options) for i, chunk in enumerate(chunks)]
+        try:
+            for future in futures:
+                index, text = future.result()
+                texts[index] = text
+        except BrokenProcessPool as e:
+            print(f"[WARN] Whisper 변환 풀이 중단되어 현재 프로세스에서 변환합니다: {e}")
+            _discard_process_pool(pool)
+            return False
+        finally:
+            # 풀은 다른 작업과 함께 쓰므로 종료하지 않고, 실패로 중단된 경우 이번 작업의 남은 구간만 취소합니다.
+            for future in futures:
+                future.cancel()
+        return True
+
+    def transcribe(self, audio, model_loader=None):
+        """
+        디코딩된 16kHz float32 오디오 전체를 변환해 하나의 문자열로 반환합니다.
+        model_loader는 (model_name, device, quantize)를 받아 모델을 돌려주는 함수입니다.
+        CPU에서 변환 풀을 쓸 수 있을 때만 구간을 나눠 동시에 변환하고, 그 외(GPU, prefork 워커, 작업자 1개)에는
+        구간을 나누지 않고 한 번의 호출로 변환합니다. 나눠서 순서대로 변환하면 빨라지지 않고 구간 경계의 문맥만 잃기 때문입니다.
+        (분량 한도가 필요하면 호출하는 쪽에서 오디오를 그 길이만큼만 내려받아 디코딩합니다.)
+        """
+        global _prefork_logged
+        if self.device == "cpu" and self.parallel_enabled():
+            boundaries = find_chunk_boundaries(audio, self.chunk_seconds, self.overlap_seconds)
+            if len(boundaries) > 1:
+                chunks = [np.ascontiguousarray(audio[start:end]) for start, end in boundaries]
+                texts = [""] * len(chunks)
+                if self._transcribe_parallel(chunks, texts):
+                    return stitch_texts(texts)
+        elif self.device == "cpu" and self.max_workers > 1 and not _prefork_logged:
+            print("[DEBUG] prefork 워커에서는 병렬 Whisper 변환을 쓸 수 없어 한 번의 호출로 변환합니다. (병렬 변환: --pool=threads)")
+            _prefork_logged = True
+
+        loader = model_loader or whisper_models.get_whisper_model
+        model = loader(self.model_name, self.device, self.quantize)
+        return model.transcribe(np.ascontiguousarray(audio), **self.transcribe_options).get("text", "").strip()
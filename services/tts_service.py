@@ -6,16 +6,33 @@ import io
 import os
 from .youtube_extractor import resource_path
 import re
+import config
 
-def synthesize_speech(text, voice_name="ko-KR-Standard-A"):
+_tts_client = None
+_tts_client_pid = None
+
+def _get_tts_client():
     """
-    주어진 텍스트를 Google TTS를 사용하여 음성으로 변환하고 mp3 바이너리를 반환합니다.
+    프로세스마다 TextToSpeechClient를 하나만 만들어 재사용합니다.
+    문장마다 클라이언트를 새로 만들면 인증과 gRPC 채널 연결(TLS 핸드셰이크)을 매번 다시 하게 됩니다.
     """
+    global _tts_client, _tts_client_pid
+    if _tts_client is not None and _tts_client_pid == os.getpid():
+        return _tts_client
+
     key_path = resource_path('gcp-tts-key.json')
     if not os.path.exists(key_path):
         raise FileNotFoundError("GCP 키 파일('gcp-tts-key.json')을 찾을 수 없습니다. 2단계 가이드를 확인해주세요.")
-    
-    client = texttospeech.TextToSpeechClient.from_service_account_json(key_path)
+
+    _tts_client = texttospeech.TextToSpeechClient.from_service_account_json(key_path)
+    _tts_client_pid = os.getpid()
+    return _tts_client
+
+def synthesize_speech(text, voice_name="ko-KR-Standard-A"):
+    """
+    주어진 텍스트를 Google TTS를 사용하여 음성으로 변환하고 mp3 바이너리를 반환합니다.
+    """
+    client = _get_tts_client()
     synthesis_input = texttospeech.SynthesisInput(text=text)
     voice = texttospeech.VoiceSelectionParams(
         language_code="ko-KR", name=voice_name
@@ -26,7 +43,8 @@ def synthesize_speech(text, voice_name="ko-KR-Standard-A"):
 
     try:
         response = client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
+            input=synthesis_input, voice=voice, audio_config=audio_config,
+            timeout=config.HTTP_READ_TIMEOUT
         )
         return response.audio_content
     except Exception as e:
@@ -0,0 +1,107 @@
+# services/video_table.py
+
+import numpy as np
+from dateutil.parser import isoparse
+from services.channel_snapshot import parse_duration_seconds, is_short_video
+
+# 채널 전체 업로드 영상을 열(column) 단위 NumPy 배열로 보관하는 표입니다.
+# 영상마다 API 응답 딕셔너리를 들고 있지 않고 필요한 숫자만 남기므로, 수천 개 영상도 적은 메모리로 다루며
+# 평균/백분위/월별 집계를 벡터 연산으로 한 번에 계산합니다.
+
+
+class VideoTable:
+    _NUMERIC_COLUMNS = {
+        'published_at': np.int64,   # UTC 기준 epoch 초
+        'duration_seconds': np.int32,
+        'view_count': np.int64,
+        'like_count': np.int64,
+        'comment_count': np.int64,
+        'is_short': np.bool_,
+    }
+
+    def __init__(self, capacity=256):
+        self._size = 0
+        self.ids = np.empty(capacity, dtype='<U16')
+        for name, dtype in self._NUMERIC_COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('ids', *self._NUMERIC_COLUMNS):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def append_items(self, video_items):
+        """videos().list 응답 항목들에서 필요한 값만 뽑아 표 끝에 추가합니다. 원본 항목은 보관하지 않습니다."""
+        self._reserve(len(video_items))
+        for item in video_items:
+            i = self._size
+            snippet = item.get('snippet', {})
+            statistics = item.get('statistics', {})
+            duration = parse_duration_seconds((item.get('contentDetails') or {}).get('duration'))
+            self.ids[i] = item['id']
+            self.published_at[i] = int(isoparse(snippet['publishedAt']).timestamp()) if snippet.get('publishedAt') else 0
+            self.duration_seconds[i] = duration
+            self.view_count[i] = int(statistics.get('viewCount', 0))
+            self.like_count[i] = int(statistics.get('likeCount', 0))
+            self.comment_count[i] = int(statistics.get('commentCount', 0))
+            self.is_short[i] = is_short_video(item)
+            self._size += 1
+
+    def column(self, name):
+        return getattr(self, name)[:self._size]
+
+    @staticmethod
+    def _view_stats(views):
+        if len(views) == 0:
+            return {'count': 0, 'total': 0, 'mean': 0, 'median': 0, 'p25': 0, 'p75': 0, 'p90': 0}
+        p25, p50, p75, p90 = np.percentile(views, [25, 50, 75, 90])
+        return {
+            'count': int(len(views)), 'total': int(views.sum()), 'mean': int(views.mean()),
+            'median': int(p50), 'p25': int(p25), 'p75': int(p75), 'p90': int(p90),
+        }
+
+    def monthly_buckets(self):
+        """업로드 월(YYYY-MM)별 업로드 수, 롱폼/숏폼 수, 조회수 합계를 오래된 순서로 반환합니다."""
+        if not self._size:
+            return []
+        months = self.column('published_at').astype('datetime64[s]').astype('datetime64[M]')
+        unique_months, inverse = np.unique(months, return_inverse=True)
+        n = len(unique_months)
+        is_short = self.column('is_short')
+        uploads = np.bincount(inverse, minlength=n)
+        shorts = np.bincount(inverse, weights=is_short, minlength=n)
+        views = np.bincount(inverse, weights=self.column('view_count'), minlength=n)
+        return [
+            {'month': str(month), 'uploads': int(u), 'short_form': int(s), 'long_form': int(u - s), 'views': int(v)}
+            for month, u, s, v in zip(unique_months, uploads, shorts, views)
+        ]
+
+    def summary(self):
+        views = self.column('view_count')
+        is_short = self.column('is_short')
+        likes = self.column('like_count')
+        comments = self.column('comment_count')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            engagement = np.where(views > 0, (likes + comments) / views, 0.0)
+        published = self.column('published_at')
+        return {
+            'video_count': self._size,
+            'first_upload': str(published.min().astype('datetime64[s]').astype('datetime64[D]')) if self._size else None,
+            'last_upload': str(published.max().astype('datetime64[s]').astype('datetime64[D]')) if self._size else None,
+            'all': self._view_stats(views),
+            'long_form': self._view_stats(views[~is_short]),
+            'short_form': self._view_stats(views[is_short]),
+            'avg_engagement_rate': round(float(engagement.mean()) * 100, 2) if self._size else 0.0,
+            'monthly': self.monthly_buckets(),
+        }
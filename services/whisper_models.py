@@ -0,0 +1,137 @@
+# services/whisper_models.py
+
+import os
+import threading
+import time
+import config
+
+# 프로세스 단위 Whisper 모델 저장소입니다.
+# Celery prefork 워커는 프로세스마다 이 모듈을 한 번씩 import 하므로,
+# 여기에 올려둔 모델은 해당 워커 프로세스가 살아있는 동안 계속 재사용됩니다.
+_models = {}
+_load_stats = {}
+_lock = threading.Lock()
+
+
+def resolve_device(device=None):
+    if device:
+        return device
+    if config.WHISPER_DEVICE:
+        return config.WHISPER_DEVICE
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _model_size_bytes(model):
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return None
+
+
+def _process_rss_bytes():
+    """현재 프로세스의 상주 메모리(RSS)를 바이트 단위로 반환합니다. (리눅스 외에는 None)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return None
+
+
+def _quantize_linear_layers(model):
+    """
+    Whisper의 Linear 레이어를 int8로 동적 양자화하고 (모델, 양자화된 레이어 수)를 반환합니다.
+    Whisper는 torch.nn.Linear를 상속한 whisper.model.Linear를 쓰는데, quantize_dynamic은 정확히 같은 타입만 바꾸므로
+    그대로 넘기면 아무 레이어도 양자화되지 않습니다. whisper.model.Linear는 forward에서 dtype만 맞추는 클래스라
+    CPU(float32)에서는 torch.nn.Linear와 동작이 같으므로, 클래스를 torch.nn.Linear로 바꾼 뒤 양자화합니다.
+    양자화된 레이어가 하나도 없으면 경고를 남기고 float32 모델을 그대로 사용합니다.
+    """
+    import torch
+    from whisper.model import Linear as WhisperLinear
+    try:
+        from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+    except ImportError:
+        from torch.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    for module in model.modules():
+        if type(module) is WhisperLinear:
+            module.__class__ = torch.nn.Linear
+    try:
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception as e:
+        print(f"[WARN] Whisper 모델 int8 양자화 실패, float32 모델을 사용합니다: {e}")
+        return model, 0
+
+    count = sum(1 for module in quantized.modules() if isinstance(module, DynamicQuantizedLinear))
+    if count == 0:
+        print("[WARN] int8로 양자화된 Linear 레이어가 없어 float32 모델을 사용합니다.")
+        return model, 0
+    print(f"[DEBUG] Whisper Linear 레이어 {count}개를 int8로 양자화했습니다.")
+    return quantized, count
+
+
+def get_whisper_model(model_name=None, device=None, quantize=False):
+    """
+    요청한 Whisper 모델을 반환합니다. 프로세스 안에서 처음 호출될 때만 디스크에서 로딩하고,
+    이후에는 메모리에 올라간 같은 객체를 그대로 돌려줍니다.
+    quantize=True이고 CPU에서 실행 중이면 Linear 레이어를 int8로 동적 양자화한 모델을 사용합니다.
+    """
+    model_name = model_name or config.WHISPER_MODEL_NAME
+    device = resolve_device(device)
+    quantize = bool(quantize) and device == "cpu"
+    key = (model_name, device, quantize)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        import whisper
+        print(f"[DEBUG] Whisper 모델 로딩 시작: model='{model_name}', device='{device}', int8={quantize}, pid={os.getpid()}")
+        rss_before = _process_rss_bytes()
+        started_at = time.perf_counter()
+        model = whisper.load_model(model_name, device=device)
+        quantized_modules = 0
+        if quantize:
+            model, quantized_modules = _quantize_linear_layers(model)
+        elapsed = time.perf_counter() - started_at
+        rss_after = _process_rss_bytes()
+
+        _models[key] = model
+        _load_stats[key] = {
+            'model_name': model_name,
+            'device': device,
+            'quantized': quantized_modules > 0,
+            'quantized_modules': quantized_modules,
+            'pid': os.getpid(),
+            'load_seconds': round(elapsed, 2),
+            'parameter_bytes': _model_size_bytes(model),
+            'rss_delta_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            'loaded_at': time.time(),
+        }
+        print(f"[DEBUG] Whisper 모델 로딩 완료: model='{model_name}', device='{device}', {elapsed:.1f}초 소요")
+        return model
+
+
+def preload_whisper_model(model_name=None, device=None, quantize=False):
+    """워커 프로세스 시작 시점에 모델을 미리 올려둡니다. 실패해도 작업 처리 시 다시 시도합니다."""
+    try:
+        get_whisper_model(model_name, device, quantize)
+    except Exception as e:
+        print(f"[ERROR] Whisper 모델 사전 로딩 실패: {e}")
+
+
+def get_model_report():
+    """현재 프로세스에 로딩된 모델별 메모리 사용량과 로딩 시간을 반환합니다."""
+    return {
+        'pid': os.getpid(),
+        'process_rss_bytes': _process_rss_bytes(),
+        'models': list(_load_stats.values()),
+    }
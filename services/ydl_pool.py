@@ -0,0 +1,128 @@
+# services/ydl_pool.py
+
+import os
+import copy
+import threading
+import time
+from contextlib import contextmanager
+import yt_dlp
+import config
+
+# 프로세스 단위로 미리 만들어 둔 yt_dlp.YoutubeDL 인스턴스를 빌려 쓰는 풀입니다.
+# YoutubeDL을 매번 새로 만들면 추출기 로딩, cookies.txt 파싱, 플레이어 JS/서명 해석 결과를 매번 다시 하게 됩니다.
+# 풀의 인스턴스는 계속 살아있으므로 인스턴스마다 이 작업을 한 번만 하고, 서명 캐시는 디스크(cachedir)에 저장해 모든 워커가 함께 씁니다.
+# Celery prefork 워커는 프로세스마다 별도의 풀을 가지며, 한 인스턴스는 동시에 한 스레드만 사용합니다.
+
+_idle = []
+_pool_pid = None
+_lock = threading.Lock()
+_stats = {'created': 0, 'reused': 0, 'retired': 0}
+
+
+def base_options():
+    """풀의 모든 인스턴스가 공유하는 기본 옵션입니다. 작업별로 달라지는 값(저장 경로 등)은 lease()에서 덮어씁니다."""
+    cookie_file = config.YT_DLP_COOKIE_FILE
+    return {
+        'cookiefile': cookie_file if cookie_file and os.path.exists(cookie_file) else None,
+        'format': 'bestaudio[ext=m4a]/bestaudio/best',
+        'outtmpl': '%(id)s.%(ext)s',
+        'cachedir': config.YT_DLP_CACHE_DIR,
+        'verbose': False,
+        'quiet': True,
+        'no_warnings': True,
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+            'Accept-Language': 'en-US,en;q=0.5'
+        }
+    }
+
+
+def _reset_after_fork():
+    # 부모 프로세스에서 만든 인스턴스(열린 연결 포함)는 fork된 자식 프로세스에서 쓰지 않습니다.
+    global _idle, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        _idle, _pool_pid = [], pid
+
+
+def _create():
+    os.makedirs(config.YT_DLP_CACHE_DIR, exist_ok=True)
+    # 쿠키 파일(cookiefile)은 인스턴스마다 처음 사용할 때 한 번 읽고, 이후에는 그 인스턴스가 계속 재사용합니다.
+    ydl = yt_dlp.YoutubeDL(base_options())
+    # __init__ 직후의 옵션을 기억해 두었다가 반납할 때 작업별 변경 사항을 되돌립니다.
+    # (outtmpl, http_headers 같은 중첩 값을 작업 중에 직접 고쳐도 원본이 바뀌지 않도록 깊은 복사로 보관합니다.)
+    ydl._pool_base_params = copy.deepcopy(ydl.params)
+    ydl._pool_uses = 0
+    _stats['created'] += 1
+    return ydl
+
+
+def _close(ydl):
+    try:
+        ydl.close()
+    except Exception as e:
+        print(f"[WARN] YoutubeDL 인스턴스 정리 실패: {e}")
+
+
+def _acquire():
+    with _lock:
+        _reset_after_fork()
+        if _idle:
+            _stats['reused'] += 1
+            return _idle.pop(), True
+        ydl = _create()
+    return ydl, False
+
+
+def _release(ydl, healthy):
+    ydl.params.clear()
+    ydl.params.update(copy.deepcopy(ydl._pool_base_params))
+    ydl._pool_uses += 1
+    keep = healthy and ydl._pool_uses < config.YT_DLP_POOL_MAX_USES
+    with _lock:
+        if keep and _pool_pid == os.getpid() and len(_idle) < config.YT_DLP_POOL_SIZE:
+            _idle.append(ydl)
+            return
+        _stats['retired'] += 1
+    _close(ydl)
+
+
+@contextmanager
+def lease(**overrides):
+    """
+    with ydl_pool.lease(paths={'home': work_dir}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    overrides의 옵션은 이번 사용에만 적용되며, 사용 중 ydl.params를 직접 바꾼 값(download_ranges 등)도 반납 시 되돌립니다.
+    outtmpl을 문자열로 주면 기본 출력 템플릿만 바꿉니다. 사용 중 예외가 나면 해당 인스턴스는 풀에 돌려놓지 않습니다.
+    """
+    started_at = time.perf_counter()
+    ydl, reused = _acquire()
+    if 'outtmpl' in overrides and not isinstance(overrides['outtmpl'], dict):
+        overrides['outtmpl'] = {**ydl.params.get('outtmpl', {}), 'default': overrides['outtmpl']}
+    ydl.params.update(overrides)
+    ydl._pool_reused = reused
+    ydl._pool_acquire_seconds = round(time.perf_counter() - started_at, 3)
+    healthy = False
+    try:
+        yield ydl
+        healthy = True
+    finally:
+        _release(ydl, healthy)
+
+
+def warm(size=None):
+    """워커 프로세스 시작 시 인스턴스를 미리 만들어 둡니다. 실패해도 첫 사용 시 다시 만듭니다."""
+    size = config.YT_DLP_POOL_SIZE if size is None else size
+    try:
+        with _lock:
+            _reset_after_fork()
+            while len(_idle) < size:
+                _idle.append(_create())
+        print(f"[DEBUG] YoutubeDL 풀 준비 완료: {size}개, pid={os.getpid()}")
+    except Exception as e:
+        print(f"[ERROR] YoutubeDL 풀 사전 준비 실패: {e}")
+
+
+def get_pool_report():
+    with _lock:
+        return {'pid': os.getpid(), 'idle': len(_idle) if _pool_pid == os.getpid() else 0, **_stats}
@@ -0,0 +1,248 @@
+# services/youtube_async.py
+
+import os
+import json
+import asyncio
+import threading
+import importlib.util
+from urllib.parse import urlencode
+import httpx
+import config
+from services import http_client, youtube_quota
+
+# asyncio 기반 YouTube Data API 클라이언트입니다.
+# 서로 독립적인 조회(여러 채널, 영상 통계 + 댓글 등)를 한 워커에서 동시에 보내고,
+# 여러 건의 조회를 Google 배치 엔드포인트로 묶어 한 번의 왕복으로 처리할 수 있습니다.
+# h2 패키지(requirements.txt)가 설치되어 있으면 HTTP/2로 하나의 연결을 여러 요청이 함께 사용합니다.
+# 동기 코드(Celery 작업, YouTubeDataExtractor)에서는 run_sync()로 호출합니다. run_sync()는 프로세스마다 하나인
+# 백그라운드 이벤트 루프에서 코루틴을 실행하므로, 그 루프에 묶인 httpx.AsyncClient(커넥션 풀)를 호출 사이에 재사용합니다.
+
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+BATCH_URL = "https://www.googleapis.com/batch/youtube/v3"
+MAX_BATCH_SIZE = 50
+
+_RESOURCES = {'channels', 'playlistItems', 'videos', 'search', 'commentThreads'}
+_HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_shared_client = None
+
+
+class YouTubeAPIError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(f"YouTube API 오류 ({status_code}): {message}")
+        self.status_code = status_code
+
+
+def _error_message(status_code, body):
+    try:
+        return json.loads(body)['error']['message']
+    except Exception:
+        return str(body)[:200]
+
+
+class AsyncYouTubeClient:
+    """
+    async with AsyncYouTubeClient(quota_context={...}) as yt:
+        channels, videos = await asyncio.gather(yt.list('channels', ...), yt.list('videos', ...))
+    모든 호출은 youtube_quota로 할당량이 먼저 기록됩니다. (배치 요청은 하위 요청마다 기록)
+    """
+
+    def __init__(self, api_key=None, quota_context=None, max_concurrency=None):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY 환경 변수가 설정되지 않았습니다.")
+        self.quota_context = quota_context or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency or config.HTTP_PER_HOST_CONCURRENCY)
+        self._client = None
+
+    async def __aenter__(self):
+        # run_sync()의 백그라운드 루프에서는 프로세스 공용 클라이언트를 쓰고, 그 밖의 루프에서는 이 블록 동안만 쓸 클라이언트를 만듭니다.
+        self._owns_client = asyncio.get_running_loop() is not _loop
+        self._client = _new_async_client() if self._owns_client else _get_shared_client()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._owns_client:
+            await self._client.aclose()
+        self._client = None
+
+    def _charge(self, resource, caller):
+        youtube_quota.charge(f"{resource}.list", self.quota_context, caller)
+
+    def reserve(self, requests, caller):
+        """[(resource, params), ...] 요청들의 할당량을 미리 기록합니다. 이후 list/batch 호출은 charge=False로 보냅니다."""
+        for resource, _ in requests:
+            self._charge(resource, caller)
+
+    async def _send(self, method, url, **kwargs):
+        max_retries = config.HTTP_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+                if response.status_code in http_client._RETRY_STATUS_CODES and attempt < max_retries:
+                    print(f"[WARN] YouTube API {response.status_code} 응답. {http_client._backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+                    await asyncio.sleep(http_client._backoff(attempt))
+                    continue
+                return response
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= max_retries:
+                    raise
+                print(f"[WARN] YouTube API 요청 실패: {type(e).__name__}. {http_client._backoff(attempt)}초 후 재시도합니다. ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(http_client._backoff(attempt))
+
+    async def list(self, resource, charge=True, caller=None, **params):
+        """
+        channels/playlistItems/videos/search/commentThreads 의 list 호출입니다. 응답 JSON을 딕셔너리로 반환합니다.
+        caller는 할당량 사용 내역에 기록할 호출 경로 이름이며, charge=False는 reserve()로 이미 할당량을 기록한 요청을 보낼 때 사용합니다.
+        """
+        if resource not in _RESOURCES:
+            raise ValueError(f"지원하지 않는 리소스입니다: {resource}")
+        if charge:
+            self._charge(resource, caller)
+        params = {k: v for k, v in params.items() if v is not None}
+        response = await self._send('GET', f"{API_BASE_URL}/{resource}", params={**params, 'key': self.api_key})
+        if response.status_code >= 400:
+            raise YouTubeAPIError(response.status_code, _error_message(response.status_code, response.text))
+        return response.json()
+
+    async def batch(self, requests, charge=True, caller=None):
+        """
+        [(resource, params), ...] 목록을 Google 배치 엔드포인트(multipart/mixed)로 한 번에 보냅니다.
+        반환값은 요청 순서와 같은 순서의 응답 딕셔너리 목록이며, 실패한 하위 요청 자리에는 YouTubeAPIError가 들어갑니다.
+        """
+        results = []
+        for i in range(0, len(requests), MAX_BATCH_SIZE):
+            results.extend(await self._batch_chunk(requests[i:i + MAX_BATCH_SIZE], caller, charge))
+        return results
+
+    async def _batch_chunk(self, requests, caller, charge):
+        boundary = "batch_youtube_data"
+        parts = []
+        for index, (resource, params) in enumerate(requests):
+            if resource not in _RESOURCES:
+                raise ValueError(f"지원하지 않는 리소스입니다: {resource}")
+            if charge:
+                self._charge(resource, caller)
+            query = urlencode({**{k: v for k, v in params.items() if v is not None}, 'key': self.api_key})
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <item{index}>\r\n\r\n"
+                f"GET /youtube/v3/{resource}?{query}\r\n\r\n"
+            )
+        body = "".join(parts) + f"--{boundary}--\r\n"
+        response = await self._send('POST', BATCH_URL, content=body.encode('utf-8'),
+                                    headers={'Content-Type': f'multipart/mixed; boundary={boundary}'})
+        if response.status_code >= 400:
+            raise YouTubeAPIError(response.status_code, _error_message(response.status_code, response.text))
+        return _parse_batch_response(response, len(requests))
+
+
+def _parse_batch_response(response, expected_count):
+    content_type = response.headers.get('content-type', '')
+    if 'boundary=' not in content_type:
+        raise YouTubeAPIError(response.status_code, "배치 응답 형식을 해석할 수 없습니다.")
+    boundary = content_type.split('boundary=', 1)[1].split(';')[0].strip().strip('"')
+    results = [None] * expected_count
+    for part in response.text.split(f"--{boundary}"):
+        part = part.strip()
+        if not part or part == '--':
+            continue
+        # 각 파트는 [파트 헤더] 빈 줄 [HTTP 상태줄 + 헤더] 빈 줄 [JSON 본문] 구조입니다.
+        sections = part.replace('\r\n', '\n').split('\n\n', 2)
+        if len(sections) < 3:
+            continue
+        part_headers, http_head, body = sections
+        index = None
+        for line in part_headers.split('\n'):
+            if line.lower().startswith('content-id:'):
+                content_id = line.split(':', 1)[1].strip().strip('<>')
+                index = int(content_id.rsplit('item', 1)[-1])
+        status_code = int(http_head.split('\n', 1)[0].split()[1])
+        if index is None or index >= expected_count:
+            continue
+        if status_code >= 400:
+            results[index] = YouTubeAPIError(status_code, _error_message(status_code, body))
+        else:
+            results[index] = json.loads(body)
+    return results
+
+
+async def fetch_video_items(video_ids, part="snippet,statistics,contentDetails", fields=None, quota_context=None):
+    """
+    영상 ID 목록의 videos().list 결과 항목을 모읍니다. 50개 단위 요청들을 배치 하나로 묶고, 배치가 실패하면 동시에 개별 요청합니다.
+    할당량은 조회 한 번에 요청 수만큼만 기록하며, 배치 실패 후 개별 요청으로 다시 보낼 때 중복으로 기록하지 않습니다.
+    """
+    chunks = [video_ids[i:i + 50] for i in range(0, len(video_ids), 50)]
+    if not chunks:
+        return []
+    async with AsyncYouTubeClient(quota_context=quota_context) as yt:
+        requests = [('videos', {'part': part, 'id': ",".join(chunk), 'maxResults': 50, 'fields': fields}) for chunk in chunks]
+        yt.reserve(requests, 'fetch_video_items')
+        responses = None
+        if len(requests) > 1:
+            try:
+                responses = await yt.batch(requests, charge=False)
+            except (YouTubeAPIError, httpx.HTTPError) as e:
+                print(f"[WARN] 배치 요청 실패, 개별 요청으로 전환합니다: {e}")
+        if responses is None or any(r is None for r in responses):
+            responses = await asyncio.gather(*(yt.list(resource, charge=False, **params) for resource, params in requests), return_exceptions=True)
+    items = []
+    for response in responses:
+        if isinstance(response, Exception):
+            raise response
+        items.extend(response.get('items', []))
+    return items
+
+
+def _new_async_client():
+    # transport를 직접 넘기면 AsyncClient의 limits/http2 인자는 무시되므로 transport에 지정합니다.
+    return httpx.AsyncClient(
+        timeout=http_client.default_timeout(),
+        transport=httpx.AsyncHTTPTransport(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            retries=config.HTTP_MAX_RETRIES,
+        ),
+    )
+
+
+def _get_shared_client():
+    # 백그라운드 루프 안에서만 호출되므로 잠금 없이 만들어도 됩니다.
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = _new_async_client()
+    return _shared_client
+
+
+def _get_loop():
+    """현재 프로세스의 백그라운드 이벤트 루프를 반환합니다. (fork된 자식 프로세스에서는 새로 만듭니다.)"""
+    global _loop, _loop_pid, _shared_client
+    pid = os.getpid()
+    if _loop is not None and _loop_pid == pid:
+        return _loop
+    with _loop_lock:
+        if _loop is None or _loop_pid != pid:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='youtube-async', daemon=True).start()
+            # 부모 프로세스의 클라이언트는 부모의 루프와 연결에 묶여 있으므로 버립니다.
+            _loop, _loop_pid, _shared_client = loop, pid, None
+    return _loop
+
+
+def run_sync(coro):
+    """동기 코드에서 코루틴을 실행하고 결과를 반환합니다. 코루틴은 프로세스 공용 백그라운드 루프에서 실행됩니다."""
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync()는 백그라운드 루프 안에서 호출할 수 없습니다. await로 직접 호출하세요.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
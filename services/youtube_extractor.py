@@ -10,7 +10,16 @@ from dateutil.parser import isoparse
 import sys
 import time
 import io
+import shutil
+import tempfile
+import heapq
+from urllib.parse import unquote
 from pydub import AudioSegment
+import config
+from services import transcript_cache, audio_io, subtitle_parser, http_client, youtube_quota, channel_id_cache, channel_store, youtube_async, ydl_pool
+from services.transcription import TranscriptionEngine, acceptable_sources
+from services.channel_snapshot import ChannelSnapshot
+from services.video_table import VideoTable
 
 def _clean_youtube_id_from_url(url):
     if not url: return None
@@ -21,9 +30,41 @@ def _clean_youtube_id_from_url(url):
             return valid_ids[-1]
     return None
 
+# Data API 응답에서 실제로 읽는 필드만 요청하는 fields 마스크입니다. (응답 크기와 파싱 시간 절감)
+# 새 필드를 읽도록 코드를 고칠 때는 해당 마스크에도 함께 추가해야 합니다.
+_VIDEO_PART_FIELDS = {
+    'snippet': 'snippet(title,publishedAt)',
+    'statistics': 'statistics(viewCount,likeCount,commentCount)',
+    'contentDetails': 'contentDetails(duration)',
+}
+CHANNEL_LOOKUP_FIELDS = 'items/id'
+CHANNEL_SEARCH_FIELDS = 'items/id/channelId'
+CHANNEL_DETAILS_FIELDS = 'items(id,snippet/title,statistics/subscriberCount,contentDetails/relatedPlaylists/uploads)'
+PLAYLIST_SNIPPET_FIELDS = 'nextPageToken,items/snippet(publishedAt,resourceId/videoId)'
+PLAYLIST_IDS_FIELDS = 'nextPageToken,items/contentDetails/videoId'
+VIDEO_SEARCH_FIELDS = 'items/id/videoId'
+COMMENT_FIELDS = 'items/snippet/topLevelComment/snippet(authorDisplayName,textDisplay,likeCount)'
+
+def video_fields(part):
+    """videos().list의 part 값에 맞는 fields 마스크를 만듭니다. 예: 'statistics' → 'items(id,statistics(...))'"""
+    return "items(id," + ",".join(_VIDEO_PART_FIELDS[p.strip()] for p in part.split(',')) + ")"
+
+def _published_at(video_item):
+    return isoparse(video_item['snippet']['publishedAt']).replace(tzinfo=None)
+
+def _parse_video_id(url):
+    # 캐시 조회용으로 URL에서 video_id만 엄격하게 뽑아냅니다. (si= 같은 공유 파라미터를 잘못 집지 않도록)
+    match = re.search(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})', str(url or ''))
+    return match.group(1) if match else None
+
 class YouTubeDataExtractor:
-    def __init__(self, whisper_model_loader=None):
+    def __init__(self, whisper_model_loader=None, transcription_profile=None, quota_context=None):
+        # whisper_model_loader는 (model_name, device, quantize)를 받아 모델을 돌려주는 함수입니다.
+        # (services.whisper_models.get_whisper_model) 로더가 없으면 Whisper 변환은 건너뜁니다.
+        # quota_context는 {'user': 사용자 ID, 'task': 작업 ID}로, YouTube API 할당량 사용 내역을 구분하는 데 쓰입니다.
         self.whisper_model_loader = whisper_model_loader
+        self.transcription_profile = transcription_profile
+        self.quota_context = quota_context or {}
         self.youtube_service = None
 
     def _initialize_youtube_service(self):
@@ -32,13 +73,68 @@ class YouTubeDataExtractor:
             if not youtube_api_key: print("경고: GOOGLE_API_KEY 환경 변수가 설정되지 않았습니다.")
             else:
                 try:
-                    self.youtube_service = build('youtube', 'v3', developerKey=youtube_api_key)
+                    service = build('youtube', 'v3', developerKey=youtube_api_key, http=http_client.build_google_http())
+                    # 모든 API 호출의 할당량 단위를 기록하고, 일일 한도에 닿기 전에 호출을 거절합니다.
+                    self.youtube_service = youtube_quota.QuotaAwareYouTubeService(service, self.quota_context)
                     print("[DEBUG] YouTube Data API 서비스가 성공적으로 초기화되었습니다.")
                 except Exception as e:
                     print(f"[ERROR] YouTube Data API 서비스 초기화 중 오류 발생: {e}")
                     self.youtube_service = None
 
-    def extract_video_info_and_transcript(self, youtube_link):
+    def _parse_video_info(self, info_dict):
+        video_info = {
+            'video_id': info_dict.get('id'), 'title': info_dict.get('title'),
+            'uploader': info_dict.get('uploader'), 'upload_date': info_dict.get('upload_date'),
+            'view_count': info_dict.get('view_count'), 'like_count': info_dict.get('like_count'),
+            'comment_count': info_dict.get('comment_count'), 'thumbnail_url': info_dict.get('thumbnail'),
+            'duration': info_dict.get('duration'),
+        }
+        if video_info.get('upload_date') and len(video_info['upload_date']) == 8:
+            video_info['upload_date'] = f"{video_info['upload_date'][:4]}-{video_info['upload_date'][4:6]}-{video_info['upload_date'][6:]}"
+        return video_info
+
+    def _extract_subtitle_cues(self, info_dict):
+        """
+        이미 받아온 info_dict의 자막 목록에서 언어/형식 우선순위에 맞는 트랙을 골라 스트리밍으로 내려받고 CueStore로 변환합니다.
+        반환값: (CueStore, 선택된 트랙 정보) 또는 (None, None)
+        """
+        track = subtitle_parser.resolve_subtitle_track(info_dict)
+        if not track:
+            return None, None
+
+        with http_client.stream('GET', track['url']) as response:
+            # 응답 본문 전체를 읽지 않고 바로 파싱하며, VTT 롤링 자막의 중복 문장은 이 단계에서 제거됩니다.
+            cues = subtitle_parser.parse_subtitle(response, track['ext'])
+
+        final_text = cues.text()
+        if final_text and len(final_text) > 10:
+            print(f"--- [DEBUG] 자막 추출 및 정제 성공 ({track['kind']}/{track['language']}/{track['ext']}, cue {len(cues)}개, {len(final_text)}자) ---")
+            return cues, track
+        return None, None
+
+    def _download_audio(self, ydl, info_dict, max_seconds=None):
+        """
+        extract_info로 받아둔 info_dict를 재사용하여 페이지를 다시 파싱하지 않고 오디오만 내려받습니다.
+        max_seconds를 주면 yt-dlp의 download_ranges로 앞부분 그 길이만 내려받습니다.
+        """
+        if max_seconds:
+            # 풀에서 빌린 인스턴스의 옵션은 반납할 때 원래대로 되돌려지므로 여기서 바로 바꿔도 됩니다.
+            ydl.params['download_ranges'] = yt_dlp.utils.download_range_func(None, [(0, max_seconds)])
+        downloaded_info = ydl.process_ie_result(info_dict, download=True)
+        requested = downloaded_info.get('requested_downloads') or []
+        if requested and requested[0].get('filepath'):
+            return requested[0]['filepath']
+        return ydl.prepare_filename(downloaded_info)
+
+    def extract_video_info_and_transcript(self, youtube_link, use_cache=True, profile=None, max_seconds=None):
+        """
+        영상 정보와 대본을 함께 반환합니다. profile은 Whisper 변환 속도 프로필('draft', 'standard', 'accurate')이며,
+        사용한 추출 방식과 단계별 소요 시간은 video_info['transcript_meta']에 기록됩니다.
+        max_seconds는 자막이 없어 Whisper로 변환할 때의 오디오 길이 한도(초)입니다. 오디오를 앞부분 그 길이만큼만 내려받아 변환하며,
+        이렇게 잘라 변환한 대본은 캐시에 저장하지 않습니다. 자막 대본은 한도와 관계없이 전체를 돌려줍니다.
+        """
+        profile = profile or self.transcription_profile
+        budget_seconds = int(max_seconds) if max_seconds else None
         clean_youtube_link = youtube_link
 
         if '[' in str(youtube_link) and ']' in str(youtube_link):
@@ -47,111 +143,94 @@ class YouTubeDataExtractor:
             if video_id:
                 clean_youtube_link = f"https://www.youtube.com/watch?v={video_id}"
 
+        if use_cache:
+            cached = transcript_cache.get_transcript(_parse_video_id(clean_youtube_link), sources=acceptable_sources(profile))
+            if cached:
+                print(f"--- [DEBUG] 캐시된 대본 사용: {cached['video_id']} (source={cached['source']}) ---")
+                return cached['metadata'].get('video_info', {}), cached['transcript']
+
         self._initialize_youtube_service()
         
         video_info = {}
         transcript_text = ""
+        transcript_source = None
+        transcript_meta = {}
+        cache_text = None  # 캐시에 저장할 전체 대본 (일부만 추출했다면 None)
+        started_at = time.perf_counter()
         audio_file_path = None
-        
-        # ▼▼▼▼▼ [핵심 수정] 쿠키 파일 경로 설정 ▼▼▼▼▼
-        cookie_file = 'cookies.txt'
+        work_dir = tempfile.mkdtemp(prefix='yt_audio_')
 
         try:
-            ydl_opts_info = {
-                'cookiefile': cookie_file, # 쿠키 사용 옵션 추가
-                'cachedir': False,
-                'verbose': False,
-                'quiet': True,
-                'no_warnings': True,
-                'skip_download': True,
-                'simulate': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-                    'Accept-Language': 'en-US,en;q=0.5'
-                }
-            }
-            
-            print(f"\n--- [DEBUG] 영상 메타데이터 추출 시작: {clean_youtube_link} ---")
-            with yt_dlp.YoutubeDL(ydl_opts_info) as ydl:
-                info_dict_meta = ydl.extract_info(clean_youtube_link, download=False)
-                video_info = {
-                    'video_id': info_dict_meta.get('id'), 'title': info_dict_meta.get('title'),
-                    'uploader': info_dict_meta.get('uploader'), 'upload_date': info_dict_meta.get('upload_date'),
-                    'view_count': info_dict_meta.get('view_count'), 'like_count': info_dict_meta.get('like_count'),
-                    'comment_count': info_dict_meta.get('comment_count'), 'thumbnail_url': info_dict_meta.get('thumbnail'),
-                    'duration': info_dict_meta.get('duration'),
-                }
-                if video_info.get('upload_date') and len(video_info['upload_date']) == 8:
-                    video_info['upload_date'] = f"{video_info['upload_date'][:4]}-{video_info['upload_date'][4:6]}-{video_info['upload_date'][6:]}"
-            print(f"--- [DEBUG] 영상 메타데이터 추출 완료 ---")
+            # 워커 프로세스에 미리 만들어 둔 YoutubeDL 인스턴스(쿠키, 서명 캐시 포함)를 빌려 쓰고, 오디오만 작업별 임시 폴더에 저장합니다.
+            with ydl_pool.lease(paths={'home': work_dir}) as ydl:
+                # 메타데이터, 자막 트랙, 오디오 포맷을 한 번의 요청으로 모두 가져옵니다.
+                print(f"\n--- [DEBUG] 영상 메타데이터 추출 시작: {clean_youtube_link} ---")
+                step_started_at = time.perf_counter()
+                info_dict = ydl.extract_info(clean_youtube_link, download=False)
+                video_info = self._parse_video_info(info_dict)
+                transcript_meta['metadata_seconds'] = round(time.perf_counter() - step_started_at, 2)
+                transcript_meta['ydl_reused'] = ydl._pool_reused
+                print(f"--- [DEBUG] 영상 메타데이터 추출 완료 ---")
 
-            # 자막 우선 추출 로직은 유지하되, 쿠키 옵션을 추가합니다.
-            try:
-                ydl_opts_subtitle = {
-                    'cookiefile': cookie_file, # 쿠키 사용 옵션 추가
-                    'writesubtitles': True, 'subtitleslangs': ['ko'],
-                    'skip_download': True, 'cachedir': False,
-                    'verbose': False, 'quiet': True, 'no_warnings': True,
-                }
-                with yt_dlp.YoutubeDL(ydl_opts_subtitle) as ydl_sub:
-                    info_dict_sub = ydl_sub.extract_info(clean_youtube_link, download=False)
-                    subtitles = info_dict_sub.get('subtitles', {}).get('ko') or info_dict_sub.get('automatic_captions', {}).get('ko')
-                    if subtitles:
-                        vtt_subtitle = next((s for s in subtitles if s['ext'] == 'vtt'), subtitles[-1])
-                        subtitle_url = vtt_subtitle['url']
-                        
-                        import urllib.request
-                        with urllib.request.urlopen(subtitle_url) as response:
-                            vtt_content = response.read().decode('utf-8')
-                            lines = vtt_content.splitlines()
-                            transcript_parts = []
-                            for line in lines:
-                                if '-->' in line or line.strip().isdigit() or line.strip().lower().startswith(('webvtt', 'kind:', 'language:')) or not line.strip():
-                                    continue
-                                clean_line = re.sub(r'<[^>]+>', '', line).strip()
-                                transcript_parts.append(clean_line)
-                            
-                            unique_lines = []
-                            for i, line in enumerate(transcript_parts):
-                                if i == 0 or line != transcript_parts[i-1]:
-                                    unique_lines.append(line)
-                            
-                            final_text = " ".join(unique_lines)
-
-                            if final_text and len(final_text) > 10:
-                                transcript_text = final_text
-                                print("--- [DEBUG] 자막 추출 및 정제 성공 ---")
-            except Exception as e:
-                print(f"[WARN] 자막 추출 중 오류 발생: {e}. Whisper로 넘어갑니다.")
-
-            if not transcript_text:
-                print(f"--- [DEBUG] Whisper AI를 이용한 음성 추출 및 변환을 시작합니다. ---")
-                
-                ydl_opts_audio = {
-                    'cookiefile': cookie_file, # 쿠키 사용 옵션 추가
-                    'format': 'm4a/bestaudio/best',
-                    'outtmpl': f"{video_info.get('id', 'temp_audio')}.%(ext)s",
-                    'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}],
-                    'postprocessor_args': ['-ar', '16000'],
-                    'cachedir': False, 'verbose': False, 'quiet': True, 'no_warnings': True,
-                    'http_headers': {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-                    }
-                }
-                
-                with yt_dlp.YoutubeDL(ydl_opts_audio) as ydl_audio:
-                    info_dict_audio = ydl_audio.extract_info(clean_youtube_link, download=True)
-                    audio_file_path = ydl_audio.prepare_filename(info_dict_audio).rsplit('.', 1)[0] + '.mp3'
-
-                if not audio_file_path or not os.path.exists(audio_file_path) or os.path.getsize(audio_file_path) == 0:
-                    raise FileNotFoundError(f"오디오 파일 저장/경로 확인 실패: {audio_file_path}")
-
-                if self.whisper_model_loader:
-                    model = self.whisper_model_loader()
-                    result = model.transcribe(audio_file_path, language="ko")
-                    transcript_text = result["text"]
-                else:
-                    transcript_text = "⚠️ Whisper 모델 로더가 없어 대본을 추출할 수 없습니다."
+                try:
+                    step_started_at = time.perf_counter()
+                    cues, track = self._extract_subtitle_cues(info_dict)
+                    if cues:
+                        transcript_text = cues.text()
+                        cache_text = transcript_text
+                        transcript_source = 'subtitle'
+                        transcript_meta['cue_count'] = len(cues)
+                        transcript_meta['subtitle_track'] = {'language': track['language'], 'kind': track['kind'], 'ext': track['ext']}
+                    transcript_meta['subtitle_seconds'] = round(time.perf_counter() - step_started_at, 2)
+                except Exception as e:
+                    print(f"[WARN] 자막 추출 중 오류 발생: {e}. Whisper로 넘어갑니다.")
+
+                if not transcript_text:
+                    print(f"--- [DEBUG] Whisper AI를 이용한 음성 추출 및 변환을 시작합니다. ---")
+                    if not self.whisper_model_loader:
+                        transcript_text = "⚠️ Whisper 모델 로더가 없어 대본을 추출할 수 없습니다."
+                    else:
+                        engine = TranscriptionEngine(profile=profile)
+
+                        step_started_at = time.perf_counter()
+                        duration = video_info.get('duration')
+                        if budget_seconds and duration and budget_seconds >= duration:
+                            budget_seconds = None  # 영상 전체가 한도 안에 들어가면 구간을 자를 필요가 없습니다.
+                        if budget_seconds:
+                            print(f"--- [DEBUG] 오디오 길이 한도에 맞춰 앞부분 {budget_seconds}초만 내려받아 변환합니다. (전체 {duration}초) ---")
+                            transcript_meta['budget_seconds'] = budget_seconds
+                        audio_file_path = self._download_audio(ydl, info_dict, max_seconds=budget_seconds)
+                        transcript_meta['download_seconds'] = round(time.perf_counter() - step_started_at, 2)
+
+                        if not audio_file_path or not os.path.exists(audio_file_path) or os.path.getsize(audio_file_path) == 0:
+                            raise FileNotFoundError(f"오디오 파일 저장/경로 확인 실패: {audio_file_path}")
+
+                        # 원본 오디오를 ffmpeg로 한 번만 디코딩해 16kHz PCM 배열을 Whisper에 직접 전달합니다.
+                        step_started_at = time.perf_counter()
+                        audio = audio_io.decode_audio(audio_file_path, scratch_dir=work_dir, duration_hint=duration, max_seconds=budget_seconds)
+                        transcript_meta['decode_seconds'] = round(time.perf_counter() - step_started_at, 2)
+
+                        # 병렬 변환을 쓸 수 있으면 긴 오디오를 무음 구간 기준으로 나눠 여러 프로세스에서 동시에 변환합니다.
+                        step_started_at = time.perf_counter()
+                        transcript_text = engine.transcribe(audio, model_loader=self.whisper_model_loader)
+                        transcript_meta['transcribe_seconds'] = round(time.perf_counter() - step_started_at, 2)
+                        del audio  # memmap 스크래치 파일을 임시 폴더 정리 전에 닫습니다.
+
+                        transcript_source = engine.source
+                        transcript_meta['truncated'] = bool(budget_seconds)
+                        if not transcript_meta['truncated']:
+                            cache_text = transcript_text
+                        transcript_meta['profile'] = engine.profile
+                        transcript_meta['model'] = engine.model_name
+                        transcript_meta['quantized'] = engine.quantize
+
+            transcript_meta['source'] = transcript_source
+            transcript_meta['total_seconds'] = round(time.perf_counter() - started_at, 2)
+            video_info['transcript_meta'] = transcript_meta
+
+            # Whisper로 오디오 앞부분만 변환한 대본은 전체 대본으로 오인되지 않도록 캐시에 넣지 않습니다.
+            if use_cache and cache_text and not cache_text.startswith("⚠️"):
+                transcript_cache.put_transcript(video_info.get('video_id'), transcript_source, cache_text, {'video_info': video_info})
 
         except Exception as e:
             error_message = f"영상 정보 추출 또는 대본 변환 중 심각한 오류 발생: {type(e).__name__}: {e}"
@@ -161,262 +240,348 @@ class YouTubeDataExtractor:
             else:
                 transcript_text = f"⚠️ 오류 발생: {error_message}"
         finally:
-            if audio_file_path and os.path.exists(audio_file_path):
-                try:
-                    os.remove(audio_file_path)
-                    print(f"[DEBUG] 원본 오디오 파일 정리 완료: {audio_file_path}")
-                except Exception as e:
-                    print(f"[ERROR] 오디오 파일 삭제 실패: {e}")
+            try:
+                shutil.rmtree(work_dir)
+                if audio_file_path:
+                    print(f"[DEBUG] 작업 임시 폴더 정리 완료: {work_dir}")
+            except Exception as e:
+                print(f"[ERROR] 작업 임시 폴더 삭제 실패: {e}")
 
         return video_info, transcript_text
 
+    def _lookup_channel(self, **lookup):
+        # channels().list의 forHandle/forUsername 조회는 1단위로, 100단위인 search().list보다 훨씬 저렴하고 정확합니다.
+        response = self.youtube_service.channels().list(part='id', maxResults=1, fields=CHANNEL_LOOKUP_FIELDS, **lookup).execute(caller='_lookup_channel')
+        items = response.get('items') or []
+        return items[0]['id'] if items else None
+
     def _get_channel_id(self, identifier):
         self._initialize_youtube_service()
         if not self.youtube_service: return None
-        if re.match(r'UC[a-zA-Z0-9_-]{22}', identifier): return identifier
-        match = re.search(r'(?:youtube\.com/channel/|youtube\.com/user/|youtube\.com/c/|youtube\.com/@)([a-zA-Z0-9_-]+)', identifier)
+        identifier = unquote(str(identifier or '').strip())
+        match = re.search(r'(UC[a-zA-Z0-9_-]{22})', identifier)
+        if match: return match.group(1)
+
+        match = re.search(r'youtube\.com/(@|c/|user/)([\w.-]+)', identifier)
         if match:
-            potential_id = match.group(1)
-            try:
-                if "user/" in identifier or "/c/" in identifier or "/@" in identifier:
-                    search_request = self.youtube_service.search().list(q=potential_id, type='channel', part='id', maxResults=1)
-                    search_response = search_request.execute()
-                    if search_response and search_response['items']: return search_response['items'][0]['id']['channelId']
-                else: return potential_id
-            except Exception as e:
-                print(f"[ERROR] _get_channel_id API call failed for {identifier}: {e}")
+            kind, name = {'@': 'handle', 'c/': 'custom', 'user/': 'username'}[match.group(1)], match.group(2)
+        elif identifier.startswith('@'):
+            kind, name = 'handle', identifier[1:]
+        else:
+            return None
+
+        cached = channel_id_cache.get_channel_id(kind, name)
+        if cached:
+            return cached
+
+        try:
+            channel_id = None
+            if kind == 'handle':
+                channel_id = self._lookup_channel(forHandle=f"@{name}")
+            elif kind == 'username':
+                channel_id = self._lookup_channel(forUsername=name)
+            else:
+                # 맞춤 URL(/c/)은 조회 API가 없으므로 같은 이름의 핸들/사용자명을 먼저 확인하고, 없을 때만 검색합니다.
+                channel_id = self._lookup_channel(forHandle=f"@{name}") or self._lookup_channel(forUsername=name)
+                if not channel_id:
+                    search_response = self.youtube_service.search().list(q=name, type='channel', part='id', maxResults=1, fields=CHANNEL_SEARCH_FIELDS).execute(caller='_get_channel_id')
+                    if search_response and search_response.get('items'):
+                        channel_id = search_response['items'][0]['id']['channelId']
+            if channel_id:
+                channel_id_cache.put_channel_id(kind, name, channel_id)
+            return channel_id
+        except youtube_quota.QuotaExceededError:
+            # 할당량 소진은 잘못된 채널 주소와 구분해 안내해야 하므로 호출한 쪽으로 그대로 전달합니다.
+            raise
+        except Exception as e:
+            print(f"[ERROR] _get_channel_id API call failed for {identifier}: {e}")
         return None
 
-    def extract_channel_info(self, channel_identifier):
+    def _fetch_video_items(self, video_ids, part="snippet,statistics,contentDetails"):
+        if len(video_ids) > 50:
+            # 50개 단위 요청이 여러 번 필요하면 비동기 클라이언트의 배치 요청으로 한 번에 보냅니다.
+            return youtube_async.run_sync(youtube_async.fetch_video_items(video_ids, part, fields=video_fields(part), quota_context=self.quota_context))
+        items = []
+        for i in range(0, len(video_ids), 50):
+            video_ids_batch = video_ids[i:i+50]
+            if not video_ids_batch: continue
+            video_details_request = self.youtube_service.videos().list(part=part, id=",".join(video_ids_batch), fields=video_fields(part))
+            video_details_response = video_details_request.execute(caller='_fetch_video_items')
+            items.extend(video_details_response.get('items', []))
+        return items
+
+    def _sync_recent_videos(self, channel_id, uploads_playlist_id, since, use_store):
+        """
+        업로드 재생목록에서 since 이후 영상을 모읍니다. 저장소에 이미 있는 영상을 만나면 페이지 탐색을 멈추고,
+        새 영상만 전체 정보를 받아오며 기존 영상은 통계가 오래된 것만 statistics 파트로 다시 받아옵니다.
+        """
+        now = datetime.utcnow()
+        known_ids = channel_store.known_video_ids(channel_id) if use_store else set()
+        new_ids, next_page_token, fetch_count, max_playlist_fetches = [], None, 0, 5
+
+        while True:
+            if fetch_count >= max_playlist_fetches: break
+            playlist_items_request = self.youtube_service.playlistItems().list(part="snippet", playlistId=uploads_playlist_id, maxResults=50, pageToken=next_page_token, fields=PLAYLIST_SNIPPET_FIELDS)
+            playlist_items_response = playlist_items_request.execute(caller='_sync_recent_videos')
+            if not playlist_items_response.get('items'): break
+            found_recent, reached_known = False, False
+            for item in playlist_items_response['items']:
+                video_id = item['snippet']['resourceId']['videoId']
+                if video_id in known_ids:
+                    reached_known = True
+                    break
+                video_upload_date = isoparse(item['snippet']['publishedAt']).replace(tzinfo=None)
+                if video_upload_date >= since:
+                    new_ids.append(video_id)
+                    found_recent = True
+                else: break
+            next_page_token = playlist_items_response.get('nextPageToken')
+            fetch_count += 1
+            if reached_known or not next_page_token or not found_recent: break
+
+        new_items = self._fetch_video_items(new_ids)
+        if not use_store:
+            return new_items
+
+        channel_store.upsert_videos(channel_id, new_items, _published_at, now)
+        stored = channel_store.get_videos(channel_id, since=since)
+        new_id_set = set(new_ids)
+        stale_ids = [item['id'] for item, refreshed_at in stored
+                     if item['id'] not in new_id_set and (now - refreshed_at).total_seconds() > config.CHANNEL_VIDEO_STATS_TTL_SECONDS]
+        stale_id_set = set(stale_ids)
+        removed_ids = set()
+        if stale_ids:
+            fresh_stats = {item['id']: item.get('statistics', {}) for item in self._fetch_video_items(stale_ids, part="statistics")}
+            refreshed_items = []
+            for item, _ in stored:
+                if item['id'] not in stale_id_set: continue
+                if item['id'] in fresh_stats:
+                    item['statistics'] = fresh_stats[item['id']]
+                    refreshed_items.append(item)
+                else:
+                    removed_ids.add(item['id'])  # 삭제/비공개 처리된 영상
+            channel_store.upsert_videos(channel_id, refreshed_items, _published_at, now)
+            channel_store.delete_videos(removed_ids)
+        print(f"[DEBUG] 채널 증분 동기화: 새 영상 {len(new_ids)}개, 통계 갱신 {len(stale_ids)}개, 재사용 {len(stored) - len(new_ids) - len(stale_ids)}개")
+        return [item for item, _ in stored if item['id'] not in removed_ids]
+
+    def fetch_channel_snapshot(self, channel_identifier):
+        """
+        채널 통계, 최근 90일 업로드 목록(없으면 역대 인기 영상), 영상별 통계/길이를 한 번에 받아 ChannelSnapshot으로 반환합니다.
+        이전에 분석한 채널은 채널 저장소에서 읽고, 새 영상과 통계가 오래된 영상만 API로 다시 받아옵니다.
+        실패하면 {"error": ...} 딕셔너리를 반환합니다.
+        """
         self._initialize_youtube_service()
         if not self.youtube_service: return {"error": "YouTube Data API 키가 설정되지 않았거나 서비스 초기화에 실패했습니다."}
-        channel_id = self._get_channel_id(channel_identifier)
+        try:
+            channel_id = self._get_channel_id(channel_identifier)
+        except youtube_quota.QuotaExceededError as e:
+            print(f"[ERROR] YouTubeDataExtractor.fetch_channel_snapshot: {e}")
+            return {"error": "오늘의 YouTube API 일일 할당량이 모두 소진되었습니다. 할당량이 초기화된 후(미국 태평양 시간 자정) 다시 시도해주세요."}
         if not channel_id: return {"error": "유효한 채널 ID 또는 URL을 추출할 수 없습니다. 형식을 확인해주세요."}
         try:
-            channel_request = self.youtube_service.channels().list(part="snippet,statistics,contentDetails", id=channel_id)
-            channel_response = channel_request.execute()
-            if not channel_response['items']: return {"error": "채널 정보를 찾을 수 없습니다. 채널 ID를 확인해주세요."}
-            channel_data = channel_response['items'][0]
-            channel_title = channel_data['snippet']['title']
-            subscriber_count = int(channel_data['statistics'].get('subscriberCount', 0))
-            
-            uploads_playlist_id = channel_data['contentDetails']['relatedPlaylists']['uploads']
+            now = datetime.utcnow()
+            try:
+                record = channel_store.get_channel(channel_id)
+                use_store = True
+            except Exception as e:
+                print(f"[WARN] 채널 저장소를 사용할 수 없어 전체 데이터를 새로 받아옵니다: {e}")
+                record, use_store = None, False
+
+            if record and record['channel_refreshed_at'] and (now - record['channel_refreshed_at']).total_seconds() < config.CHANNEL_STATS_TTL_SECONDS:
+                channel_title, subscriber_count, uploads_playlist_id = record['title'], record['subscriber_count'], record['uploads_playlist_id']
+            else:
+                channel_request = self.youtube_service.channels().list(part="snippet,statistics,contentDetails", id=channel_id, fields=CHANNEL_DETAILS_FIELDS)
+                channel_response = channel_request.execute(caller='fetch_channel_snapshot')
+                if not channel_response.get('items'): return {"error": "채널 정보를 찾을 수 없습니다. 채널 ID를 확인해주세요."}
+                channel_data = channel_response['items'][0]
+                channel_title = channel_data['snippet']['title']
+                subscriber_count = int(channel_data['statistics'].get('subscriberCount', 0))
+                uploads_playlist_id = channel_data['contentDetails']['relatedPlaylists']['uploads']
+                if use_store:
+                    channel_store.save_channel(channel_id, channel_title, subscriber_count, uploads_playlist_id, channel_refreshed_at=now)
+
             three_months_ago = datetime.now() - timedelta(days=90)
-            videos, next_page_token, fetch_count, max_playlist_fetches = [], None, 0, 5
-            analysis_type = "recent" 
-
-            while True:
-                if fetch_count >= max_playlist_fetches: break
-                playlist_items_request = self.youtube_service.playlistItems().list(part="snippet", playlistId=uploads_playlist_id, maxResults=50, pageToken=next_page_token)
-                playlist_items_response = playlist_items_request.execute()
-                if not playlist_items_response['items']: break
-                found_recent = False
-                for item in playlist_items_response['items']:
-                    video_upload_date = isoparse(item['snippet']['publishedAt']).replace(tzinfo=None)
-                    if video_upload_date >= three_months_ago:
-                        videos.append({'id': item['snippet']['resourceId']['videoId'], 'publishedAt': video_upload_date})
-                        found_recent = True
-                    else: break
-                next_page_token = playlist_items_response.get('nextPageToken')
-                fetch_count += 1
-                if not next_page_token or not found_recent: break
-            
-            if not videos:
+            analysis_type = "recent"
+            all_video_details = self._sync_recent_videos(channel_id, uploads_playlist_id, three_months_ago, use_store)
+            if use_store:
+                channel_store.save_channel(channel_id, channel_title, subscriber_count, uploads_playlist_id, playlist_synced_at=now)
+
+            if not all_video_details:
                 print("[INFO] 최근 3개월 내 업로드된 영상이 없습니다. '플랜 B'를 가동하여 채널의 역대 인기 영상을 분석합니다.")
                 analysis_type = "popular"
                 search_request = self.youtube_service.search().list(
-                    part="snippet",
+                    part="id",
                     channelId=channel_id,
-                    maxResults=20, 
+                    maxResults=20,
                     order="viewCount",
-                    type="video"
+                    type="video",
+                    fields=VIDEO_SEARCH_FIELDS
                 )
-                search_response = search_request.execute()
-                for item in search_response.get("items", []):
-                    videos.append({'id': item['id']['videoId']})
-
-            all_video_details = []
-            if videos:
-                for i in range(0, len(videos), 50):
-                    video_ids_batch = [v['id'] for v in videos[i:i+50]]
-                    if not video_ids_batch: continue
-                    video_details_request = self.youtube_service.videos().list(part="snippet,statistics,contentDetails", id=",".join(video_ids_batch))
-                    video_details_response = video_details_request.execute()
-                    all_video_details.extend(video_details_response['items'])
-
-            long_form_count, short_form_count, long_form_view_list, total_short_form_views, last_upload_date = 0, 0, [], 0, None
-            for video_item in all_video_details:
-                published_at = isoparse(video_item['snippet']['publishedAt']).replace(tzinfo=None)
-                view_count = int(video_item['statistics'].get('viewCount', 0))
-                if last_upload_date is None or published_at > last_upload_date: last_upload_date = published_at
-                is_short = False
-                if 'contentDetails' in video_item and 'duration' in video_item['contentDetails']:
-                    duration_str = video_item['contentDetails']['duration']
-                    h = int(re.search(r'(\d+)H', duration_str).group(1)) * 3600 if 'H' in duration_str else 0
-                    m = int(re.search(r'(\d+)M', duration_str).group(1)) * 60 if 'M' in duration_str else 0
-                    s = int(re.search(r'(\d+)S', duration_str).group(1)) if 'S' in duration_str else 0
-                    if (h + m + s) <= 65: 
-                        is_short = True
-                if '#shorts' in video_item['snippet']['title'].lower(): is_short = True
-                if is_short: 
-                    short_form_count += 1
-                    total_short_form_views += view_count
-                else: 
-                    long_form_count += 1
-                    long_form_view_list.append(view_count)
-
-            if analysis_type == 'popular':
-                total_long_form_views_for_revenue = sum(long_form_view_list) * 10 
-                total_short_form_views_for_revenue = total_short_form_views * 10
-                total_recent_views = sum(long_form_view_list) + total_short_form_views
-            else: 
-                total_long_form_views_for_revenue = sum(long_form_view_list)
-                total_short_form_views_for_revenue = total_short_form_views
-                total_recent_views = total_long_form_views_for_revenue + total_short_form_views_for_revenue
-
-            avg_long_form_views = (sum(long_form_view_list) // long_form_count) if long_form_count > 0 else 0
-            avg_short_form_views = (total_short_form_views // short_form_count) if short_form_count > 0 else 0
-            
-            return {
-                "channel_title": channel_title, "subscriber_count": f"{subscriber_count:,}",
-                "recent_3_month_views": f"{total_recent_views:,}",
-                "long_form_count": long_form_count, "short_form_count": short_form_count, 
-                "last_upload_date": last_upload_date.strftime("%Y-%m-%d") if last_upload_date else '90일 내 활동 없음',
-                "avg_long_form_views": f"{avg_long_form_views:,}", "avg_short_form_views": f"{avg_short_form_views:,}",
-                "subscriber_count_raw": subscriber_count, "recent_3_month_views_raw": total_recent_views,
-                "avg_long_form_views_raw": avg_long_form_views, "avg_short_form_views_raw": avg_short_form_views,
-                "total_long_form_views_raw": total_long_form_views_for_revenue,
-                "total_short_form_views_raw": total_short_form_views_for_revenue,
-                "videos_data": all_video_details,
-                "analysis_type": analysis_type,
-            }
+                search_response = search_request.execute(caller='fetch_channel_snapshot')
+                all_video_details = self._fetch_video_items([item['id']['videoId'] for item in search_response.get("items", [])])
+
+            return ChannelSnapshot(
+                channel_id=channel_id,
+                channel_title=channel_title,
+                subscriber_count=subscriber_count,
+                uploads_playlist_id=uploads_playlist_id,
+                analysis_type=analysis_type,
+                videos=tuple(all_video_details),
+            )
         except Exception as e:
-            print(f"[ERROR] YouTubeDataExtractor.extract_channel_info: {e}")
+            print(f"[ERROR] YouTubeDataExtractor.fetch_channel_snapshot: {e}")
             return {"error": f"채널 정보 추출 중 오류 발생: {str(e)}"}
 
-    def get_popular_videos(self, channel_id, max_results=10):
-        self._initialize_youtube_service()
-        if not self.youtube_service:
-            return [{"error": "YouTube Data API 서비스 초기화 실패"}]
-
+    def iter_uploads(self, uploads_playlist_id, max_pages=None):
+        """업로드 재생목록 전체를 한 페이지(최대 50개)씩 읽어 영상 ID 목록을 차례로 내보내는 제너레이터입니다."""
+        next_page_token, page_count = None, 0
+        while max_pages is None or page_count < max_pages:
+            playlist_items_response = self.youtube_service.playlistItems().list(
+                part="contentDetails", playlistId=uploads_playlist_id, maxResults=50, pageToken=next_page_token, fields=PLAYLIST_IDS_FIELDS
+            ).execute(caller='iter_uploads')
+            video_ids = [item['contentDetails']['videoId'] for item in playlist_items_response.get('items', [])]
+            if video_ids:
+                yield video_ids
+            page_count += 1
+            next_page_token = playlist_items_response.get('nextPageToken')
+            if not next_page_token: break
+
+    def fetch_channel_history(self, channel_identifier, max_videos=None):
+        """
+        채널의 전체 업로드 이력을 VideoTable로 반환합니다. (최대 max_videos개, 기본 CHANNEL_HISTORY_MAX_VIDEOS)
+        재생목록 한 페이지를 읽을 때마다 해당 영상의 통계를 받아 표에 넣고 원본 응답은 바로 버리므로 메모리 사용량이 일정합니다.
+        실패하면 {"error": ...} 딕셔너리를 반환합니다.
+        """
+        max_videos = max_videos or config.CHANNEL_HISTORY_MAX_VIDEOS
+        snapshot = channel_identifier
+        if not isinstance(snapshot, ChannelSnapshot):
+            snapshot = self.fetch_channel_snapshot(channel_identifier)
+            if isinstance(snapshot, dict): return snapshot
         try:
-            channel_request = self.youtube_service.channels().list(
-                part="contentDetails",
-                id=channel_id
-            )
-            channel_response = channel_request.execute()
-            if not channel_response.get('items'):
-                return [{"error": "채널 정보를 찾을 수 없습니다."}]
-            
-            uploads_playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-            
-            three_months_ago = datetime.now() - timedelta(days=90)
-            all_videos = []
-            next_page_token = None
-            
-            for _ in range(5): 
-                playlist_items_request = self.youtube_service.playlistItems().list(
-                    part="snippet",
-                    playlistId=uploads_playlist_id,
-                    maxResults=50,
-                    pageToken=next_page_token
-                )
-                playlist_items_response = playlist_items_request.execute()
-                
-                found_recent_video = False
-                for item in playlist_items_response.get("items", []):
-                    published_at = isoparse(item['snippet']['publishedAt']).replace(tzinfo=None)
-                    if published_at >= three_months_ago:
-                        all_videos.append({
-                            'id': item['snippet']['resourceId']['videoId'],
-                            'title': item['snippet']['title']
-                        })
-                        found_recent_video = True
-                
-                next_page_token = playlist_items_response.get('nextPageToken')
-                if not next_page_token or not found_recent_video:
-                    break
-            
-            if not all_videos:
-                print("[DEBUG] 최근 90일 내 영상 없음. 전체 기간 인기 영상으로 대체 검색을 시작합니다.")
-                search_request = self.youtube_service.search().list(
-                    part="snippet",
-                    channelId=channel_id,
-                    maxResults=max_results,
-                    order="viewCount",
-                    type="video"
-                )
-                search_response = search_request.execute()
-                for item in search_response.get("items", []):
-                    all_videos.append({
-                        'id': item['id']['videoId'],
-                        'title': item['snippet']['title'],
-                    })
-
-            if not all_videos:
-                return []
-
-            video_details = []
-            video_ids_to_fetch = [v['id'] for v in all_videos]
-            for i in range(0, len(video_ids_to_fetch), 50):
-                video_ids_batch = video_ids_to_fetch[i:i+50]
-                video_details_request = self.youtube_service.videos().list(
-                    part="statistics",
-                    id=",".join(video_ids_batch)
-                )
-                video_details_response = video_details_request.execute()
-                video_details.extend(video_details_response.get("items", []))
-
-            video_stats = {item['id']: int(item['statistics'].get('viewCount', 0)) for item in video_details}
-            for video in all_videos:
-                video['view_count'] = video_stats.get(video['id'], 0)
+            table = VideoTable()
+            for video_ids in self.iter_uploads(snapshot.uploads_playlist_id, max_pages=-(-max_videos // 50)):
+                table.append_items(self._fetch_video_items(video_ids[:max_videos - len(table)]))
+                if len(table) >= max_videos: break
+            print(f"[DEBUG] 채널 전체 이력 수집 완료: {snapshot.channel_title} ({len(table)}개 영상)")
+            return table
+        except Exception as e:
+            print(f"[ERROR] YouTubeDataExtractor.fetch_channel_history: {e}")
+            return {"error": f"채널 전체 이력 수집 중 오류 발생: {str(e)}"}
 
-            sorted_videos = sorted(all_videos, key=lambda v: v.get('view_count', 0), reverse=True)
-            
-            return sorted_videos[:max_results]
+    def extract_channel_info(self, channel_identifier):
+        """채널 식별자(URL/ID) 또는 이미 받아둔 ChannelSnapshot을 받아 채널 요약 정보를 반환합니다."""
+        snapshot = channel_identifier
+        if not isinstance(snapshot, ChannelSnapshot):
+            snapshot = self.fetch_channel_snapshot(channel_identifier)
+            if isinstance(snapshot, dict): return snapshot
+        try:
+            return snapshot.to_channel_info()
+        except Exception as e:
+            print(f"[ERROR] YouTubeDataExtractor.extract_channel_info: {e}")
+            return {"error": f"채널 정보 추출 중 오류 발생: {str(e)}"}
 
+    def get_popular_videos(self, channel_id, max_results=10):
+        """채널 ID 또는 ChannelSnapshot을 받아 조회수 순 상위 영상 목록을 반환합니다. 스냅샷을 넘기면 API를 다시 호출하지 않습니다."""
+        snapshot = channel_id
+        if not isinstance(snapshot, ChannelSnapshot):
+            snapshot = self.fetch_channel_snapshot(channel_id)
+            if isinstance(snapshot, dict):
+                return [{"error": snapshot['error']}]
+        try:
+            return snapshot.popular_videos(max_results)
         except Exception as e:
             error_message = f"인기 동영상 목록을 가져오는 중 오류 발생: {e}"
             print(f"[ERROR] {error_message}", file=sys.stderr)
             return [{"error": error_message}]
-            
-    def get_top_comments(self, video_id, max_results=5):
-        self._initialize_youtube_service()
-        if not self.youtube_service:
-            return [{'error': "YouTube Data API 서비스 초기화 실패"}]
 
-        try:
-            request = self.youtube_service.commentThreads().list(
+    def iter_comments(self, video_id, max_pages=None, max_comments=None, order="relevance"):
+        """
+        영상의 최상위 댓글을 한 페이지(최대 100개)씩 받아 하나씩 내보내는 제너레이터입니다.
+        max_pages/max_comments(기본값 COMMENT_MAX_PAGES/COMMENT_MAX_TOTAL)에 닿으면 멈춥니다.
+        """
+        max_pages = max_pages or config.COMMENT_MAX_PAGES
+        max_comments = max_comments or config.COMMENT_MAX_TOTAL
+        next_page_token, page_count, yielded = None, 0, 0
+        while page_count < max_pages:
+            response = self.youtube_service.commentThreads().list(
                 part="snippet",
                 videoId=video_id,
-                order="relevance", 
+                order=order,
                 maxResults=100,
-                textFormat="plainText"
-            )
-            response = request.execute()
-
-            all_comments = []
+                pageToken=next_page_token,
+                textFormat="plainText",
+                fields=COMMENT_FIELDS
+            ).execute(caller='iter_comments')
+            page_count += 1
             for item in response.get("items", []):
                 comment_snippet = item["snippet"]["topLevelComment"]["snippet"]
-                all_comments.append({
+                yield {
                     "author": comment_snippet["authorDisplayName"],
                     "text": comment_snippet["textDisplay"],
                     "like_count": comment_snippet["likeCount"]
-                })
-            
-            if not all_comments:
-                return [{'error': '베스트 댓글을 찾을 수 없거나, 댓글이 없는 영상입니다.'}]
+                }
+                yielded += 1
+                if yielded >= max_comments: return
+            next_page_token = response.get("nextPageToken")
+            if not next_page_token: break
+
+    def analyze_comments(self, video_id, max_results=5, max_pages=None, max_comments=None, with_keywords=False):
+        """
+        댓글을 스트리밍으로 훑으며 좋아요 순 상위 max_results개를 힙으로 고르고, 원하면 댓글 전체의 명사 빈도도 셉니다.
+        댓글 수와 관계없이 상위 댓글 k개와 키워드 카운터만 메모리에 남습니다.
+        형태소 분석은 느리므로 명사 빈도는 앞쪽(관련성 순) 댓글 config.COMMENT_KEYWORD_MAX_COMMENTS개까지만 셉니다.
+        반환값: {'top_comments', 'scanned_count', 'top_keywords'(with_keywords일 때)} 또는 {'error': ...}
+        """
+        self._initialize_youtube_service()
+        if not self.youtube_service:
+            return {'error': "YouTube Data API 서비스 초기화 실패"}
 
-            sorted_comments = sorted(all_comments, key=lambda c: c.get('like_count', 0), reverse=True)
-            
-            return sorted_comments[:max_results]
+        try:
+            heap, scanned = [], 0
+
+            def comment_texts():
+                nonlocal scanned
+                for comment in self.iter_comments(video_id, max_pages, max_comments):
+                    scanned += 1
+                    # (좋아요 수, 순번)으로 비교해 좋아요가 같으면 먼저 나온(관련성이 높은) 댓글을 남깁니다.
+                    entry = (comment.get('like_count', 0), -scanned, comment)
+                    if len(heap) < max_results:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+                    if scanned <= config.COMMENT_KEYWORD_MAX_COMMENTS:
+                        yield comment['text']
+
+            if with_keywords:
+                from services import content_analyzer
+                top_keywords = content_analyzer.count_keywords(comment_texts())
+            else:
+                for _ in comment_texts(): pass
+
+            if not heap:
+                return {'error': '베스트 댓글을 찾을 수 없거나, 댓글이 없는 영상입니다.'}
+
+            result = {
+                'top_comments': [comment for _, _, comment in sorted(heap, key=lambda e: e[:2], reverse=True)],
+                'scanned_count': scanned,
+            }
+            if with_keywords:
+                result['top_keywords'] = top_keywords
+            return result
 
         except Exception as e:
             error_message = f"댓글을 가져오는 중 오류가 발생했습니다: {e}"
             print(f"[ERROR] {error_message}", file=sys.stderr)
             if 'disabled comments' in str(e).lower():
-                return [{'error': '이 영상은 댓글 사용이 중지되었습니다.'}]
-            return [{'error': error_message}]
+                return {'error': '이 영상은 댓글 사용이 중지되었습니다.'}
+            return {'error': error_message}
+
+    def get_top_comments(self, video_id, max_results=5, max_pages=None, max_comments=None):
+        result = self.analyze_comments(video_id, max_results, max_pages, max_comments)
+        if 'error' in result:
+            return [{'error': result['error']}]
+        return result['top_comments']
 
 
 def clean_transcript(text):
@@ -0,0 +1,175 @@
+# services/youtube_quota.py
+
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import config
+from services import redis_store
+
+# YouTube Data API 호출마다 할당량 단위를 계산해 기록하고, 일일 한도에 닿기 전에 호출을 거절합니다.
+# 기록은 Redis에 저장되어 웹 서버와 모든 Celery 워커가 같은 사용량을 봅니다.
+# (Redis에 연결할 수 없으면 프로세스 내부 카운터로 대체됩니다.)
+
+# 엔드포인트별 할당량 비용 (https://developers.google.com/youtube/v3/determine_quota_cost)
+QUOTA_COSTS = {
+    'search.list': 100,
+}
+DEFAULT_READ_COST = 1
+
+_QUOTA_TZ = ZoneInfo('America/Los_Angeles')  # YouTube 할당량은 태평양 시간 자정에 초기화됩니다.
+_KEY_TTL_SECONDS = 60 * 60 * 24 * 3
+
+_local_lock = threading.Lock()
+_local_totals = Counter()
+_local_breakdowns = defaultdict(Counter)
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+def quota_day():
+    return datetime.now(_QUOTA_TZ).strftime('%Y-%m-%d')
+
+
+def endpoint_cost(endpoint):
+    return QUOTA_COSTS.get(endpoint, DEFAULT_READ_COST)
+
+
+def _key(day, name):
+    return f"yt_quota:{day}:{name}"
+
+
+def charge(endpoint, context=None, caller=None):
+    """
+    호출 전에 할당량을 먼저 예약합니다. 예약 후 일일 한도를 넘으면 예약을 되돌리고 QuotaExceededError를 발생시킵니다.
+    비싼 호출(search 등)은 남은 할당량이 YOUTUBE_EXPENSIVE_CALL_FLOOR 아래로 내려가면 미리 거절해
+    채널/영상 조회 같은 1단위 호출에 쓸 여유를 남겨둡니다.
+    """
+    cost = endpoint_cost(endpoint)
+    limit = config.YOUTUBE_DAILY_QUOTA
+    if cost > DEFAULT_READ_COST:
+        limit -= config.YOUTUBE_EXPENSIVE_CALL_FLOOR
+    day = quota_day()
+    context = context or {}
+    breakdowns = {
+        'endpoint': endpoint,
+        'caller': caller or 'unknown',
+        'user': str(context.get('user') or 'anonymous'),
+        'task': str(context.get('task') or 'none'),
+    }
+
+    client = redis_store.get_redis()
+    if client is not None:
+        try:
+            used = client.incrby(_key(day, 'total'), cost)
+            if used > limit:
+                client.decrby(_key(day, 'total'), cost)
+                raise QuotaExceededError(f"YouTube API 일일 할당량이 부족하여 '{endpoint}' 호출을 중단했습니다. (사용량: {used - cost}/{config.YOUTUBE_DAILY_QUOTA})")
+            pipe = client.pipeline()
+            pipe.expire(_key(day, 'total'), _KEY_TTL_SECONDS)
+            for name, value in breakdowns.items():
+                pipe.hincrby(_key(day, name), value, cost)
+                pipe.expire(_key(day, name), _KEY_TTL_SECONDS)
+            pipe.execute()
+            return cost
+        except QuotaExceededError:
+            raise
+        except Exception as e:
+            print(f"[WARN] Redis 할당량 기록 실패, 프로세스 내부 카운터를 사용합니다: {e}")
+
+    with _local_lock:
+        used = _local_totals[day] + cost
+        if used > limit:
+            raise QuotaExceededError(f"YouTube API 일일 할당량이 부족하여 '{endpoint}' 호출을 중단했습니다. (사용량: {used - cost}/{config.YOUTUBE_DAILY_QUOTA})")
+        _local_totals[day] = used
+        for name, value in breakdowns.items():
+            _local_breakdowns[(day, name)][value] += cost
+    return cost
+
+
+def get_remaining_quota(day=None):
+    day = day or quota_day()
+    client = redis_store.get_redis()
+    used = None
+    if client is not None:
+        try:
+            used = int(client.get(_key(day, 'total')) or 0)
+        except Exception:
+            used = None
+    if used is None:
+        used = _local_totals[day]
+    return max(0, config.YOUTUBE_DAILY_QUOTA - used)
+
+
+def get_quota_report(day=None, top_n=10):
+    """엔드포인트/호출 경로/사용자/작업별 사용량을 많이 쓴 순서대로 정리해 반환합니다."""
+    day = day or quota_day()
+    report = {'day': day, 'daily_quota': config.YOUTUBE_DAILY_QUOTA, 'remaining': get_remaining_quota(day)}
+    client = redis_store.get_redis()
+    for name in ('endpoint', 'caller', 'user', 'task'):
+        counts = None
+        if client is not None:
+            try:
+                counts = Counter({k.decode() if isinstance(k, bytes) else k: int(v) for k, v in client.hgetall(_key(day, name)).items()})
+            except Exception:
+                counts = None
+        if counts is None:
+            counts = _local_breakdowns[(day, name)]
+        report[f'by_{name}'] = counts.most_common(top_n)
+    report['used'] = config.YOUTUBE_DAILY_QUOTA - report['remaining']
+    return report
+
+
+class _RequestProxy:
+    def __init__(self, endpoint, request, owner):
+        self._endpoint = endpoint
+        self._request = request
+        self._owner = owner
+
+    def execute(self, *args, caller=None, **kwargs):
+        # caller에는 실제로 할당량을 쓰는 코드 경로(예: fetch_channel_snapshot)를 넘겨 호출 경로별 사용량을 기록합니다.
+        charge(self._endpoint, self._owner.context, caller)
+        return self._request.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class _ResourceProxy:
+    def __init__(self, resource_name, resource, owner):
+        self._resource_name = resource_name
+        self._resource = resource
+        self._owner = owner
+
+    def __getattr__(self, method_name):
+        method = getattr(self._resource, method_name)
+        endpoint = f"{self._resource_name}.{method_name}"
+
+        def wrapper(*args, **kwargs):
+            request = method(*args, **kwargs)
+            if request is None:  # list_next()는 마지막 페이지에서 None을 반환합니다.
+                return None
+            return _RequestProxy(endpoint.replace('_next', ''), request, self._owner)
+        return wrapper
+
+
+class QuotaAwareYouTubeService:
+    """
+    googleapiclient의 youtube 서비스 객체를 감싸 모든 .execute() 호출의 할당량을 계산합니다.
+    기존 코드의 self.youtube_service.channels().list(...).execute() 형태를 그대로 사용하며,
+    .execute(caller='fetch_channel_snapshot')처럼 호출 경로 이름을 넘기면 호출 경로별 사용량에 기록됩니다.
+    context에는 {'user': 사용자 ID, 'task': 작업 ID}를 넣어 사용자/작업별 사용량을 구분합니다.
+    """
+
+    def __init__(self, service, context=None):
+        self._service = service
+        self.context = context or {}
+
+    def __getattr__(self, resource_name):
+        factory = getattr(self._service, resource_name)
+
+        def wrapper(*args, **kwargs):
+            return _ResourceProxy(resource_name, factory(*args, **kwargs), self)
+        return wrapper
@@ -1,6 +1,6 @@
-import yt_dlp
 import sys
 import os
+from services import ydl_pool
 
 def download_subtitle(video_url):
     """
@@ -18,18 +18,16 @@ def download_subtitle(video_url):
         os.remove(output_filename)
         print(f"기존 '{output_filename}' 파일을 삭제했습니다.")
 
-    # yt-dlp 옵션 설정
+    # yt-dlp 옵션 설정 (쿠키, 서명 캐시 등 공통 옵션은 ydl_pool의 기본 옵션을 그대로 사용)
     ydl_opts = {
         'writesubtitles': True,      # 자막 다운로드 활성화
         'subtitleslangs': ['ko'],    # 한국어 자막 지정
         'skip_download': True,       # 영상 자체는 다운로드 안 함
         'outtmpl': 'downloaded_subtitle', # 저장될 파일의 기본 이름
-        'quiet': True,               # 불필요한 로그 최소화
-        'no_warnings': True,         # 경고 메시지 숨김
     }
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.lease(**ydl_opts) as ydl:
             print("자막 다운로드를 시도합니다...")
             ydl.download([video_url])
         